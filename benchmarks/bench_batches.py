@@ -0,0 +1,61 @@
+"""
+Сравнение передачи объявлений между задачами DAG: прежний путь (json.dumps
+в stdout -> XCom -> json.loads -> json.dumps для следующей задачи) против
+пакетов src.core.batches (в XCom — только путь, колонки открываются через mmap).
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_batches [--sizes 100 10000] [--repeat N]
+"""
+import argparse
+import json
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.model_fixtures import synthetic_ads
+from src.core.batches import read_records, write_batch
+
+
+def dated_ads(count: int):
+    started = datetime(2024, 1, 1)
+    return [{**ad, "published_at": started + timedelta(minutes=idx)} for idx, ad in enumerate(synthetic_ads(count))]
+
+
+def json_hand_off(ads):
+    payload = json.dumps(ads, default=lambda o: o.isoformat() if isinstance(o, datetime) else None)
+    received = json.loads(payload)
+    return len(payload.encode()), received
+
+
+def batch_hand_off(ads, batch_dir: str, run: int):
+    path = write_batch(ads, f"bench_{run}", batch_dir=batch_dir)
+    return len(path.encode()), read_records(path)
+
+
+def best_of(repeat: int, fn):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 10_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as batch_dir:
+        for size in args.sizes:
+            ads = dated_ads(size)
+            json_time, (json_bytes, _) = best_of(args.repeat, lambda: json_hand_off(ads))
+            batch_time, (xcom_bytes, records) = best_of(args.repeat, lambda: batch_hand_off(ads, batch_dir, size))
+            assert [ad["avito_id"] for ad in records] == [ad["avito_id"] for ad in ads]
+            print(f"{size:>7} объявлений: JSON {json_time * 1000:8.1f} мс, в XCom {json_bytes / 1024:9.1f} КиБ | "
+                  f"пакет {batch_time * 1000:8.1f} мс, в XCom {xcom_bytes} байт")
+
+
+if __name__ == "__main__":
+    main()
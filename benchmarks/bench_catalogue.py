@@ -0,0 +1,97 @@
+"""
+Разбор заголовков: прежний путь prepare_ads (pandas: str.match по шаблону
+идеального заголовка и str.split на model/memory) против каталога
+src.core.catalogue — без кэша и с кэшем повторяющихся заголовков.
+
+Для каждого варианта печатается время на объявление, сколько заголовков
+дали модель и память (выход с одной страницы выдачи) и сколько памяти
+выделяется на объявление (tracemalloc).
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_catalogue [путь/к/странице.html ...] [--ads N] [--repeat N]
+
+Корпус — заголовки сохраненных страниц выдачи (по умолчанию benchmarks/fixtures),
+повторенные до N объявлений.
+"""
+import argparse
+import itertools
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import pandas as pd
+
+from src.core.catalogue import LEGACY_TITLE_PATTERN, Catalogue
+from src.parsers.extractor import extract_columns, parse_html
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+
+def load_titles(paths: List[Path]) -> List[str]:
+    titles = []
+    for path in paths:
+        titles.extend(title for title in extract_columns(parse_html(path.read_bytes()))["title"] if title)
+    return titles
+
+
+def legacy_prepare(ads: List[Dict]) -> List[Dict]:
+    """Копия прежнего разбора заголовков из worker.prepare_ads, сохраненная как точка отсчета."""
+    df = pd.DataFrame(ads)
+    df = df[df['title'].str.match(LEGACY_TITLE_PATTERN, na=False)].copy()
+    if not df.empty:
+        split_data = df['title'].str.split(', ', n=1, expand=True)
+        df['model'] = split_data[0].str.strip()
+        df['memory'] = split_data[1].str.strip()
+    return df.to_dict('records')
+
+
+def measure(name: str, prepare: Callable[[List[Dict]], List[Dict]], ads: List[Dict], repeat: int) -> None:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = prepare(ads)
+        best = min(best, time.perf_counter() - started)
+
+    tracemalloc.start()
+    prepare(ads)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(
+        f"  {name:22s} {best / len(ads) * 1e6:7.2f} мкс/объявл., распознано {len(result) / len(ads):6.1%}, "
+        f"пик памяти {peak / len(ads):7.0f} Б/объявл."
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pages", nargs="*", type=Path)
+    parser.add_argument("--ads", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    titles = load_titles(args.pages or sorted(FIXTURES_DIR.glob("*.html")))
+    ads = [
+        {"avito_id": idx, "title": title, "price": 50_000}
+        for idx, title in zip(range(args.ads), itertools.cycle(titles))
+    ]
+    print(f"Корпус: {len(titles)} заголовков ({len(set(titles))} разных), {len(ads)} объявлений.")
+
+    uncached = Catalogue(cache_size=0)
+    cached = Catalogue()
+    measure("pandas (прежний путь)", legacy_prepare, ads, args.repeat)
+    measure("каталог без кэша", uncached.annotate, ads, args.repeat)
+    measure("каталог с кэшем", cached.annotate, ads, args.repeat)
+
+    legacy_titles = {ad["title"] for ad in legacy_prepare(ads)}
+    recovered = sorted({title for title in titles if title not in legacy_titles and cached.match(title)})
+    if recovered:
+        print("Заголовки, которые раньше отбрасывались, а теперь распознаются:")
+        for title in recovered:
+            product = cached.match(title)
+            print(f"  {title!r} -> {cached.model_name(product.model_code)}, {cached.memory_name(product.memory_code)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Сравнение pickle-модели RandomForestRegressor и ее скомпилированной версии
+из src.ml.compiled_forest: размер файла, время загрузки и предсказания.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_compiled_forest [--model models/price_predictor_model.pkl] [--repeat N]
+
+Без --model обучается синтетическая модель той же формы (benchmarks/model_fixtures.py).
+"""
+import argparse
+import tempfile
+import time
+import warnings
+from pathlib import Path
+from typing import Callable
+
+import joblib
+import numpy as np
+
+from benchmarks.model_fixtures import build_model
+from src.ml.compiled_forest import CompiledForest, export_model, meta_path_for
+
+
+def _best_of(func: Callable, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def run(model_path: Path, repeat: int) -> None:
+    warnings.filterwarnings("ignore", message="X does not have valid feature names")
+    forest_path = model_path.with_name("price_predictor_forest.npy")
+    export_model(str(model_path), str(forest_path))
+
+    model = joblib.load(model_path)
+    forest = CompiledForest.load(str(forest_path))
+    pickle_size = model_path.stat().st_size
+    forest_size = forest_path.stat().st_size + Path(meta_path_for(str(forest_path))).stat().st_size
+    print(f"Деревьев: {forest.n_trees}, узлов: {len(forest.nodes)}, глубина: {forest.max_depth}")
+    print(f"Размер:   pickle {pickle_size / 1024:9.1f} КБ, лес {forest_size / 1024:9.1f} КБ")
+
+    load_pickle = _best_of(lambda: joblib.load(model_path), repeat)
+    load_forest = _best_of(lambda: CompiledForest.load(str(forest_path)), repeat)
+    print(f"Загрузка: pickle {load_pickle * 1000:9.1f} мс, лес {load_forest * 1000:9.2f} мс")
+
+    rng = np.random.default_rng(0)
+    for rows in (50, 1_000, 100_000):
+        features = rng.integers(0, 2, size=(rows, forest.n_features)).astype(np.float32)
+        diff = np.max(np.abs(model.predict(features) - forest.predict(features)))
+        sklearn_time = _best_of(lambda: model.predict(features), repeat)
+        forest_time = _best_of(lambda: forest.predict(features), repeat)
+        print(f"{rows:>8} строк: sklearn {sklearn_time * 1000:9.1f} мс, лес {forest_time * 1000:9.1f} мс, "
+              f"расхождение {diff:.2e}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", type=Path, default=None)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.model:
+            model_path = Path(tmp) / args.model.name
+            model_path.write_bytes(args.model.read_bytes())
+        else:
+            model_path, _ = build_model(Path(tmp), rows=20_000)
+        run(model_path, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Во что обходится чтение config.yaml при разборе DAG и в рабочем коде.
+
+1. Разбор DAG. Каждый замер идет в свежем интерпретаторе, как у процесса
+   разбора DAG в планировщике Airflow:
+     - settings — прежний путь DAG: импорт src.core.config, создание Settings
+       (чтение .env), логгер приложения с файловым обработчиком;
+     - dag_setting — новый путь через src.core.config_file.
+   Если установлен Airflow, дополнительно измеряется импорт самих файлов dags/.
+2. Геттеры настроек: разбор файла при каждом вызове (как было раньше) против
+   кэшированного типизированного конфига.
+
+Запуск из корня репозитория (нужны переменные окружения для Settings, как в .env):
+    python -m benchmarks.bench_dag_parse [--repeat N] [--calls N]
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import yaml
+
+ROOT = Path(__file__).resolve().parent.parent
+
+SNIPPETS = {
+    "settings": (
+        "from src.core.config import settings\n"
+        "settings.get_schedule_interval()\n"
+        "settings.get_max_parallel_units()\n"
+    ),
+    "dag_setting": (
+        "from src.core.config_file import dag_setting\n"
+        "dag_setting('airflow', 'schedule_interval')\n"
+        "dag_setting('distributed', 'max_parallel_units', 4)\n"
+    ),
+}
+
+PROBE = """
+import json, logging, sys, time
+started = time.perf_counter()
+{body}
+elapsed = time.perf_counter() - started
+print(json.dumps({{
+    "seconds": elapsed,
+    "modules": len(sys.modules),
+    "app_logger": bool(logging.getLogger("IntelligentDealFinder").handlers),
+    "settings": "src.core.config" in sys.modules,
+}}))
+"""
+
+
+def run_probe(body: str) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE.format(body=body)], cwd=ROOT, check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def best_probe(body: str, repeat: int) -> dict:
+    return min((run_probe(body) for _ in range(repeat)), key=lambda result: result["seconds"])
+
+
+def airflow_available() -> bool:
+    return subprocess.run([sys.executable, "-c", "import airflow"], cwd=ROOT, capture_output=True).returncode == 0
+
+
+def bench_parse(repeat: int) -> None:
+    print("Разбор DAG (свежий интерпретатор, лучший из повторов):")
+    for name, body in SNIPPETS.items():
+        result = best_probe(body, repeat)
+        print(
+            f"  {name:12s} {result['seconds'] * 1000:8.1f} мс, модулей {result['modules']}, "
+            f"Settings: {'да' if result['settings'] else 'нет'}, логгер приложения: {'да' if result['app_logger'] else 'нет'}"
+        )
+
+    if not airflow_available():
+        print("  Airflow не установлен, импорт файлов dags/ не измеряется.")
+        return
+    airflow_import = best_probe("import airflow.decorators", repeat)["seconds"]
+    for dag_file in sorted((ROOT / "dags").glob("*.py")):
+        body = f"import airflow.decorators\nimport runpy\nrunpy.run_path({str(dag_file)!r})"
+        result = best_probe(body, repeat)
+        print(f"  {dag_file.name:32s} {(result['seconds'] - airflow_import) * 1000:8.1f} мс сверх импорта Airflow")
+
+
+def bench_getters(calls: int) -> None:
+    from src.core.config import settings
+    from src.core.config_file import find_config_path
+
+    path = find_config_path()
+    started = time.perf_counter()
+    for _ in range(calls):
+        with open(path, "r", encoding="utf-8") as f:
+            int(yaml.safe_load(f)["model"]["profit_threshold"])
+    reparse = time.perf_counter() - started
+
+    settings.get_profit_threshold()
+    started = time.perf_counter()
+    for _ in range(calls):
+        settings.get_profit_threshold()
+    cached = time.perf_counter() - started
+
+    print(f"Геттер настроек, {calls} вызовов:")
+    print(f"  разбор файла при каждом вызове {reparse * 1000:8.1f} мс ({reparse / calls * 1e6:.0f} мкс на вызов)")
+    print(f"  кэш с проверкой mtime          {cached * 1000:8.1f} мс ({cached / calls * 1e6:.1f} мкс на вызов)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--calls", type=int, default=1000)
+    args = parser.parse_args()
+
+    bench_parse(args.repeat)
+    bench_getters(args.calls)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Сравнение скорости извлечения карточек: старый путь (BeautifulSoup + ~10 find/select_one
+на карточку) против скомпилированного lxml/XPath-экстрактора из src.parsers.extractor.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_extraction [путь/к/странице.html ...] [--repeat N]
+
+Без аргументов используются сохраненные страницы из benchmarks/fixtures.
+Свою страницу можно сохранить через parse_avito_ads(url, save_html=True).
+"""
+import argparse
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Union
+
+from bs4 import BeautifulSoup
+
+from src.parsers.extractor import columns_to_records, extract_columns, parse_html
+from src.parsers.utils import parse_relative_date
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+
+def _legacy_parse_block(ad_block_soup: BeautifulSoup) -> Union[Dict, None]:
+    """Копия прежнего _parse_single_ad_block из Selenium-парсера, сохраненная как точка отсчета."""
+    base_url = "https://www.avito.ru"
+    try:
+        title_tag = ad_block_soup.find("a", {"data-marker": "item-title"})
+        avito_id_raw = ad_block_soup.get("id")
+        if not all([title_tag, avito_id_raw]):
+            return None
+
+        price = None
+        if price_tag := ad_block_soup.find("meta", {"itemprop": "price"}):
+            try:
+                price = int(price_tag["content"])
+            except (ValueError, TypeError):
+                pass
+
+        published_at = datetime.now()
+        if date_tag := ad_block_soup.find("p", {"data-marker": "item-date"}):
+            published_at = parse_relative_date(date_tag.text.strip()) or published_at
+
+        location = None
+        if location_tag := ad_block_soup.select_one('[class*="geo-root-"] span'):
+            location = location_tag.text.strip()
+        elif " в " in (full_title := title_tag.get("title", "")):
+            location = full_title.split(" в ")[-1].strip()
+
+        condition = None
+        if params_tag := ad_block_soup.find("p", {"data-marker": "item-specific-params"}):
+            params_text = params_tag.text.lower()
+            if "новый" in params_text or "новая" in params_text:
+                condition = "Новый"
+            elif "/" in params_text:
+                condition = "Б/у"
+
+        description = None
+        if description_tag := ad_block_soup.select_one('[class*="styles-module-root_bottom-"]'):
+            description = description_tag.text.strip()
+
+        seller_name = None
+        seller_rating = None
+        seller_reviews_count = None
+        seller_link = ad_block_soup.select_one('a[href*="/profile"], a[href*="/user/"], a[href*="/brands/"]')
+        if seller_link:
+            if p_tag := seller_link.find("p"):
+                seller_name = p_tag.text.strip()
+            if rating_tag := seller_link.select_one('[data-marker="seller-rating/score"]'):
+                try:
+                    seller_rating = float(rating_tag.text.strip().replace(",", "."))
+                except (ValueError, AttributeError):
+                    pass
+            if reviews_tag := seller_link.select_one('[data-marker="seller-info/summary"]'):
+                try:
+                    seller_reviews_count = int("".join(filter(str.isdigit, reviews_tag.text.strip())))
+                except (ValueError, AttributeError):
+                    pass
+
+        return {
+            "avito_id": int(avito_id_raw.lstrip("i")),
+            "title": title_tag.text.strip(),
+            "url": base_url + title_tag["href"],
+            "price": price,
+            "description": description,
+            "location": location,
+            "published_at": published_at,
+            "seller_name": seller_name,
+            "seller_rating": seller_rating,
+            "seller_reviews_count": seller_reviews_count,
+            "condition": condition,
+        }
+    except Exception:
+        return None
+
+
+def legacy_parse_page(page: bytes) -> List[Dict]:
+    soup = BeautifulSoup(page.decode("utf-8"), "lxml")
+    ads = (_legacy_parse_block(block) for block in soup.find_all("div", {"data-marker": "item"}))
+    return [ad for ad in ads if ad]
+
+
+def compiled_parse_page(page: bytes) -> List[Dict]:
+    return columns_to_records(extract_columns(parse_html(page)))
+
+
+def _comparable(ads: List[Dict]) -> List[Dict]:
+    return [{k: v for k, v in ad.items() if k != "published_at"} for ad in ads]
+
+
+def _measure(parse: Callable[[bytes], List[Dict]], pages: List[bytes], repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for page in pages:
+            parse(page)
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pages", nargs="*", type=Path)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    paths = args.pages or sorted(FIXTURES_DIR.glob("*.html"))
+    pages = [path.read_bytes() for path in paths]
+
+    for page, path in zip(pages, paths):
+        if _comparable(legacy_parse_page(page)) != _comparable(compiled_parse_page(page)):
+            raise SystemExit(f"Результаты парсинга расходятся на {path}")
+
+    cards = sum(len(compiled_parse_page(page)) for page in pages)
+    legacy = _measure(legacy_parse_page, pages, args.repeat)
+    compiled = _measure(compiled_parse_page, pages, args.repeat)
+    per_page = lambda total: total / (args.repeat * len(pages)) * 1000
+
+    print(f"Страниц: {len(pages)}, карточек: {cards}, повторов: {args.repeat}")
+    print(f"BeautifulSoup:      {per_page(legacy):8.2f} мс/страница")
+    print(f"lxml + XPath:       {per_page(compiled):8.2f} мс/страница")
+    print(f"Ускорение:          {legacy / compiled:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Сравнение кодирования признаков: прежний путь предсказателя (DataFrame + пять
+str.contains + pd.get_dummies + reindex) против FeatureEncoder из src.ml.features,
+который пишет сразу в заранее выделенную float32-матрицу.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_features [--sizes 1000 100000] [--repeat N]
+"""
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.model_fixtures import build_model, synthetic_ads
+from src.ml.features import FeatureEncoder
+
+
+def legacy_feature_engineering(df: pd.DataFrame) -> pd.DataFrame:
+    """Копия прежнего feature_engineering из src.ml.predictor, сохраненная как точка отсчета."""
+    df['description'] = df['description'].fillna('').str.lower()
+    keywords = {
+        'has_defect': 'дефект|разбит|царапин|трещин|менялся|ремонт',
+        'is_ideal': 'идеал|отличн|как нов',
+        'has_box': 'коробк',
+        'not_opened': 'не вскрывался|не ремонтировался',
+        'has_warranty': 'гаранти'
+    }
+    for feature, pattern in keywords.items():
+        df[feature] = df['description'].str.contains(pattern, regex=True).astype(int)
+    return df
+
+
+def legacy_encode(ads: List[Dict], model_columns: List[str]) -> np.ndarray:
+    df = legacy_feature_engineering(pd.DataFrame(ads))
+    df_encoded = pd.get_dummies(df, columns=['model', 'memory'])
+    return df_encoded.reindex(columns=model_columns, fill_value=0).to_numpy(dtype=np.float32)
+
+
+def _measure(encode: Callable[[], np.ndarray], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        encode()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        _, columns_path = build_model(Path(tmp), rows=2_000, n_estimators=5)
+        with open(columns_path) as f:
+            model_columns = json.load(f)
+    encoder = FeatureEncoder(model_columns)
+
+    for size in args.sizes:
+        ads = synthetic_ads(size, seed=size)
+        # Неизвестные категории должны давать нулевые one-hot столбцы, как и раньше.
+        ads[0] = dict(ads[0], model="iPhone 16", memory="2 ТБ")
+
+        if not np.array_equal(legacy_encode(ads, model_columns), encoder.transform(ads)):
+            raise SystemExit(f"Матрицы признаков расходятся на {size} строках")
+
+        legacy = _measure(lambda: legacy_encode(ads, model_columns), args.repeat)
+        fast = _measure(lambda: encoder.transform(ads), args.repeat)
+        print(f"{size:>8} строк: pandas {legacy * 1000:9.1f} мс, FeatureEncoder {fast * 1000:9.1f} мс, "
+              f"ускорение {legacy / fast:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
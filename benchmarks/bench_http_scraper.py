@@ -0,0 +1,68 @@
+"""
+Сравнение старого requests-парсера (новый requests.get на каждый URL, без Session)
+с асинхронным httpx-бэкендом на локальной заглушке Avito.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_http_scraper [--urls 20] [--latency 0.2] [--throttle-every 7]
+
+Паузы 7–12 с старого парсера в замер не входят: они оцениваются отдельно.
+"""
+import argparse
+import asyncio
+import time
+from pathlib import Path
+
+import httpx
+import requests
+
+from benchmarks.stub_servers import avito_stub_server
+from src.parsers.avito_async_parser import parse_avito_ads_async
+from src.parsers.extractor import columns_to_records, extract_columns, parse_html
+
+FIXTURE = Path(__file__).parent / "fixtures" / "avito_listing_page.html"
+
+
+def legacy_fetch_all(urls):
+    ads = []
+    for url in urls:
+        response = requests.get(url)
+        response.raise_for_status()
+        ads.extend(columns_to_records(extract_columns(parse_html(response.content))))
+    return ads
+
+
+async def async_fetch_all(urls, max_connections):
+    async with httpx.AsyncClient(limits=httpx.Limits(max_connections=max_connections)) as client:
+        return await parse_avito_ads_async(
+            urls, requests_per_minute=60_000, max_connections=max_connections, client=client
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--urls", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--connections", type=int, default=8)
+    parser.add_argument("--throttle-every", type=int, default=0)
+    args = parser.parse_args()
+
+    with avito_stub_server(FIXTURE.read_bytes(), latency=args.latency, throttle_every=args.throttle_every) as base:
+        urls = [f"{base}/moskva/telefony?p={n}" for n in range(1, args.urls + 1)]
+
+        started = time.perf_counter()
+        legacy_ads = legacy_fetch_all(urls) if not args.throttle_every else []
+        legacy = time.perf_counter() - started
+
+        started = time.perf_counter()
+        async_ads = asyncio.run(async_fetch_all(urls, args.connections))
+        concurrent = time.perf_counter() - started
+
+    print(f"URL: {args.urls}, задержка сервера: {args.latency:.2f} с")
+    if not args.throttle_every:
+        print(f"requests.get подряд:   {legacy:6.2f} с ({len(legacy_ads)} объявлений)")
+        print(f"  + паузы 7–12 с:      ~{legacy + 9.5 * args.urls:6.1f} с")
+    print(f"httpx, пул {args.connections:2d} соед.:  {concurrent:6.2f} с ({len(async_ads)} объявлений)")
+
+
+if __name__ == "__main__":
+    main()
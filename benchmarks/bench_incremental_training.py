@@ -0,0 +1,86 @@
+"""
+Дообучение леса на свежих данных (src.ml.train.update_model) против полного
+переобучения на всей истории: время и MAE на отложенных свежих объявлениях.
+
+Синтетические объявления упорядочены по avito_id, а цены со временем дрейфуют
+вниз (как у старых моделей iPhone). Первые 90% строк — история, на которой
+обучена текущая модель, последние 10% — новые объявления; пятая часть новых
+откладывается для оценки.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_incremental_training [--sizes 10000 100000 1000000]
+"""
+import argparse
+import copy
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.metrics import mean_absolute_error
+
+from benchmarks.model_fixtures import synthetic_ads
+from src.ml.features import KeywordMatcher
+from src.ml.train import build_design_matrix, update_model
+
+DRIFT = 0.25
+
+
+def drifting_frame(rows: int) -> pd.DataFrame:
+    df = pd.DataFrame(synthetic_ads(rows, seed=rows))[["avito_id", "model", "memory", "description", "price"]]
+    df["price"] = (df["price"] * (1.0 - DRIFT * np.arange(rows) / rows)).astype(np.int64)
+    matcher = KeywordMatcher()
+    flags = matcher.matrix(df.pop("description"))
+    for idx, flag in enumerate(matcher.flags):
+        df[flag] = flags[:, idx]
+    return df
+
+
+def _fit_forest(X: pd.DataFrame, y: pd.Series, n_estimators: int = 100) -> RandomForestRegressor:
+    model = RandomForestRegressor(n_estimators=n_estimators, random_state=42, n_jobs=-1)
+    return model.fit(X, y)
+
+
+def run(rows: int, new_trees: int, max_trees: int) -> None:
+    df = drifting_frame(rows)
+    X, y = build_design_matrix(df)
+    columns = list(X.columns)
+
+    split = int(rows * 0.9)
+    rng = np.random.default_rng(0)
+    is_test = np.zeros(rows, dtype=bool)
+    is_test[split:] = rng.random(rows - split) < 0.2
+    history = np.arange(rows) < split
+    fresh = ~history & ~is_test
+
+    base = _fit_forest(X[history], y[history], max_trees)
+    mae = lambda model: mean_absolute_error(y[is_test], model.predict(X[is_test]))
+
+    started = time.perf_counter()
+    full = _fit_forest(X[history | fresh], y[history | fresh], max_trees)
+    full_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    updated = update_model(copy.deepcopy(base), columns, X[fresh], y[fresh], new_trees, max_trees, random_state=7)
+    update_time = time.perf_counter() - started
+
+    print(f"{rows:>9} строк | без обновления: MAE {mae(base):9,.0f} | "
+          f"полное: {full_time:7.2f} с, MAE {mae(full):9,.0f} | "
+          f"дообучение (+{new_trees} деревьев): {update_time:6.2f} с, MAE {mae(updated):9,.0f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--new-trees", type=int, default=20)
+    parser.add_argument("--max-trees", type=int, default=100)
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore", message="X does not have valid feature names")
+
+    for rows in args.sizes:
+        run(rows, args.new_trees, args.max_trees)
+
+
+if __name__ == "__main__":
+    main()
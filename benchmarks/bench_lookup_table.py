@@ -0,0 +1,70 @@
+"""
+Сравнение табличного предсказателя (src.ml.lookup_table) с живой моделью:
+время построения таблицы и время предсказания по уже закодированным признакам.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_lookup_table [--repeat N]
+"""
+import argparse
+import json
+import tempfile
+import time
+import warnings
+from pathlib import Path
+from typing import Callable
+
+import joblib
+import numpy as np
+
+from benchmarks.model_fixtures import build_model, synthetic_ads
+from src.ml.compiled_forest import CompiledForest
+from src.ml.features import FeatureEncoder
+from src.ml.lookup_table import PriceTable, verify_table
+
+
+def _best_of(func: Callable, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore", message="X does not have valid feature names")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path, columns_path = build_model(Path(tmp), rows=20_000)
+        model = joblib.load(model_path)
+        with open(columns_path) as f:
+            model_columns = json.load(f)
+
+    forest = CompiledForest.from_sklearn(model)
+    started = time.perf_counter()
+    table = PriceTable.build(forest, model_columns, fallback=model)
+    print(f"Таблица: {table.n_entries} комбинаций, {table.values.nbytes / 1024:.1f} КБ, "
+          f"построена за {(time.perf_counter() - started) * 1000:.1f} мс, "
+          f"расхождение с sklearn {verify_table(table, model):.2e}")
+
+    encoder = FeatureEncoder(model_columns)
+    for rows in (50, 1_000, 100_000):
+        features = encoder.transform(synthetic_ads(rows, seed=rows))
+        diff = np.max(np.abs(model.predict(features) - table.predict(features)))
+        sklearn_time = _best_of(lambda: model.predict(features), args.repeat)
+        forest_time = _best_of(lambda: forest.predict(features), args.repeat)
+        table_time = _best_of(lambda: table.predict(features), args.repeat)
+        print(f"{rows:>8} строк: sklearn {sklearn_time * 1000:8.2f} мс, лес {forest_time * 1000:8.2f} мс, "
+              f"таблица {table_time * 1000:8.3f} мс, расхождение {diff:.2e}")
+
+    odd = encoder.transform(synthetic_ads(10))
+    odd[0, :] = 0.5
+    if not np.allclose(table.predict(odd), model.predict(odd)):
+        raise SystemExit("Строки вне таблицы должны уходить в живую модель")
+
+
+if __name__ == "__main__":
+    main()
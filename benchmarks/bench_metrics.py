@@ -0,0 +1,123 @@
+"""
+Накладные расходы инструментирования на горячем пути.
+
+1. metrics.timer / metrics.inc: сколько стоит один замер этапа и один счетчик.
+2. log.info: прежний синхронный FileHandler + StreamHandler (запись в файл и
+   вывод прямо в вызывающем потоке) против QueueHandler, за которым пишет
+   отдельный поток QueueListener, как в src.core.logger. Вывод идет во
+   временный файл и в /dev/null вместо stdout, а во втором замере — в поток
+   с задержкой записи (заполненный pipe захвата логов, медленный диск). Время
+   очереди — это время, которое тратит вызывающий поток; сколько заняло
+   дописывание очереди после цикла, печатается отдельно.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_metrics [--calls N] [--sink-delay-us N]
+"""
+import argparse
+import io
+import logging
+import logging.handlers
+import os
+import queue
+import tempfile
+import time
+
+from src.core.metrics import MetricsRegistry
+
+FORMAT = "%(asctime)s - %(name)s - [%(levelname)s] - %(message)s (%(filename)s:%(lineno)d)"
+
+
+def bench_registry(calls: int) -> None:
+    registry = MetricsRegistry()
+    started = time.perf_counter()
+    for _ in range(calls):
+        with registry.timer("page_load"):
+            pass
+    timer = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for _ in range(calls):
+        registry.inc("pages")
+    counter = time.perf_counter() - started
+
+    started = time.perf_counter()
+    registry.to_prometheus(task="bench")
+    export = time.perf_counter() - started
+    print(f"metrics.timer: {timer / calls * 1e6:.2f} мкс, metrics.inc: {counter / calls * 1e6:.2f} мкс, "
+          f"снимок Prometheus: {export * 1000:.2f} мс")
+
+
+class SlowStream(io.StringIO):
+    """Поток, каждая запись в который занимает `delay` секунд."""
+
+    def __init__(self, delay: float):
+        super().__init__()
+        self.delay = delay
+
+    def write(self, text: str) -> int:
+        time.sleep(self.delay)
+        return len(text)
+
+
+def _handlers(directory: str, delay: float = 0.0):
+    formatter = logging.Formatter(FORMAT)
+    file_handler = logging.FileHandler(os.path.join(directory, "app.log"), encoding="utf-8")
+    stream_handler = logging.StreamHandler(SlowStream(delay) if delay else open(os.devnull, "w"))
+    for handler in (file_handler, stream_handler):
+        handler.setFormatter(formatter)
+    return file_handler, stream_handler
+
+
+def _run(logger: logging.Logger, calls: int) -> float:
+    started = time.perf_counter()
+    for idx in range(calls):
+        logger.info(f"Страница {idx} догружена за 1.23 с (50 карточек, прокруток: 2)")
+    return time.perf_counter() - started
+
+
+def bench_logging(calls: int, delay: float = 0.0) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        sync_logger = logging.getLogger(f"bench.sync.{delay}")
+        sync_logger.propagate = False
+        sync_logger.setLevel(logging.INFO)
+        handlers = _handlers(directory, delay)
+        for handler in handlers:
+            sync_logger.addHandler(handler)
+        sync = _run(sync_logger, calls)
+        for handler in handlers:
+            handler.close()
+
+        queued_logger = logging.getLogger(f"bench.queue.{delay}")
+        queued_logger.propagate = False
+        queued_logger.setLevel(logging.INFO)
+        log_queue = queue.SimpleQueue()
+        handlers = _handlers(directory, delay)
+        listener = logging.handlers.QueueListener(log_queue, *handlers)
+        listener.start()
+        queued_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+        queued = _run(queued_logger, calls)
+        started = time.perf_counter()
+        listener.stop()
+        drain = time.perf_counter() - started
+        for handler in handlers:
+            handler.close()
+
+    sink = f"вывод с задержкой {delay * 1e6:.0f} мкс на запись" if delay else "быстрый вывод"
+    print(f"log.info, {calls} вызовов, {sink}:")
+    print(f"  синхронные обработчики  {sync / calls * 1e6:7.2f} мкс на вызов")
+    print(f"  очередь + поток         {queued / calls * 1e6:7.2f} мкс на вызов (дописывание после цикла {drain * 1000:.1f} мс)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=20_000)
+    parser.add_argument("--sink-delay-us", type=float, default=100.0)
+    args = parser.parse_args()
+
+    bench_registry(args.calls)
+    bench_logging(args.calls)
+    bench_logging(min(args.calls, 2_000), args.sink_delay_us / 1e6)
+
+
+if __name__ == "__main__":
+    main()
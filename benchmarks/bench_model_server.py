@@ -0,0 +1,101 @@
+"""
+Холодный старт против теплого сервера модели.
+
+Холодный путь — то, что делает каждая задача predict_and_filter_task без сервера:
+новый интерпретатор, импорт pandas/sklearn, распаковка модели, предсказание.
+Теплый путь — HTTP-запрос к уже запущенному src.ml.model_server.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_model_server [--model путь.pkl --columns путь.json] [--batch 50]
+
+Без --model обучается синтетическая модель той же формы (100 деревьев).
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+
+from benchmarks.model_fixtures import build_model, synthetic_ads
+from src.ml.client import predict_prices_remote
+from src.ml.model_server import make_handler
+from src.ml.predictor import ModelHolder
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+COLD_SCRIPT = """
+import json, sys
+from src.ml.predictor import ModelHolder, predict_prices
+ads = json.load(sys.stdin)
+predict_prices(ads, ModelHolder(sys.argv[1], sys.argv[2]))
+"""
+
+
+def measure_cold(model_path: str, columns_path: str, payload: str, runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-c", COLD_SCRIPT, model_path, columns_path],
+            input=payload.encode("utf-8"),
+            check=True,
+            stdout=subprocess.DEVNULL,
+            env={**os.environ, "PYTHONPATH": str(REPO_ROOT)},
+        )
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def measure_warm(model_path: str, columns_path: str, ads, runs: int) -> float:
+    holder = ModelHolder(model_path, columns_path)
+    holder.get()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(holder))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}"
+    try:
+        predict_prices_remote(ads, base_url=url)
+        timings = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            predict_prices_remote(ads, base_url=url)
+            timings.append(time.perf_counter() - started)
+    finally:
+        server.shutdown()
+        server.server_close()
+    return statistics.median(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model")
+    parser.add_argument("--columns")
+    parser.add_argument("--batch", type=int, default=50)
+    parser.add_argument("--cold-runs", type=int, default=3)
+    parser.add_argument("--warm-runs", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.model and args.columns:
+            model_path, columns_path = Path(args.model), Path(args.columns)
+        else:
+            model_path, columns_path = build_model(Path(tmp))
+
+        ads = synthetic_ads(args.batch, seed=7)
+        payload = json.dumps(ads)
+        cold = measure_cold(str(model_path), str(columns_path), payload, args.cold_runs)
+        warm = measure_warm(str(model_path), str(columns_path), ads, args.warm_runs)
+
+        print(f"Модель: {model_path.stat().st_size / 1e6:.1f} МБ, пакет: {args.batch} объявлений")
+        print(f"Холодный старт (процесс + импорт + загрузка + предсказание): {cold * 1000:8.1f} мс")
+        print(f"Теплый сервер (HTTP-запрос):                                 {warm * 1000:8.1f} мс")
+        print(f"Разница: {cold / warm:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Сравнение старой отправки уведомлений (requests.post на каждое объявление,
+без сессии и без обработки 429) с асинхронным TelegramNotifier на локальной
+заглушке Bot API, которая, как Telegram, отвечает 429 при превышении лимита чата.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_notifier [--deals 20] [--chat-rate 10] [--batch-size 5]
+"""
+import argparse
+import asyncio
+import time
+
+import requests
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.stub_servers import telegram_stub_server
+from src.core.notifier import TelegramNotifier, format_deal, notify_deals
+from src.db.models import Base
+
+CHAT_ID = "1"
+
+
+def synthetic_deals(count: int):
+    return [
+        {
+            "avito_id": 1_000 + n,
+            "title": f"iPhone 13 Pro, {128 * (1 + n % 3)} ГБ",
+            "price": 50_000 + n * 100,
+            "predicted_price": 60_000 + n * 100,
+            "profit": 10_000,
+            "url": f"https://www.avito.ru/moskva/telefony/iphone_{1_000 + n}",
+        }
+        for n in range(count)
+    ]
+
+
+def legacy_send_all(base: str, deals) -> int:
+    delivered = 0
+    for ad in deals:
+        response = requests.post(
+            f"{base}/botTOKEN/sendMessage",
+            params={"chat_id": CHAT_ID, "text": format_deal(ad), "parse_mode": "HTML"},
+        )
+        delivered += response.ok
+    return delivered
+
+
+def run_notifier(base: str, deals, chat_rate: float, batch_size: int, db=None):
+    async def run():
+        async with TelegramNotifier("TOKEN", api_base=base, per_chat_rate=chat_rate) as notifier:
+            return await notify_deals(notifier, [CHAT_ID], deals, batch_size=batch_size, db=db)
+
+    return asyncio.run(run())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--deals", type=int, default=20)
+    parser.add_argument("--chat-rate", type=float, default=10.0, help="Лимит заглушки и нотификатора, сообщений/с на чат")
+    parser.add_argument("--batch-size", type=int, default=5)
+    args = parser.parse_args()
+    deals = synthetic_deals(args.deals)
+
+    with telegram_stub_server(per_chat_rate=args.chat_rate, retry_after=1) as (base, messages):
+        started = time.perf_counter()
+        delivered = legacy_send_all(base, deals)
+        elapsed = time.perf_counter() - started
+        throttled = sum(1 for message in messages if message.get("throttled"))
+        print(f"legacy requests.post:     {elapsed:6.2f} s, доставлено {delivered}/{len(deals)}, 429: {throttled}")
+
+    for batch_size in (1, args.batch_size):
+        with telegram_stub_server(per_chat_rate=args.chat_rate, retry_after=1) as (base, messages):
+            started = time.perf_counter()
+            summary = run_notifier(base, deals, args.chat_rate, batch_size)
+            elapsed = time.perf_counter() - started
+            print(f"notifier batch_size={batch_size:<3}: {elapsed:6.2f} s, доставлено {summary['sent']}/{len(deals)} "
+                  f"в {summary['messages']} сообщениях, 429: {summary['throttled']}")
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with telegram_stub_server(per_chat_rate=args.chat_rate) as (base, messages), sessionmaker(bind=engine)() as db:
+        first = run_notifier(base, deals[: len(deals) // 2], args.chat_rate, 1, db)
+        retry = run_notifier(base, deals, args.chat_rate, 1, db)
+        print(f"повтор задачи с журналом: первый запуск {first['sent']}, повтор отправил {retry['sent']}, "
+              f"пропустил {retry['skipped']}; всего сообщений на сервере {len(messages)}")
+
+
+if __name__ == "__main__":
+    main()
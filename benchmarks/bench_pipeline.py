@@ -0,0 +1,115 @@
+"""
+Время до первого уведомления: пакетная цепочка DAG (сначала все страницы, потом
+сохранение, предсказание и отправка) против потокового режима src.core.pipeline
+на заглушках с заданными задержками. Накладные расходы Airflow (запуск задач,
+планировщик, XCom) в пакетный замер не входят, так что разница занижена.
+
+Затем проверяется, что сбой не теряет объявления: на заглушках по одному
+разу падают сохранение, предсказание и отправка; прогон должен насчитать
+ошибку, а все сохраненные, но не отправленные выгодные объявления — попасть
+в `unfinished` и уйти в следующем прогоне (аргумент `carried`).
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_pipeline [--pages 3] [--page-delay 1.0]
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.model_fixtures import synthetic_ads
+from src.core.logger import flush_logs
+from src.core.pipeline import run_stream
+
+
+def make_steps(args):
+    ads = synthetic_ads(args.pages * args.per_page)
+
+    def pages():
+        for page_num in range(1, args.pages + 1):
+            time.sleep(args.page_delay)
+            start = (page_num - 1) * args.per_page
+            yield page_num, ads[start:start + args.per_page]
+
+    def store(page_ads):
+        time.sleep(args.step_delay)
+        return page_ads
+
+    def predict(stored):
+        time.sleep(args.step_delay)
+        return stored[::10]
+
+    async def notify(deals):
+        await asyncio.sleep(args.step_delay)
+        return len(deals)
+
+    return pages, store, predict, notify
+
+
+def batch_first_notification(args) -> float:
+    pages, store, predict, notify = make_steps(args)
+    started = time.monotonic()
+    all_ads = [ad for _, page_ads in pages() for ad in page_ads]
+    deals = predict(store(all_ads))
+    asyncio.run(notify(deals))
+    return time.monotonic() - started
+
+
+def stream_first_notification(args) -> float:
+    pages, store, predict, notify = make_steps(args)
+    stats = asyncio.run(run_stream(pages(), notify, lambda page_ads: page_ads, store, predict))
+    return stats.first_notification_after
+
+
+def check_recovery(per_page: int = 10) -> None:
+    ads = synthetic_ads(3 * per_page)
+    expected = {ad["avito_id"] for ad in ads[::2]}
+    for step in ("store", "predict", "notify"):
+        fail = {step: 1}
+        db, notified = set(), []
+
+        def maybe_fail(name):
+            if fail.get(name):
+                fail[name] -= 1
+                raise RuntimeError(f"сбой на шаге {name}")
+
+        def store(page_ads):
+            maybe_fail("store")
+            new = [ad for ad in page_ads if ad["avito_id"] not in db]
+            db.update(ad["avito_id"] for ad in new)
+            return new
+
+        def predict(stored):
+            maybe_fail("predict")
+            return [ad for ad in stored if ad["avito_id"] in expected]
+
+        async def notify(deals):
+            maybe_fail("notify")
+            notified.extend(ad["avito_id"] for ad in deals)
+            return len(deals)
+
+        carried = None
+        for _ in range(2):
+            pages = ((n + 1, ads[n * per_page:(n + 1) * per_page]) for n in range(3))
+            stats = asyncio.run(run_stream(pages, notify, list, store, predict, carried=carried))
+            carried = stats.unfinished
+        if set(notified) != expected or len(notified) != len(expected) or carried:
+            raise SystemExit(f"Сбой на шаге {step}: отправлено {len(set(notified))} из {len(expected)} выгодных")
+    flush_logs()
+    print("сбои сохранения, предсказания и отправки: все выгодные объявления отправлены со второго прогона")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=3)
+    parser.add_argument("--per-page", type=int, default=50)
+    parser.add_argument("--page-delay", type=float, default=1.0, help="Загрузка одной страницы, с")
+    parser.add_argument("--step-delay", type=float, default=0.1, help="Сохранение/предсказание/отправка, с")
+    args = parser.parse_args()
+
+    print(f"пакетный режим:  первое уведомление через {batch_first_notification(args):.2f} с")
+    print(f"потоковый режим: первое уведомление через {stream_first_notification(args):.2f} с")
+    check_recovery()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Время запуска точек входа сборщика и предсказателя.
+
+1. Профиль импорта (`python -X importtime`) для каждой точки входа в свежем
+   интерпретаторе: общее время и самые дорогие пакеты верхнего уровня
+   (сумма собственного времени их модулей).
+2. `--check`: бюджет запуска для пути «новых объявлений нет». В свежем
+   интерпретаторе выполняется то же, что в запуске DAG без находок: импорт
+   src.core.worker, process_ads (сбор подменен пустым списком — сеть и браузер
+   в бюджет не входят), пустой пакет, чтение его предсказателем
+   (src.ml.client) и пустой пакет выгодных. Проверка падает (код выхода 1),
+   если путь занял дольше `--budget-ms` или загрузил один из тяжелых модулей
+   (pandas, SQLAlchemy, Selenium, scikit-learn, joblib, requests).
+
+Запуск из корня репозитория (нужны переменные окружения для Settings, как в .env):
+    python -m benchmarks.bench_startup [--top N]
+    python -m benchmarks.bench_startup --check [--budget-ms MS] [--repeat N]
+"""
+import argparse
+import json
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+ENTRY_POINTS = ["src.core.worker", "src.ml.client", "src.ml.predictor", "src.core.distributed"]
+
+# Без новых объявлений ни один из этих пакетов не нужен.
+HEAVY_MODULES = ["pandas", "sqlalchemy", "selenium", "sklearn", "joblib", "requests"]
+
+# Около 250 мс на текущем дереве (большая часть — pydantic в src.core.config);
+# до ленивых импортов тот же путь занимал больше секунды.
+DEFAULT_BUDGET_MS = 600.0
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+
+NO_NEW_ADS_PROBE = """
+import json, sys, tempfile, time
+started = time.perf_counter()
+import src.core.worker as worker
+from src.core.batches import cleanup_batches, read_records, write_batch
+
+batch_dir = tempfile.mkdtemp(prefix="bench_startup_")
+worker.collect_ads = lambda searches=None: []
+cleanup_batches(batch_dir)
+path = write_batch(worker.process_ads(), "bench", batch_dir=batch_dir)
+
+from src.ml.client import predict_and_filter
+new_ads = read_records(path)
+profitable = predict_and_filter(new_ads) if new_ads else []
+write_batch(profitable, "bench", name="profitable", batch_dir=batch_dir)
+elapsed = time.perf_counter() - started
+
+import shutil
+shutil.rmtree(batch_dir, ignore_errors=True)
+print(json.dumps({{"seconds": elapsed, "loaded": [name for name in {heavy!r} if name in sys.modules]}}))
+"""
+
+
+def import_profile(module: str) -> dict:
+    """Разбирает вывод `-X importtime`: общее время и собственное время по пакетам верхнего уровня (мкс)."""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, check=True, capture_output=True, text=True,
+    ).stderr
+    total = 0
+    by_package = defaultdict(int)
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        by_package[name.split(".")[0]] += int(self_us)
+        if name == module:
+            total = int(cumulative_us)
+    return {"total": total, "by_package": dict(by_package)}
+
+
+def bench_profile(top: int) -> None:
+    print("Профиль импорта (-X importtime, свежий интерпретатор):")
+    for module in ENTRY_POINTS:
+        profile = import_profile(module)
+        print(f"  {module:24s} {profile['total'] / 1000:8.1f} мс")
+        heaviest = sorted(profile["by_package"].items(), key=lambda item: item[1], reverse=True)[:top]
+        for package, self_us in heaviest:
+            print(f"      {package:20s} {self_us / 1000:8.1f} мс")
+
+
+def run_no_new_ads() -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", NO_NEW_ADS_PROBE.format(heavy=HEAVY_MODULES)],
+        cwd=ROOT, check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def check_budget(budget_ms: float, repeat: int) -> bool:
+    """Лучшее время из `repeat` запусков пути без новых объявлений против бюджета."""
+    results = [run_no_new_ads() for _ in range(repeat)]
+    best = min(results, key=lambda result: result["seconds"])
+    elapsed_ms = best["seconds"] * 1000
+    loaded = sorted({name for result in results for name in result["loaded"]})
+
+    print(f"Путь без новых объявлений: {elapsed_ms:.1f} мс (лучший из {repeat}), бюджет {budget_ms:.0f} мс")
+    ok = True
+    if loaded:
+        print(f"  ОШИБКА: загружены тяжелые модули: {', '.join(loaded)}")
+        ok = False
+    if elapsed_ms > budget_ms:
+        print(f"  ОШИБКА: бюджет превышен на {elapsed_ms - budget_ms:.1f} мс")
+        ok = False
+    if ok:
+        print("  В пределах бюджета.")
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top", type=int, default=5, help="сколько самых дорогих пакетов показывать")
+    parser.add_argument("--check", action="store_true", help="проверить бюджет запуска")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.check:
+        sys.exit(0 if check_budget(args.budget_ms, args.repeat) else 1)
+    bench_profile(args.top)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Наблюдатель (src.core.watcher) на заглушках вместо браузера, БД, модели и
+Telegram: сколько стоит один опрос без новых объявлений и с ними, и что
+объявления не теряются при сбоях.
+
+1. Опросы первой страницы из 50 объявлений: все уже обработаны (отсекаются
+   в памяти) и все новые (проходят сохранение, предсказание и отправку).
+2. Сбои: сохранение падает один раз — объявление уходит в БД на следующем
+   опросе; предсказание и отправка падают один раз — уже сохраненное
+   объявление (store второй раз его не вернет) отправляется на следующем.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_watcher [--polls N] [--ads N]
+"""
+import argparse
+import asyncio
+import time
+from typing import Dict, List, Optional
+
+from src.core.logger import flush_logs
+from src.core.watcher import Watcher
+
+URL = "https://www.avito.ru/stub"
+
+
+class StubSteps:
+    """Шаги наблюдателя; `store` ведет себя как store_ads(raise_errors=True)."""
+
+    def __init__(self, page: List[Dict], fail: Optional[Dict[str, int]] = None):
+        self.page = page
+        self.fail = dict(fail or {})
+        self.db: Dict[int, int] = {}
+        self.notified: List[int] = []
+
+    def _maybe_fail(self, step: str) -> None:
+        if self.fail.get(step):
+            self.fail[step] -= 1
+            raise RuntimeError(f"сбой на шаге {step}")
+
+    def scrape(self, url: str) -> List[Dict]:
+        return self.page
+
+    def prepare(self, ads: List[Dict]) -> List[Dict]:
+        return list(ads)
+
+    def store(self, ads: List[Dict]) -> List[Dict]:
+        self._maybe_fail("store")
+        new = [ad for ad in ads if ad["avito_id"] not in self.db]
+        self.db.update((ad["avito_id"], ad["price"]) for ad in new)
+        return new
+
+    def predict(self, ads: List[Dict]) -> List[Dict]:
+        self._maybe_fail("predict")
+        return list(ads)
+
+    async def notify(self, deals: List[Dict]) -> int:
+        self._maybe_fail("notify")
+        self.notified.extend(ad["avito_id"] for ad in deals)
+        return len(deals)
+
+
+def make_watcher(steps: StubSteps) -> Watcher:
+    return Watcher([URL], steps.scrape, steps.prepare, steps.store, steps.predict, steps.notify)
+
+
+def synthetic_page(count: int, start: int = 0) -> List[Dict]:
+    return [{"avito_id": start + n, "title": "iPhone 13, 128 ГБ", "price": 50_000} for n in range(count)]
+
+
+async def bench_polls(polls: int, ads: int) -> None:
+    steps = StubSteps(synthetic_page(ads))
+    watcher = make_watcher(steps)
+    await watcher.poll_once()
+    started = time.perf_counter()
+    for _ in range(polls):
+        await watcher.poll_once()
+    known = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for idx in range(polls):
+        steps.page = synthetic_page(ads, start=(idx + 1) * ads)
+        await watcher.poll_once()
+    fresh = time.perf_counter() - started
+    flush_logs()
+    print(f"Опрос {ads} объявлений: все известны {known / polls * 1000:.3f} мс, "
+          f"все новые {fresh / polls * 1000:.3f} мс.")
+
+
+async def check_recovery() -> None:
+    for step in ("store", "predict", "notify"):
+        steps = StubSteps(synthetic_page(1), fail={step: 1})
+        watcher = make_watcher(steps)
+        await watcher.poll_once()
+        await watcher.poll_once()
+        if steps.notified != [0] or watcher.counters["errors"] != 1:
+            raise SystemExit(f"Сбой на шаге {step}: объявление потеряно (отправлено {steps.notified})")
+        await watcher.poll_once()
+        if steps.notified != [0]:
+            raise SystemExit(f"Сбой на шаге {step}: объявление отправлено повторно ({steps.notified})")
+    flush_logs()
+    print("Сбои сохранения, предсказания и отправки: объявление отправлено на следующем опросе.")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--polls", type=int, default=200)
+    parser.add_argument("--ads", type=int, default=50)
+    args = parser.parse_args()
+
+    asyncio.run(bench_polls(args.polls, args.ads))
+    asyncio.run(check_recovery())
+
+
+if __name__ == "__main__":
+    main()
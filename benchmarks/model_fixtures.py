@@ -0,0 +1,80 @@
+"""
+Синтетическая модель той же формы, что обучает notebooks/model_retraining.ipynb:
+RandomForestRegressor на one-hot признаках model/memory и пяти флагах из описания.
+Нужна бенчмаркам, когда настоящих файлов модели под рукой нет.
+"""
+import json
+import random
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+
+MODELS = [
+    "iPhone 11", "iPhone 11 Pro", "iPhone 11 Pro Max", "iPhone 12", "iPhone 12 mini", "iPhone 12 Pro",
+    "iPhone 12 Pro Max", "iPhone 13", "iPhone 13 mini", "iPhone 13 Pro", "iPhone 13 Pro Max", "iPhone 14",
+    "iPhone 14 Plus", "iPhone 14 Pro", "iPhone 14 Pro Max", "iPhone 15", "iPhone 15 Plus", "iPhone 15 Pro",
+    "iPhone 15 Pro Max", "iPhone XR", "iPhone XS", "iPhone SE",
+]
+MEMORIES = ["64 ГБ", "128 ГБ", "256 ГБ", "512 ГБ", "1 ТБ"]
+DESCRIPTIONS = [
+    "Телефон в идеальном состоянии, полный комплект, коробка и чек.",
+    "Есть царапины на корпусе, аккумулятор 86%. Не ремонтировался.",
+    "Новый, не вскрывался, гарантия Apple год.",
+    "Разбита задняя крышка, Face ID работает.",
+    "Отличное состояние, как новый. Менялся дисплей в сервисе.",
+    "Продаю в связи с покупкой нового. Торг уместен.",
+    None,
+]
+FLAGS = ["has_defect", "is_ideal", "has_box", "not_opened", "has_warranty"]
+
+
+def synthetic_ads(count: int, seed: int = 42) -> List[Dict]:
+    """Генерирует объявления с полями, которые использует предсказатель."""
+    rng = random.Random(seed)
+    ads = []
+    for idx in range(count):
+        model_idx = rng.randrange(len(MODELS))
+        memory_idx = rng.randrange(len(MEMORIES))
+        base = 20_000 + model_idx * 4_000 + memory_idx * 6_000
+        ads.append({
+            "avito_id": 4_000_000_000 + idx,
+            "title": f"{MODELS[model_idx]}, {MEMORIES[memory_idx]}",
+            "model": MODELS[model_idx],
+            "memory": MEMORIES[memory_idx],
+            "description": rng.choice(DESCRIPTIONS),
+            "price": int(base * rng.uniform(0.7, 1.3)),
+            "url": f"https://www.avito.ru/moskva/telefony/{idx}",
+        })
+    return ads
+
+
+def build_model(path: Path, rows: int = 5_000, n_estimators: int = 100) -> Tuple[Path, Path]:
+    """
+    Обучает синтетическую модель и сохраняет ее так же, как ноутбук:
+    price_predictor_model.pkl и model_columns.json в каталоге `path`.
+    """
+    from src.ml.features import KeywordMatcher
+
+    df = pd.DataFrame(synthetic_ads(rows))
+    matcher = KeywordMatcher()
+    df[matcher.flags] = matcher.matrix(df["description"])
+    encoded = pd.get_dummies(df[["model", "memory"] + FLAGS], columns=["model", "memory"], drop_first=True)
+    model = RandomForestRegressor(n_estimators=n_estimators, random_state=42, n_jobs=-1)
+    model.fit(encoded, df["price"])
+
+    path.mkdir(parents=True, exist_ok=True)
+    model_path = path / "price_predictor_model.pkl"
+    columns_path = path / "model_columns.json"
+    joblib.dump(model, model_path)
+    with open(columns_path, "w") as f:
+        json.dump(list(encoded.columns), f)
+    return model_path, columns_path
+
+
+if __name__ == "__main__":
+    np.random.seed(0)
+    print(build_model(Path("models")))
@@ -0,0 +1,136 @@
+"""
+Локальные заглушки внешних сервисов для бенчмарков и ручной проверки
+без обращения к настоящему Avito.
+"""
+import json
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+
+@contextmanager
+def avito_stub_server(page: bytes, latency: float = 0.2, throttle_every: int = 0) -> Iterator[str]:
+    """
+    Поднимает HTTP-сервер, отдающий сохраненную страницу выдачи на любой GET.
+
+    Args:
+        page: Содержимое сохраненной HTML-страницы.
+        latency: Искусственная задержка ответа, секунды.
+        throttle_every: Если больше 0, каждый N-й запрос получает 429 с Retry-After: 0.
+
+    Yields:
+        Базовый URL сервера, например http://127.0.0.1:54321
+    """
+    counter = {"requests": 0}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            with lock:
+                counter["requests"] += 1
+                number = counter["requests"]
+            time.sleep(latency)
+            if throttle_every and number % throttle_every == 0:
+                self.send_response(429)
+                self.send_header("Retry-After", "0")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(page)))
+            self.end_headers()
+            self.wfile.write(page)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@contextmanager
+def telegram_stub_server(
+    per_chat_rate: float = 1.0, retry_after: int = 1, latency: float = 0.02
+) -> Iterator[Tuple[str, List[Dict]]]:
+    """
+    Поднимает заглушку Bot API: принимает POST /bot<token>/sendMessage
+    (JSON или form-параметры) и запоминает сообщения. Как настоящий Telegram,
+    отвечает 429 с parameters.retry_after, если в чат пишут чаще `per_chat_rate`
+    сообщений в секунду.
+
+    Yields:
+        Базовый URL (подставляется вместо https://api.telegram.org) и список
+        принятых сообщений: {"chat_id", "text", "message_id"}; отклоненные
+        запросы попадают туда же с ключом "throttled".
+    """
+    messages: List[Dict] = []
+    last_sent: Dict[str, float] = {}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _reply(self, status: int, body: Dict) -> None:
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            raw = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            if self.headers.get("Content-Type", "").startswith("application/json"):
+                params = json.loads(raw or b"{}")
+            else:
+                params = dict(parse_qsl(urlsplit(self.path).query))
+                params.update(parse_qsl(raw.decode()))
+            if not self.path.split("?")[0].endswith("/sendMessage"):
+                self._reply(404, {"ok": False, "error_code": 404, "description": "Not Found"})
+                return
+            time.sleep(latency)
+            chat_id = str(params.get("chat_id"))
+            now = time.monotonic()
+            with lock:
+                previous = last_sent.get(chat_id)
+                if previous is not None and now - previous < 1.0 / per_chat_rate:
+                    messages.append({"chat_id": chat_id, "text": params.get("text"), "throttled": True})
+                    throttled = True
+                else:
+                    last_sent[chat_id] = now
+                    message_id = sum(1 for message in messages if not message.get("throttled")) + 1
+                    messages.append({"chat_id": chat_id, "text": params.get("text"), "message_id": message_id})
+                    throttled = False
+            if throttled:
+                self._reply(429, {
+                    "ok": False,
+                    "error_code": 429,
+                    "description": f"Too Many Requests: retry after {retry_after}",
+                    "parameters": {"retry_after": retry_after},
+                })
+                return
+            self._reply(200, {"ok": True, "result": {"message_id": message_id, "chat": {"id": chat_id}}})
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}", messages
+    finally:
+        server.shutdown()
+        server.server_close()
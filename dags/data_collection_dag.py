@@ -1,19 +1,29 @@
-import json
 from datetime import datetime, timedelta
 
 from airflow.decorators import dag, task
-from airflow.operators.bash import BashOperator
 
 
 def get_schedule_from_config():
     """
-    Вспомогательная функция, которая выполняется ВНУТРИ DAG,
-    чтобы безопасно получить расписание.
+    Вспомогательная функция, которая выполняется при разборе DAG,
+    чтобы безопасно получить расписание. Читает config.yaml через
+    src.core.config_file, не создавая Settings и логгер приложения.
     """
     import sys
     sys.path.insert(0, "/opt/airflow")
-    from src.core.config import settings
-    return settings.get_schedule_interval()
+    from src.core.config_file import dag_setting
+    return dag_setting("airflow", "schedule_interval", None)
+
+
+def get_max_parallel_units_from_config():
+    """Сколько единиц сбора выполнять одновременно (distributed.max_parallel_units)."""
+    import sys
+    sys.path.insert(0, "/opt/airflow")
+    from src.core.config_file import dag_setting
+    try:
+        return max(1, int(dag_setting("distributed", "max_parallel_units", 4)))
+    except (TypeError, ValueError):
+        return 4
 
 
 @dag(
@@ -29,70 +39,91 @@ def get_schedule_from_config():
     }
 )
 def process_avito_ads_dag():
-    gather_data_task = BashOperator(
-        task_id="gather_data_task",
-        bash_command='PYTHONPATH="/opt/airflow" python /opt/airflow/src/core/worker.py',
-        do_xcom_push=True,
-    )
-
     @task
-    def predict_and_filter_task(all_new_ads_json: str):
+    def plan_scrape_units_task():
         """
-        Загружает модель, предсказывает цены и фильтрует только выгодные объявления.
+        Удаляет пакеты старых запусков и делит поиски из config.yaml на единицы
+        сбора (см. src.core.distributed).
         """
         import sys
         sys.path.insert(0, "/opt/airflow")
-        from src.ml.predictor import predict_and_filter
-
-        try:
-            new_ads = json.loads(all_new_ads_json)
-        except (json.JSONDecodeError, TypeError):
-            new_ads = []
+        from src.core.batches import cleanup_batches
+        from src.core.config import settings
+        from src.core.distributed import plan_units
+        from src.core.searches import load_searches
+
+        cleanup_batches(settings.get_batch_dir(), settings.get_batch_retention_hours())
+        units = plan_units(load_searches(), settings.get_pages_per_unit(), settings.get_incremental())
+        print(f"Единиц сбора: {len(units)}")
+        return units
+
+    @task(max_active_tis_per_dag=get_max_parallel_units_from_config())
+    def scrape_unit_task(unit: dict, run_id=None):
+        """
+        Собирает одну единицу на свободном воркере Celery: парсинг, фильтр,
+        сохранение в БД. Возвращает путь к пакету новых и подешевевших объявлений.
+        """
+        import sys
+        sys.path.insert(0, "/opt/airflow")
+        from src.core.distributed import scrape_unit
 
-        if not new_ads:
-            return json.dumps([])
+        return scrape_unit(unit, run_id)
 
-        profitable_ads = predict_and_filter(new_ads)
-        return json.dumps(profitable_ads, default=str)
+    @task
+    def predict_and_filter_task(unit_batch_paths, run_id=None):
+        """
+        Собирает пакеты всех единиц и получает предсказания цен у сервера модели
+        одним пакетом для всех поисков, затем оставляет только выгодные
+        объявления (порог выгоды — свой у каждого поиска). Если сервер
+        недоступен, модель загружается прямо в задаче. Выгодные сохраняются
+        пакетом того же запуска, дальше передается только путь.
+        """
+        import sys
+        sys.path.insert(0, "/opt/airflow")
+        from src.core.batches import write_batch
+        from src.core.config import settings
+        from src.core.distributed import merge_units
+        from src.core.metrics import export_run_metrics
+        from src.core.searches import count_by_search
+        from src.ml.client import predict_and_filter
+
+        new_ads = merge_units(list(unit_batch_paths))
+        profitable_ads = predict_and_filter(new_ads) if new_ads else []
+        if new_ads:
+            print(f"Новых объявлений по поискам: {count_by_search(new_ads)}, выгодных: {count_by_search(profitable_ads)}")
+        path = write_batch(profitable_ads, run_id, name="profitable", batch_dir=settings.get_batch_dir())
+        export_run_metrics("predict")
+        return path
 
 
     @task
-    def send_notifications_task(profitable_ads_json: str):
+    def send_notifications_task(profitable_batch_path: str):
         """
-        Принимает JSON-строку с ВЫГОДНЫМИ объявлениями и отправляет уведомления.
+        Читает пакет с ВЫГОДНЫМИ объявлениями и отправляет уведомления.
+        Уже отправленные объявления (журнал sent_notifications) при повторе задачи пропускаются.
         """
         import sys
         sys.path.insert(0, "/opt/airflow")
-        from src.core.sender import send_telegram_message
+        from src.core.batches import read_records
+        from src.core.metrics import export_run_metrics
+        from src.core.notifier import send_deal_notifications
 
-        try:
-            profitable_ads = json.loads(profitable_ads_json)
-        except (json.JSONDecodeError, TypeError):
-            profitable_ads = []
+        profitable_ads = read_records(profitable_batch_path)
 
         if not profitable_ads:
             print("Выгодных объявлений нет, уведомление не отправляем.")
             return
 
         print(f"Отправляем уведомления для {len(profitable_ads)} ВЫГОДНЫХ объявлений.")
-        
-        for ad in profitable_ads:
-            profit = int(ad.get('profit', 0))
-            predicted_price = int(ad.get('predicted_price', 0))
-            
-            message = (
-                f"<b>🔥🔥🔥 Найдено выгодное предложение! 🔥🔥🔥</b>\n\n"
-                f"<b>{ad.get('title', 'Без заголовка')}</b>\n\n"
-                f"<b>Цена:</b> {ad.get('price', 'N/A')} руб.\n"
-                f"<b>Ожидаемая цена:</b> {predicted_price} руб.\n"
-                f"<b>💥 ВЫГОДА: ~{profit} руб. 💥</b>\n\n"
-                f"<a href='{ad.get('url', '#')}'>🔗 Ссылка на объявление</a>"
-            )
-            send_telegram_message(message)
-
-    all_ads = gather_data_task.output
-    profitable_ads = predict_and_filter_task(all_ads)
-    send_notifications_task(profitable_ads)
+        summary = send_deal_notifications(profitable_ads)
+        export_run_metrics("notify")
+        if summary["failed"]:
+            raise RuntimeError(f"Не удалось отправить {summary['failed']} уведомлений, задача будет повторена.")
+        return summary
+
+    unit_batches = scrape_unit_task.expand(unit=plan_scrape_units_task())
+    profitable_batch = predict_and_filter_task(unit_batches)
+    send_notifications_task(profitable_batch)
 
 
 process_avito_ads_dag()
\ No newline at end of file
@@ -0,0 +1,52 @@
+import json
+from datetime import datetime, timedelta
+
+from airflow.decorators import dag, task
+
+
+def get_schedule_from_config():
+    """
+    Вспомогательная функция, которая выполняется при разборе DAG,
+    чтобы безопасно получить расписание. Читает config.yaml через
+    src.core.config_file, не создавая Settings и логгер приложения.
+    """
+    import sys
+    sys.path.insert(0, "/opt/airflow")
+    from src.core.config_file import dag_setting
+    return dag_setting("training", "schedule_interval", None)
+
+
+@dag(
+    dag_id="model_retraining",
+    description="DAG для переобучения модели цены на объявлениях из PostgreSQL.",
+    schedule_interval=get_schedule_from_config(),
+    start_date=datetime(2023, 1, 1),
+    catchup=False,
+    max_active_runs=1,
+    tags=["avito", "ml", "training"],
+    default_args={
+        'retries': 1,
+        'retry_delay': timedelta(minutes=10),
+    }
+)
+def model_retraining_dag():
+    @task
+    def retrain_model_task():
+        """
+        Дочитывает новые объявления в кэш признаков, обучает модель и публикует
+        ее новой версией в реестр /opt/airflow/models/registry, переключая CURRENT.
+        Сервер модели подхватит ее сам.
+        При повторе после сбоя уже прочитанные порции берутся из кэша.
+        """
+        import sys
+        sys.path.insert(0, "/opt/airflow")
+        from src.ml.train import run
+
+        report = run()
+        print(f"Модель переобучена: {json.dumps(report)}")
+        return report
+
+    retrain_model_task()
+
+
+model_retraining_dag()
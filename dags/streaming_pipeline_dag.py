@@ -0,0 +1,52 @@
+import json
+from datetime import datetime, timedelta
+
+from airflow.decorators import dag, task
+
+
+def get_schedule_from_config():
+    """
+    Вспомогательная функция, которая выполняется при разборе DAG,
+    чтобы безопасно получить расписание. Читает config.yaml через
+    src.core.config_file, не создавая Settings и логгер приложения.
+    """
+    import sys
+    sys.path.insert(0, "/opt/airflow")
+    from src.core.config_file import dag_setting
+    return dag_setting("pipeline", "schedule_interval", None)
+
+
+@dag(
+    dag_id="avito_streaming_pipeline",
+    description="Потоковый режим: сбор, предсказание и уведомления в одной задаче (src.core.pipeline).",
+    schedule_interval=get_schedule_from_config(),
+    start_date=datetime(2023, 1, 1),
+    catchup=False,
+    max_active_runs=1,
+    tags=["avito", "data-collection", "ml", "streaming"],
+    default_args={
+        'retries': 2,
+        'retry_delay': timedelta(minutes=5),
+    }
+)
+def avito_streaming_pipeline_dag():
+    @task
+    def run_pipeline_task():
+        """
+        Один прогон потокового режима. Уведомления идут по мере загрузки страниц.
+        Если сохранение, предсказание или отправка упали, задача завершается
+        ошибкой, а неотправленные объявления уходят при повторе; уже
+        отправленные пропускаются (журнал sent_notifications).
+        """
+        import sys
+        sys.path.insert(0, "/opt/airflow")
+        from src.core.pipeline import run_pipeline
+
+        report = run_pipeline()
+        print(f"Потоковый прогон завершен: {json.dumps(report)}")
+        return report
+
+    run_pipeline_task()
+
+
+avito_streaming_pipeline_dag()
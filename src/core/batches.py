@@ -0,0 +1,206 @@
+"""
+Передача пакетов объявлений между задачами DAG через файлы, а не через XCom.
+
+Пакет — каталог `<batch_dir>/<run_id>/<имя>/` с одним .npy на колонку и
+`batch.json` (список колонок, их типы и число строк). Строки хранятся
+юникодными массивами, даты — datetime64, так что все колонки открываются
+через mmap без pickle. В XCom уходит только путь к каталогу.
+
+Каталог сначала пишется во временный и переименовывается целиком, поэтому
+читатель никогда не видит полузаписанный пакет. Пакеты старше
+`batches.retention_hours` удаляются в начале каждого запуска сборщика.
+
+numpy и pandas импортируются при первой записи или чтении непустого пакета:
+пустой пакет (запуск без новых объявлений) пишется без них.
+"""
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+from datetime import datetime
+from numbers import Integral
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from src.core.logger import log
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+BATCH_DIR = "/opt/airflow/data/batches"
+META_FILE = "batch.json"
+FORMAT_VERSION = 1
+_UNSAFE_CHARS = re.compile(r"[^A-Za-z0-9_.-]+")
+
+
+def _safe_name(run_id: str) -> str:
+    """run_id Airflow (manual__2024-01-01T00:00:00+00:00) как имя каталога."""
+    return _UNSAFE_CHARS.sub("_", str(run_id)).strip("._") or "run"
+
+
+def run_dir(run_id: str, batch_dir: str = BATCH_DIR) -> Path:
+    """Каталог пакетов запуска; удаляется cleanup_batches вместе с пакетами."""
+    return Path(batch_dir) / _safe_name(run_id)
+
+
+def _column_array(series: "pd.Series") -> "np.ndarray":
+    """Колонка без объектных значений: строки — юникодом, даты — datetime64, пропуски в числах — NaN."""
+    import numpy as np
+    import pandas as pd
+
+    if pd.api.types.is_datetime64_any_dtype(series):
+        if getattr(series.dt, "tz", None) is not None:
+            series = series.dt.tz_convert(None)
+        return series.to_numpy(dtype="datetime64[us]")
+    if pd.api.types.is_bool_dtype(series) or pd.api.types.is_numeric_dtype(series):
+        return series.to_numpy()
+    values = series.dropna()
+    if len(values) and values.map(lambda value: isinstance(value, datetime)).all():
+        return pd.to_datetime(series).to_numpy(dtype="datetime64[us]")
+    if len(values) and values.map(lambda value: isinstance(value, (int, float)) and not isinstance(value, bool)).all():
+        return pd.to_numeric(series).to_numpy(dtype=np.float64)
+    return series.fillna("").astype(str).to_numpy(dtype=str)
+
+
+def write_batch(ads: List[Dict], run_id: str, name: str = "ads", batch_dir: str = BATCH_DIR) -> str:
+    """
+    Сохраняет объявления пакетом и возвращает путь к нему.
+    Повторная запись того же run_id и имени (повтор задачи) заменяет пакет.
+    """
+    target = run_dir(run_id, batch_dir) / name
+    target.parent.mkdir(parents=True, exist_ok=True)
+    rows = len(ads)
+
+    staging = Path(tempfile.mkdtemp(prefix=f".{name}-", dir=target.parent))
+    try:
+        columns = []
+        if ads:
+            columns = _write_columns(ads, staging)
+        meta = {
+            "format_version": FORMAT_VERSION,
+            "rows": rows,
+            "columns": columns,
+            "created_at": datetime.now().isoformat(),
+        }
+        with open(staging / META_FILE, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+        os.chmod(staging, 0o755)
+        if target.exists():
+            shutil.rmtree(target)
+        os.rename(staging, target)
+    finally:
+        if staging.exists():
+            shutil.rmtree(staging, ignore_errors=True)
+    log.info(f"Пакет из {rows} объявлений сохранен: {target}")
+    return str(target)
+
+
+def _write_columns(ads: List[Dict], staging: Path) -> List[Dict]:
+    """Пишет колонки объявлений в .npy и возвращает их описания для batch.json."""
+    import numpy as np
+    import pandas as pd
+
+    frame = pd.DataFrame(ads)
+    columns = []
+    for idx, column in enumerate(frame.columns):
+        values = _column_array(frame[column])
+        file_name = f"{idx:03d}.npy"
+        np.save(staging / file_name, values, allow_pickle=False)
+        columns.append({
+            "name": str(column),
+            "file": file_name,
+            "dtype": values.dtype.str,
+            # Целые с пропусками pandas хранит как float; при чтении возвращаем int.
+            "integer": values.dtype.kind == "f" and _source_is_integer(ads, column),
+        })
+    return columns
+
+
+def _source_is_integer(ads: List[Dict], column: str) -> bool:
+    """
+    Были ли все заполненные значения колонки целыми в исходных объявлениях.
+    Смотрим на сами значения, а не на float после pandas: колонка из 5.0
+    должна прочитаться как 5.0, а не 5.
+    """
+    present = [value for value in (ad.get(column) for ad in ads) if value is not None and value == value]
+    return bool(present) and all(isinstance(value, Integral) and not isinstance(value, bool) for value in present)
+
+
+def _read_meta(path: Path) -> Dict:
+    with open(path / META_FILE, "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    if meta.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"Неизвестная версия формата пакета: {meta.get('format_version')}")
+    return meta
+
+
+def open_batch(path: str) -> Dict[str, "np.ndarray"]:
+    """Колонки пакета, открытые через mmap (только чтение)."""
+    path = Path(path)
+    meta = _read_meta(path)
+    columns = {}
+    if not meta["columns"]:
+        return columns
+    import numpy as np
+
+    for column in meta["columns"]:
+        values = np.load(path / column["file"], mmap_mode="r", allow_pickle=False)
+        if len(values) != meta["rows"]:
+            raise ValueError(f"Колонка {column['name']} пакета {path} не соответствует метаданным")
+        columns[column["name"]] = values
+    return columns
+
+
+def read_frame(path: str) -> "pd.DataFrame":
+    import pandas as pd
+
+    return pd.DataFrame(open_batch(path))
+
+
+def _plain_values(values: "np.ndarray", integer: bool) -> list:
+    """Колонка списком обычных объектов Python; NaN, NaT и пустые строки — None."""
+    if values.dtype.kind == "M":
+        # tolist() у datetime64[us] сразу дает datetime, а NaT — None.
+        return values.astype("datetime64[us]").tolist()
+    if values.dtype.kind == "f":
+        cast = int if integer else float
+        return [None if value != value else cast(value) for value in values.tolist()]
+    if values.dtype.kind == "U":
+        return [value or None for value in values.tolist()]
+    return values.tolist()
+
+
+def read_records(path: Optional[str]) -> List[Dict]:
+    """Объявления пакета списком словарей, как их возвращал парсер."""
+    if not path:
+        return []
+    meta = _read_meta(Path(path))
+    if not meta["rows"]:
+        return []
+    columns = open_batch(path)
+    names = list(columns)
+    converted = [_plain_values(columns[column["name"]], column.get("integer", False)) for column in meta["columns"]]
+    return [dict(zip(names, row)) for row in zip(*converted)]
+
+
+def cleanup_batches(batch_dir: str = BATCH_DIR, retention_hours: float = 48) -> List[str]:
+    """Удаляет каталоги запусков, которые не менялись дольше `retention_hours`."""
+    root = Path(batch_dir)
+    if not root.is_dir():
+        return []
+    deadline = time.time() - retention_hours * 3600
+    removed = []
+    for run_dir in root.iterdir():
+        try:
+            if run_dir.is_dir() and run_dir.stat().st_mtime < deadline:
+                shutil.rmtree(run_dir)
+                removed.append(run_dir.name)
+        except FileNotFoundError:
+            continue
+    if removed:
+        log.info(f"Удалено старых пакетов: {len(removed)}")
+    return removed
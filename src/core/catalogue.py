@@ -0,0 +1,225 @@
+"""
+Каталог товаров: заголовок объявления -> каноническая модель и объем памяти.
+
+Раньше объявление оставалось, только если заголовок в точности совпадал с
+`^iPhone[\\w\\s]+,\\s\\d+\\s(?:ГБ|ТБ)$`, а model/memory получались разбиением
+заголовка по ", ". Заголовки вида «Apple iPhone 11 256 ГБ как новый» или
+«iPhone SE (2022), 64 ГБ» терялись, хотя модель и память в них указаны.
+
+Каталог разбирает заголовок на токены (числа и слова, в нижнем регистре,
+русские написания «айфон», «про», «макс» сводятся к английским) и ищет
+модель по префиксному дереву токенов, собранному один раз из MODELS:
+выбирается самое длинное совпадение от начала заголовка («iPhone 13 Pro Max»,
+а не «iPhone 13»). Модель должна стоять в начале заголовка (допускается
+«Apple» перед ней) — так отсекаются «Чехол для iPhone 13». Объем памяти —
+первое число с единицей ГБ/ТБ после модели, которое есть в MEMORY_SIZES_GB
+(«2021 г» или «5G» пропускаются), или число сразу за моделью. Заголовок,
+который проходил прежний шаблон, но не распознан каталогом, не теряется:
+model/memory для него, как раньше, берутся из разбиения по ", ".
+
+Результат — пара небольших целых кодов (Product): номер модели в MODELS и
+номер объема в MEMORY_SIZES_GB, начиная с 1; 0 — не распознано. Коды
+стабильны, пока списки только дополняются в конце. Строки model/memory
+берутся из таблиц каталога, поэтому у всех объявлений одной модели это один
+и тот же объект, а повторяющиеся заголовки (на Avito их большинство)
+разбираются один раз благодаря кэшу.
+"""
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+# Только дополнять в конце: номер в списке — код модели.
+MODELS: Tuple[str, ...] = (
+    "iPhone SE", "iPhone SE (2020)", "iPhone SE (2022)",
+    "iPhone 7", "iPhone 7 Plus", "iPhone 8", "iPhone 8 Plus",
+    "iPhone X", "iPhone XR", "iPhone XS", "iPhone XS Max",
+    "iPhone 11", "iPhone 11 Pro", "iPhone 11 Pro Max",
+    "iPhone 12", "iPhone 12 mini", "iPhone 12 Pro", "iPhone 12 Pro Max",
+    "iPhone 13", "iPhone 13 mini", "iPhone 13 Pro", "iPhone 13 Pro Max",
+    "iPhone 14", "iPhone 14 Plus", "iPhone 14 Pro", "iPhone 14 Pro Max",
+    "iPhone 15", "iPhone 15 Plus", "iPhone 15 Pro", "iPhone 15 Pro Max",
+    "iPhone 16", "iPhone 16 Plus", "iPhone 16 Pro", "iPhone 16 Pro Max", "iPhone 16e",
+    "iPhone 5", "iPhone 5c", "iPhone 5s", "iPhone 6", "iPhone 6 Plus", "iPhone 6s", "iPhone 6s Plus",
+    "iPhone 17", "iPhone 17 Pro", "iPhone 17 Pro Max", "iPhone Air",
+)
+
+# Другие написания моделей, которые встречаются в заголовках.
+MODEL_ALIASES: Dict[str, str] = {
+    "iPhone SE 2": "iPhone SE (2020)",
+    "iPhone SE 2020": "iPhone SE (2020)",
+    "iPhone SE 3": "iPhone SE (2022)",
+    "iPhone SE 2022": "iPhone SE (2022)",
+    "iPhone 10": "iPhone X",
+    "iPhone 10 R": "iPhone XR",
+    "iPhone 10 S": "iPhone XS",
+    "iPhone 10 S Max": "iPhone XS Max",
+}
+
+# Только дополнять в конце: номер в списке — код объема.
+MEMORY_SIZES_GB: Tuple[int, ...] = (16, 32, 64, 128, 256, 512, 1024, 2048, 8)
+
+TOKEN_ALIASES: Dict[str, str] = {
+    "айфон": "iphone",
+    "про": "pro",
+    "макс": "max",
+    "мини": "mini",
+    "плюс": "plus",
+    "гб": "gb",
+    "g": "gb",
+    "тб": "tb",
+}
+UNIT_GB = {"gb": 1, "tb": 1024}
+BRAND_TOKENS = frozenset({"apple"})
+# Прежний фильтр prepare_ads. Заголовок, который он пропускал, остается и без
+# распознавания каталогом (model/memory — из разбиения по ", "), чтобы каталог
+# не отбрасывал то, что раньше сохранялось.
+LEGACY_TITLE_PATTERN = re.compile(r"^iPhone[\w\s]+,\s\d+\s(?:ГБ|ТБ)$")
+_TOKEN_RE = re.compile(r"\d+|[^\W\d_]+")
+_TERMINAL = ""
+
+
+def tokenize(text: str) -> List[str]:
+    """Числа и слова заголовка в нижнем регистре, с русскими написаниями, сведенными к английским."""
+    return [TOKEN_ALIASES.get(token, token) for token in _TOKEN_RE.findall(text.lower())]
+
+
+def memory_label(size_gb: int) -> str:
+    """Объем в том виде, в каком он стоит в заголовках Avito: «128 ГБ», «1 ТБ»."""
+    if size_gb >= 1024 and size_gb % 1024 == 0:
+        return f"{size_gb // 1024} ТБ"
+    return f"{size_gb} ГБ"
+
+
+def _is_legacy_title(title: Optional[str]) -> bool:
+    return isinstance(title, str) and LEGACY_TITLE_PATTERN.match(title) is not None
+
+
+class Product(NamedTuple):
+    """Распознанный товар: коды модели и объема (номера в MODELS и MEMORY_SIZES_GB, с 1)."""
+
+    model_code: int
+    memory_code: int
+
+
+class Catalogue:
+    """
+    Сопоставляет заголовки с каталогом моделей (см. описание модуля).
+    Дерево токенов и таблицы строк строятся один раз при создании.
+    """
+
+    def __init__(
+        self,
+        models: Sequence[str] = MODELS,
+        aliases: Dict[str, str] = MODEL_ALIASES,
+        memory_sizes_gb: Sequence[int] = MEMORY_SIZES_GB,
+        cache_size: int = 8192,
+    ):
+        self.models = tuple(models)
+        self.memory_sizes_gb = tuple(memory_sizes_gb)
+        self.memory_labels = tuple(memory_label(size) for size in self.memory_sizes_gb)
+        self._model_codes = {name: code for code, name in enumerate(self.models, start=1)}
+        self._memory_codes = {size: code for code, size in enumerate(self.memory_sizes_gb, start=1)}
+        self._label_codes = {label: code for code, label in enumerate(self.memory_labels, start=1)}
+
+        self._trie: Dict = {}
+        for name, code in self._model_codes.items():
+            self._add(tokenize(name), code)
+        for alias, name in aliases.items():
+            self._add(tokenize(alias), self._model_codes[name])
+        self.match = lru_cache(maxsize=cache_size)(self._match)
+
+    def _add(self, tokens: List[str], code: int) -> None:
+        node = self._trie
+        for token in tokens:
+            node = node.setdefault(token, {})
+        node[_TERMINAL] = code
+
+    def _match_model(self, tokens: List[str], start: int) -> Tuple[int, int]:
+        """Самое длинное совпадение с моделью от позиции `start`: (код, позиция после модели)."""
+        node = self._trie
+        best_code, best_end = 0, start
+        for pos in range(start, len(tokens)):
+            node = node.get(tokens[pos])
+            if node is None:
+                break
+            if _TERMINAL in node:
+                best_code, best_end = node[_TERMINAL], pos + 1
+        return best_code, best_end
+
+    def _match_memory(self, tokens: List[str], start: int) -> int:
+        """
+        Код объема: первое число с единицей после модели, которое есть в
+        каталоге объемов, иначе число сразу за моделью.
+        """
+        for pos in range(start, len(tokens) - 1):
+            unit = UNIT_GB.get(tokens[pos + 1])
+            if unit and tokens[pos].isdigit():
+                code = self._memory_codes.get(int(tokens[pos]) * unit, 0)
+                if code:
+                    return code
+        if start < len(tokens) and tokens[start].isdigit():
+            return self._memory_codes.get(int(tokens[start]), 0)
+        return 0
+
+    def _match(self, title: Optional[str]) -> Optional[Product]:
+        if not isinstance(title, str) or not title:
+            return None
+        tokens = tokenize(title)
+        start = 1 if tokens and tokens[0] in BRAND_TOKENS else 0
+        model_code, end = self._match_model(tokens, start)
+        if not model_code:
+            return None
+        memory_code = self._match_memory(tokens, end)
+        if not memory_code:
+            return None
+        return Product(model_code, memory_code)
+
+    def accepts(self, title: Optional[str]) -> bool:
+        """Распознан ли заголовок каталогом или пропущен прежним фильтром (LEGACY_TITLE_PATTERN)."""
+        return self.match(title) is not None or _is_legacy_title(title)
+
+    def model_name(self, code: int) -> Optional[str]:
+        return self.models[code - 1] if 0 < code <= len(self.models) else None
+
+    def memory_name(self, code: int) -> Optional[str]:
+        return self.memory_labels[code - 1] if 0 < code <= len(self.memory_labels) else None
+
+    def model_code(self, name: Optional[str]) -> int:
+        """Код модели по каноническому названию; 0, если такой модели в каталоге нет."""
+        return self._model_codes.get(name, 0)
+
+    def memory_code(self, label: Optional[str]) -> int:
+        """Код объема по подписи вида «128 ГБ»; 0, если такого объема в каталоге нет."""
+        return self._label_codes.get(label, 0)
+
+    def annotate(self, ads: Iterable[Dict], keep_unknown: bool = False) -> List[Dict]:
+        """
+        Дописывает к объявлениям model, memory, model_code и memory_code.
+        Нераспознанные остаются с кодами 0 и model/memory из разбиения заголовка
+        по ", ", как раньше, если заголовок проходит прежний фильтр или задан
+        `keep_unknown=True`; остальные отбрасываются.
+        """
+        annotated = []
+        for ad in ads:
+            product = self.match(ad.get("title"))
+            if product is not None:
+                annotated.append({
+                    **ad,
+                    "model": self.models[product.model_code - 1],
+                    "memory": self.memory_labels[product.memory_code - 1],
+                    "model_code": product.model_code,
+                    "memory_code": product.memory_code,
+                })
+            elif keep_unknown or _is_legacy_title(ad.get("title")):
+                model, _, memory = (ad.get("title") or "").partition(", ")
+                annotated.append({
+                    **ad,
+                    "model": model.strip() or None,
+                    "memory": memory.strip() or None,
+                    "model_code": 0,
+                    "memory_code": 0,
+                })
+        return annotated
+
+
+catalogue = Catalogue()
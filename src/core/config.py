@@ -1,10 +1,10 @@
-from pathlib import Path
-from typing import Optional
+import threading
+from typing import Dict, List, Optional
 
-import yaml
-from pydantic import PostgresDsn
+from pydantic import BaseModel, ConfigDict, Field, PostgresDsn, ValidationError, field_validator, model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+from src.core.config_file import ConfigFile, config_file
 from src.core.logger import log
 
 
@@ -12,21 +12,173 @@ def load_yaml_config() -> dict:
     """
     Загружает конфигурацию из YAML файла.
     Сначала ищет путь для Docker (Airflow), потом для локального запуска.
+    Файл разбирается один раз и перечитывается, только когда меняется
+    (см. src.core.config_file); результат изменять нельзя.
     """
-    docker_config_path = Path("/opt/airflow/configs/config.yaml")
-    local_config_path = Path("configs/config.yaml")
+    return config_file.read()
 
-    if docker_config_path.is_file():
-        config_path = docker_config_path
-    elif local_config_path.is_file():
-        config_path = local_config_path
-    else:
-        raise FileNotFoundError(
-            f"Config file not found. Looked in: {docker_config_path} and {local_config_path}"
-        )
 
-    with open(config_path, "r", encoding="utf-8") as f:
-        return yaml.safe_load(f)
+class SearchConfig(BaseModel):
+    """Один поиск из avito.searches; пустые поля заполняются общими настройками."""
+
+    name: Optional[str] = None
+    url: str
+    pages: Optional[int] = None
+    title_pattern: Optional[str] = None
+    profit_threshold: Optional[int] = None
+
+
+class AvitoConfig(BaseModel):
+    target_url: Optional[str] = None
+    searches: List[SearchConfig] = Field(default_factory=list)
+    pages_to_scan: int = 1
+    pool_size: int = 1
+    requests_per_minute: float = 20.0
+    load_timeout: float = 15.0
+    politeness_floor: float = 1.0
+    incremental: bool = False
+    known_ids_window_hours: int = 48
+
+    @field_validator("searches", mode="before")
+    @classmethod
+    def _empty_searches(cls, value):
+        return [] if value is None else value
+
+    @model_validator(mode="after")
+    def _unique_searches(self):
+        # Имя — ключ порога выгоды и поиска в пакетах, URL — ключ в индексе известных ID.
+        names = [search.name or f"search_{idx}" for idx, search in enumerate(self.searches, start=1)]
+        urls = [search.url for search in self.searches]
+        for key, values in (("name", names), ("url", urls)):
+            duplicates = sorted({value for value in values if values.count(value) > 1})
+            if duplicates:
+                raise ValueError(f"avito.searches: повторяется {key}: {', '.join(duplicates)}")
+        return self
+
+
+class ModelConfig(BaseModel):
+    profit_threshold: int = 5000
+
+
+class ModelServerConfig(BaseModel):
+    host: str = "127.0.0.1"
+    port: int = 8765
+    url: str = "http://127.0.0.1:8765"
+
+
+class TrainingConfig(BaseModel):
+    schedule_interval: Optional[str] = None
+    chunk_size: int = 20000
+    cache_dir: str = "/opt/airflow/data/train_cache"
+    incremental: bool = False
+
+
+class TelegramConfig(BaseModel):
+    api_base: str = "https://api.telegram.org"
+    per_chat_rate: float = 1.0
+    global_rate: float = 30.0
+    batch_size: int = 1
+
+
+class BatchesConfig(BaseModel):
+    dir: str = "/opt/airflow/data/batches"
+    retention_hours: float = 48.0
+
+
+class PipelineConfig(BaseModel):
+    queue_size: int = 2
+    schedule_interval: Optional[str] = None
+
+
+class WatcherConfig(BaseModel):
+    min_interval: float = 20.0
+    max_interval: float = 300.0
+    backoff: float = 1.5
+    metrics_path: Optional[str] = None
+
+
+class DistributedConfig(BaseModel):
+    redis_url: Optional[str] = None
+    pages_per_unit: int = 2
+    max_parallel_units: int = 4
+
+
+class MetricsConfig(BaseModel):
+    dir: Optional[str] = None
+
+
+class AirflowConfig(BaseModel):
+    schedule_interval: Optional[str] = None
+
+
+class AppConfig(BaseModel):
+    """
+    Типизированное содержимое config.yaml. Отсутствующие секции и ключи
+    получают значения по умолчанию, неверные типы — ошибку проверки.
+    """
+
+    # Секции model и model_server пересекаются с пространством имен model_ у pydantic.
+    model_config = ConfigDict(protected_namespaces=())
+
+    avito: AvitoConfig = Field(default_factory=AvitoConfig)
+    model: ModelConfig = Field(default_factory=ModelConfig)
+    model_server: ModelServerConfig = Field(default_factory=ModelServerConfig)
+    training: TrainingConfig = Field(default_factory=TrainingConfig)
+    telegram: TelegramConfig = Field(default_factory=TelegramConfig)
+    batches: BatchesConfig = Field(default_factory=BatchesConfig)
+    pipeline: PipelineConfig = Field(default_factory=PipelineConfig)
+    watcher: WatcherConfig = Field(default_factory=WatcherConfig)
+    distributed: DistributedConfig = Field(default_factory=DistributedConfig)
+    metrics: MetricsConfig = Field(default_factory=MetricsConfig)
+    airflow: AirflowConfig = Field(default_factory=AirflowConfig)
+
+    @model_validator(mode="before")
+    @classmethod
+    def _empty_sections(cls, data):
+        # Секция, в которой остались одни комментарии, в YAML разбирается как null.
+        if isinstance(data, dict):
+            return {key: {} if value is None else value for key, value in data.items()}
+        return data
+
+
+class TypedConfigCache:
+    """
+    AppConfig, собранный по разобранному файлу. Пересобирается, только когда
+    меняется содержимое файла. Если новая версия не читается или не проходит
+    проверку, продолжает работать предыдущая (при первой загрузке ошибка
+    пробрасывается).
+    """
+
+    def __init__(self, source: ConfigFile):
+        self._source = source
+        self._config: Optional[AppConfig] = None
+        self._version = -1
+        self._lock = threading.Lock()
+
+    def get(self) -> AppConfig:
+        try:
+            raw = self._source.read()
+        except Exception as e:
+            if self._config is None:
+                raise
+            log.error(f"Не удалось перечитать config.yaml, используется предыдущая версия: {e}")
+            return self._config
+        version = self._source.version
+        if version == self._version:
+            return self._config
+        with self._lock:
+            if version != self._version:
+                try:
+                    self._config = AppConfig.model_validate(raw)
+                except ValidationError as e:
+                    if self._config is None:
+                        raise
+                    log.error(f"config.yaml не прошел проверку, используется предыдущая версия: {e}")
+                self._version = version
+        return self._config
+
+
+typed_config = TypedConfigCache(config_file)
 
 
 class Settings(BaseSettings):
@@ -53,42 +205,175 @@ class Settings(BaseSettings):
         """Собирает URL для подключения к базе данных."""
         return f"postgresql+psycopg2://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_HOST}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
 
+    @property
+    def config(self) -> AppConfig:
+        """Типизированный config.yaml (кэшируется, перечитывается при изменении файла)."""
+        return typed_config.get()
 
     def get_parser_url(self) -> str:
         """Читает и возвращает target_url из config.yaml."""
-        yaml_config = load_yaml_config()
-        try:
-            return yaml_config["avito"]["target_url"]
-        except (KeyError, TypeError):
+        target_url = self.config.avito.target_url
+        if not target_url:
             log.error("Ключ 'avito.target_url' не найден в configs/config.yaml!")
             raise KeyError("target_url not found in config file")
+        return target_url
+
+    def get_searches(self) -> List[Dict]:
+        """
+        Читает список поисков avito.searches из config.yaml. У каждого поиска
+        обязателен url; name, pages, title_pattern и profit_threshold по умолчанию
+        берутся из общих настроек. Если список не задан, возвращается один поиск
+        по avito.target_url.
+        """
+        default_pages = self.get_pages_to_scan()
+        default_threshold = self.get_profit_threshold()
+        searches = [
+            {
+                "name": search.name or f"search_{idx}",
+                "url": search.url,
+                "pages": max(1, search.pages if search.pages is not None else default_pages),
+                "title_pattern": search.title_pattern,
+                "profit_threshold": search.profit_threshold if search.profit_threshold is not None else default_threshold,
+            }
+            for idx, search in enumerate(self.config.avito.searches, start=1)
+        ]
+        if searches:
+            return searches
+        return [{
+            "name": "default",
+            "url": self.get_parser_url(),
+            "pages": default_pages,
+            "title_pattern": None,
+            "profit_threshold": default_threshold,
+        }]
 
     def get_pages_to_scan(self) -> int:
         """Читает и возвращает pages_to_scan из config.yaml."""
-        yaml_config = load_yaml_config()
-        try:
-            return int(yaml_config["avito"]["pages_to_scan"])
-        except (KeyError, TypeError, ValueError):
-            log.warning("Ключ 'avito.pages_to_scan' не найден или некорректен. Используется значение по умолчанию: 1.")
-            return 1
+        return self.config.avito.pages_to_scan
+
+    def get_pool_size(self) -> int:
+        """Читает и возвращает pool_size из config.yaml."""
+        return max(1, self.config.avito.pool_size)
+
+    def get_requests_per_minute(self) -> float:
+        """Читает и возвращает requests_per_minute из config.yaml."""
+        return self.config.avito.requests_per_minute
+
+    def get_load_timeout(self) -> float:
+        """Читает и возвращает load_timeout из config.yaml."""
+        return self.config.avito.load_timeout
+
+    def get_politeness_floor(self) -> float:
+        """Читает и возвращает politeness_floor из config.yaml."""
+        return self.config.avito.politeness_floor
+
+    def get_incremental(self) -> bool:
+        """Читает и возвращает флаг incremental из config.yaml."""
+        return self.config.avito.incremental
+
+    def get_known_ids_window_hours(self) -> int:
+        """Читает и возвращает known_ids_window_hours из config.yaml."""
+        return self.config.avito.known_ids_window_hours
 
     def get_profit_threshold(self) -> int:
         """Читает и возвращает profit_threshold из config.yaml."""
-        yaml_config = load_yaml_config()
-        try:
-            return int(yaml_config["model"]["profit_threshold"])
-        except (KeyError, TypeError, ValueError):
-            log.warning("Ключ 'model.profit_threshold' не найден или некорректен. Используется значение по умолчанию: 5000.")
-            return 5000
+        return self.config.model.profit_threshold
+
+    def get_model_server_host(self) -> str:
+        """Читает и возвращает model_server.host из config.yaml."""
+        return self.config.model_server.host
+
+    def get_model_server_port(self) -> int:
+        """Читает и возвращает model_server.port из config.yaml."""
+        return self.config.model_server.port
+
+    def get_model_server_url(self) -> str:
+        """Читает и возвращает model_server.url из config.yaml."""
+        return self.config.model_server.url.rstrip("/")
+
+    def get_training_schedule_interval(self) -> Optional[str]:
+        """Читает и возвращает training.schedule_interval из config.yaml."""
+        return self.config.training.schedule_interval
+
+    def get_training_chunk_size(self) -> int:
+        """Читает и возвращает training.chunk_size из config.yaml."""
+        return max(1, self.config.training.chunk_size)
+
+    def get_training_incremental(self) -> bool:
+        """Читает и возвращает флаг training.incremental из config.yaml."""
+        return self.config.training.incremental
+
+    def get_training_cache_dir(self) -> str:
+        """Читает и возвращает training.cache_dir из config.yaml."""
+        return self.config.training.cache_dir
+
+    def get_telegram_api_base(self) -> str:
+        """Читает и возвращает telegram.api_base из config.yaml."""
+        return self.config.telegram.api_base.rstrip("/")
+
+    def get_telegram_per_chat_rate(self) -> float:
+        """Читает и возвращает telegram.per_chat_rate из config.yaml."""
+        return self.config.telegram.per_chat_rate
+
+    def get_telegram_global_rate(self) -> float:
+        """Читает и возвращает telegram.global_rate из config.yaml."""
+        return self.config.telegram.global_rate
+
+    def get_telegram_batch_size(self) -> int:
+        """Читает и возвращает telegram.batch_size из config.yaml."""
+        return max(1, self.config.telegram.batch_size)
+
+    def get_batch_dir(self) -> str:
+        """Читает и возвращает batches.dir из config.yaml."""
+        return self.config.batches.dir
+
+    def get_batch_retention_hours(self) -> float:
+        """Читает и возвращает batches.retention_hours из config.yaml."""
+        return self.config.batches.retention_hours
+
+    def get_pipeline_queue_size(self) -> int:
+        """Читает и возвращает pipeline.queue_size из config.yaml."""
+        return max(1, self.config.pipeline.queue_size)
+
+    def get_pipeline_schedule_interval(self) -> Optional[str]:
+        """Читает и возвращает pipeline.schedule_interval из config.yaml."""
+        return self.config.pipeline.schedule_interval
+
+    def get_watcher_min_interval(self) -> float:
+        """Читает и возвращает watcher.min_interval из config.yaml."""
+        return self.config.watcher.min_interval
+
+    def get_watcher_max_interval(self) -> float:
+        """Читает и возвращает watcher.max_interval из config.yaml."""
+        return self.config.watcher.max_interval
+
+    def get_watcher_backoff(self) -> float:
+        """Читает и возвращает watcher.backoff из config.yaml."""
+        return max(1.0, self.config.watcher.backoff)
+
+    def get_watcher_metrics_path(self) -> Optional[str]:
+        """Читает и возвращает watcher.metrics_path из config.yaml."""
+        return self.config.watcher.metrics_path
+
+    def get_redis_url(self) -> Optional[str]:
+        """Читает и возвращает distributed.redis_url из config.yaml."""
+        return self.config.distributed.redis_url
+
+    def get_pages_per_unit(self) -> int:
+        """Читает и возвращает distributed.pages_per_unit из config.yaml."""
+        return max(1, self.config.distributed.pages_per_unit)
+
+    def get_max_parallel_units(self) -> int:
+        """Читает и возвращает distributed.max_parallel_units из config.yaml."""
+        return max(1, self.config.distributed.max_parallel_units)
+
+    def get_metrics_dir(self) -> Optional[str]:
+        """Читает и возвращает metrics.dir из config.yaml."""
+        return self.config.metrics.dir
 
     def get_schedule_interval(self) -> Optional[str]:
         """Читает и возвращает schedule_interval из config.yaml."""
-        yaml_config = load_yaml_config()
-        try:
-            return yaml_config["airflow"]["schedule_interval"]
-        except (KeyError, TypeError):
-            log.warning("Ключ 'airflow.schedule_interval' не найден. Используется значение по умолчанию: None (ручной запуск).")
-            return None
+        return self.config.airflow.schedule_interval
 
 
-settings = Settings()
\ No newline at end of file
+settings = Settings()
@@ -0,0 +1,83 @@
+"""
+Чтение configs/config.yaml с кэшем в памяти процесса.
+
+Файл разбирается один раз. Перед каждым обращением сверяются mtime и размер
+(один stat); если они изменились, файл читается заново, но разбирается,
+только если изменилось содержимое (sha256). Модуль нарочно не импортирует
+ни настройки приложения (src.core.config), ни логгер, ни pydantic: через
+dag_setting его используют DAG, которые планировщик Airflow разбирает
+постоянно, и этот путь должен оставаться дешевым.
+"""
+import hashlib
+import threading
+from pathlib import Path
+from typing import Any, Optional, Tuple
+
+import yaml
+
+DOCKER_CONFIG_PATH = Path("/opt/airflow/configs/config.yaml")
+LOCAL_CONFIG_PATH = Path("configs/config.yaml")
+
+
+def find_config_path() -> Path:
+    """Сначала путь для Docker (Airflow), потом для локального запуска."""
+    if DOCKER_CONFIG_PATH.is_file():
+        return DOCKER_CONFIG_PATH
+    if LOCAL_CONFIG_PATH.is_file():
+        return LOCAL_CONFIG_PATH
+    raise FileNotFoundError(
+        f"Config file not found. Looked in: {DOCKER_CONFIG_PATH} and {LOCAL_CONFIG_PATH}"
+    )
+
+
+class ConfigFile:
+    """
+    Разобранный YAML-файл с проверкой изменений (см. описание модуля).
+    `version` растет при каждом новом содержимом: по нему производные объекты
+    (типизированный конфиг в src.core.config) понимают, что пора пересобраться.
+    Возвращаемый словарь общий для всех вызовов — изменять его нельзя.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self._path = Path(path) if path else None
+        self._signature: Optional[Tuple] = None
+        self._digest: Optional[str] = None
+        self._data: dict = {}
+        self.version = 0
+        self._lock = threading.Lock()
+
+    @property
+    def path(self) -> Path:
+        return self._path or find_config_path()
+
+    def read(self) -> dict:
+        path = self.path
+        stat = path.stat()
+        signature = (str(path), stat.st_mtime_ns, stat.st_size)
+        if signature == self._signature:
+            return self._data
+        with self._lock:
+            if signature != self._signature:
+                content = path.read_bytes()
+                digest = hashlib.sha256(content).hexdigest()
+                if digest != self._digest:
+                    # Если файл дописывается и не разбирается, отметка не обновится и следующий вызов прочитает его снова.
+                    self._data = yaml.safe_load(content) or {}
+                    self._digest = digest
+                    self.version += 1
+                self._signature = signature
+        return self._data
+
+
+config_file = ConfigFile()
+
+
+def dag_setting(section: str, key: str, default: Any = None) -> Any:
+    """
+    Значение `section.key` из config.yaml для кода, который выполняется при
+    разборе DAG. Если файла или ключа нет, возвращается `default`.
+    """
+    try:
+        return config_file.read()[section][key]
+    except (KeyError, TypeError, FileNotFoundError):
+        return default
@@ -0,0 +1,138 @@
+"""
+Распределенный сбор: поиски и страницы делятся на единицы, которые DAG
+process_avito_ads запускает динамически сопоставленными задачами
+(`expand`) на разных воркерах Celery.
+
+    plan_units -> scrape_unit x N (воркеры) -> merge_units -> одно предсказание
+
+Каждая единица — диапазон страниц одного поиска. В инкрементальном режиме
+поиск не делится: остановка на известной странице требует идти по страницам
+подряд. Единица сама фильтрует, сохраняет в БД и пишет пакет (src.core.batches)
+с новыми и подешевевшими объявлениями; ID перед сохранением закрепляются в
+общем множестве запуска (src.core.seen_set), так что объявление из нескольких
+единиц обрабатывается один раз — той единицей, что успела первой.
+
+Общий лимит `avito.requests_per_minute` делится поровну между
+`distributed.max_parallel_units` одновременно работающими единицами.
+"""
+import time
+from dataclasses import asdict
+from typing import Dict, List, Optional, Sequence
+
+from src.core.logger import log
+from src.core.searches import SearchSpec, SearchStats, log_search_stats, match_search
+
+
+def plan_units(searches: Sequence[SearchSpec], pages_per_unit: int = 2, incremental: bool = False) -> List[Dict]:
+    """
+    Делит поиски на единицы сбора. Единицы перечисляются по кругу (первые
+    страницы всех поисков, затем следующие), чтобы при ограниченном числе
+    одновременных задач поиски продвигались равномерно.
+
+    Returns:
+        JSON-совместимые описания единиц: id, поиск и диапазон страниц.
+    """
+    per_search = []
+    for search in searches:
+        step = search.pages if incremental else max(1, pages_per_unit)
+        ranges = [(first, min(first + step - 1, search.pages)) for first in range(1, search.pages + 1, step)]
+        spec = {key: value for key, value in asdict(search).items() if not key.startswith("_")}
+        per_search.append([{"search": spec, "first_page": first, "last_page": last} for first, last in ranges])
+
+    units = []
+    for round_idx in range(max((len(ranges) for ranges in per_search), default=0)):
+        for ranges in per_search:
+            if round_idx < len(ranges):
+                units.append(ranges[round_idx])
+    for idx, unit in enumerate(units):
+        unit["unit_id"] = f"unit_{idx:03d}"
+    return units
+
+
+def scrape_unit(unit: Dict, run_id: str) -> str:
+    """
+    Собирает одну единицу на текущем воркере и возвращает путь к пакету
+    сохраненных объявлений.
+    """
+    from src.core.batches import write_batch
+    from src.core.config import settings
+    from src.core.incremental import KnownAdsIndex
+    from src.core.metrics import export_run_metrics
+    from src.core.rate_limit import TokenBucket
+    from src.core.seen_set import open_seen_set
+    from src.core.worker import prepare_ads, store_ads
+    from src.parsers.avito_selenium_parser import iter_avito_pages, log_wait_summary
+    from src.parsers.lazy_load import LoadWaitConfig
+
+    search = SearchSpec(**unit["search"])
+    unit_id = unit["unit_id"]
+    batch_dir = settings.get_batch_dir()
+    log.info(f"Единица {unit_id}: поиск «{search.name}», страницы {unit['first_page']}–{unit['last_page']}.")
+
+    known_index = None
+    if settings.get_incremental():
+        known_index = KnownAdsIndex(
+            is_relevant=search.matches,
+            window_hours=settings.get_known_ids_window_hours(),
+        ).load([search.url])
+    budget = TokenBucket(rate=settings.get_requests_per_minute() / settings.get_max_parallel_units() / 60.0)
+    load_wait = LoadWaitConfig(
+        timeout=settings.get_load_timeout(),
+        politeness_floor=settings.get_politeness_floor(),
+    )
+
+    raw_ads: List[Dict] = []
+    wait_stats = []
+    stats = SearchStats(search.name)
+    started = time.monotonic()
+    pages = iter_avito_pages(
+        search.url,
+        num_pages=unit["last_page"],
+        load_wait=load_wait,
+        stop_when=known_index.page_is_known if known_index else None,
+        stats=wait_stats,
+        first_page=unit["first_page"],
+    )
+    try:
+        while True:
+            budget.acquire()
+            page = next(pages, None)
+            if page is None:
+                break
+            raw_ads.extend(page[1])
+            stats.pages += 1
+    finally:
+        pages.close()
+    stats.seconds = time.monotonic() - started
+    log_wait_summary(wait_stats)
+
+    matched = {ad["avito_id"]: ad for ad in match_search(search, raw_ads)}
+    seen = open_seen_set(
+        run_id, settings.get_redis_url(), batch_dir, settings.get_batch_retention_hours()
+    )
+    claimed = seen.claim(matched, unit_id)
+    fresh = [ad for ad_id, ad in matched.items() if ad_id in claimed]
+    stats.parsed, stats.matched = len(raw_ads), len(matched)
+    stats.duplicates, stats.kept = len(matched) - len(fresh), len(fresh)
+    log_search_stats([stats])
+
+    # Ошибка БД роняет задачу: Airflow повторит единицу, и она получит свои ID из множества обратно.
+    stored = store_ads(prepare_ads(fresh, filter_titles=False), raise_errors=True) if fresh else []
+    # Отметки просмотренного сохраняются только после записи в БД, чтобы повтор не остановился на этих страницах.
+    if known_index is not None:
+        known_index.save()
+    path = write_batch(stored, run_id, name=unit_id, batch_dir=batch_dir)
+    export_run_metrics(f"scrape_{unit_id}")
+    return path
+
+
+def merge_units(paths: Sequence[Optional[str]]) -> List[Dict]:
+    """Объединяет пакеты единиц в один список для пакетного предсказания."""
+    from src.core.batches import read_records
+
+    merged: Dict[int, Dict] = {}
+    for path in paths:
+        for ad in read_records(path):
+            merged.setdefault(ad["avito_id"], ad)
+    log.info(f"Собрано {len(merged)} объявлений из {len(paths)} единиц.")
+    return list(merged.values())
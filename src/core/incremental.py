@@ -0,0 +1,129 @@
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from src.core.logger import log
+
+
+def _naive_local(value: Optional[datetime]) -> Optional[datetime]:
+    """Приводит datetime из БД к наивному локальному времени, как у парсера."""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone().replace(tzinfo=None)
+
+
+class KnownAdsIndex:
+    """
+    Индекс уже известных объявлений для инкрементального обхода выдачи.
+
+    Держит в памяти ID объявлений за последние `window_hours` часов и по запросу
+    досматривает в БД только те ID, которых нет в кэше. Для каждого поискового
+    URL хранит отметку самого свежего увиденного объявления (таблица scan_state).
+    Потокобезопасен: проверки вызываются из рабочих потоков пула браузеров.
+    Если у поисков разные шаблоны заголовков, `relevant_by_url` задает
+    проверку для каждого URL; для остальных используется `is_relevant`.
+    """
+
+    def __init__(
+        self,
+        is_relevant: Callable[[Dict], bool],
+        window_hours: int = 48,
+        relevant_by_url: Optional[Dict[str, Callable[[Dict], bool]]] = None,
+    ):
+        self._is_relevant = is_relevant
+        self._relevant_by_url = dict(relevant_by_url or {})
+        self._window_hours = window_hours
+        self._known: Set[int] = set()
+        self._high_water: Dict[str, Dict] = {}
+        self._seen: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def load(self, search_urls: Iterable[str]) -> "KnownAdsIndex":
+        """Загружает кэш недавних ID и отметки по поисковым URL из БД."""
+        from src.db.models import Ad, ScanState
+        from src.db.session import SessionLocal
+
+        since = datetime.now() - timedelta(hours=self._window_hours)
+        with SessionLocal() as db:
+            self._known = {ad_id for (ad_id,) in db.query(Ad.avito_id).filter(Ad.published_at >= since)}
+            states = db.query(ScanState).filter(ScanState.search_url.in_(list(search_urls))).all()
+            self._high_water = {
+                state.search_url: {
+                    "avito_id": state.last_avito_id,
+                    "published_at": _naive_local(state.last_published_at),
+                }
+                for state in states
+            }
+        log.info(
+            f"Инкрементальный режим: в кэше {len(self._known)} недавних ID, "
+            f"отметки найдены для {len(self._high_water)} поисковых URL."
+        )
+        return self
+
+    def _unknown_ids(self, ids: List[int]) -> Set[int]:
+        with self._lock:
+            missing = {ad_id for ad_id in ids if ad_id not in self._known}
+        if not missing:
+            return missing
+        from src.db.models import Ad
+        from src.db.session import SessionLocal
+
+        with SessionLocal() as db:
+            found = {ad_id for (ad_id,) in db.query(Ad.avito_id).filter(Ad.avito_id.in_(missing))}
+        with self._lock:
+            self._known.update(found)
+        return missing - found
+
+    def _remember_page(self, search_url: str, page_ads: List[Dict]) -> None:
+        newest_id = max(ad["avito_id"] for ad in page_ads)
+        newest_date = max(ad["published_at"] for ad in page_ads)
+        with self._lock:
+            seen = self._seen.setdefault(search_url, {"avito_id": newest_id, "published_at": newest_date})
+            seen["avito_id"] = max(seen["avito_id"], newest_id)
+            seen["published_at"] = max(seen["published_at"], newest_date)
+
+    def page_is_known(self, search_url: str, page_ads: List[Dict]) -> bool:
+        """
+        Решает, можно ли прекратить листать выдачу после этой страницы.
+
+        Страница считается известной, если все подходящие по заголовку объявления
+        на ней уже есть в БД. Если подходящих нет вовсе, листать дальше имеет смысл
+        только пока страница свежее отметки предыдущего запуска.
+        """
+        if not page_ads:
+            return True
+        self._remember_page(search_url, page_ads)
+
+        is_relevant = self._relevant_by_url.get(search_url, self._is_relevant)
+        relevant_ids = [ad["avito_id"] for ad in page_ads if is_relevant(ad)]
+        if self._unknown_ids(relevant_ids):
+            return False
+        if relevant_ids:
+            return True
+        high_water = self._high_water.get(search_url)
+        oldest = min(ad["published_at"] for ad in page_ads)
+        return bool(high_water and high_water["published_at"] and oldest <= high_water["published_at"])
+
+    def save(self) -> None:
+        """Сохраняет обновленные отметки по всем просмотренным поисковым URL."""
+        if not self._seen:
+            return
+        from src.db.models import ScanState
+        from src.db.session import SessionLocal
+
+        now = datetime.now()
+        with SessionLocal() as db:
+            for search_url, seen in self._seen.items():
+                previous = self._high_water.get(search_url) or {}
+                last_id = max(filter(None, [previous.get("avito_id"), seen["avito_id"]]))
+                last_date = max(filter(None, [previous.get("published_at"), seen["published_at"]]))
+                db.merge(
+                    ScanState(
+                        search_url=search_url,
+                        last_avito_id=last_id,
+                        last_published_at=last_date,
+                        updated_at=now,
+                    )
+                )
+            db.commit()
+        log.info(f"Отметки инкрементального обхода обновлены для {len(self._seen)} поисковых URL.")
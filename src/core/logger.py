@@ -1,7 +1,55 @@
+import atexit
 import logging
+import logging.handlers
+import os
+import queue
 import sys
 
 
+class _LazyFileHandler(logging.FileHandler):
+    """Каталог и файл лога создаются при первой записи, а не при импорте."""
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
+
+
+class _LogQueue:
+    """
+    Записи лога кладутся в очередь, а в stdout и файл их пишет отдельный поток
+    (QueueListener), так что вызов log.info не ждет ввода-вывода. Поток
+    останавливается при выходе из процесса, дописав очередь.
+    """
+
+    def __init__(self, *handlers: logging.Handler):
+        self.handlers = handlers
+        self.handler = logging.handlers.QueueHandler(queue.SimpleQueue())
+        self._start()
+        atexit.register(self.stop)
+        if hasattr(os, "register_at_fork"):
+            # Поток не переживает fork (воркеры Celery, multiprocessing): дочернему процессу нужен свой.
+            os.register_at_fork(after_in_child=self._restart)
+
+    def _start(self) -> None:
+        self.listener = logging.handlers.QueueListener(
+            self.handler.queue, *self.handlers, respect_handler_level=True
+        )
+        self.listener.start()
+
+    def _restart(self) -> None:
+        self.handler.queue = queue.SimpleQueue()
+        self._start()
+
+    def stop(self) -> None:
+        if self.listener._thread is not None:
+            self.listener.stop()
+
+    def flush(self) -> None:
+        """Дожидается, пока поток допишет все записи, стоящие в очереди."""
+        self.stop()
+        self._start()
+
+
 def setup_logger():
     """Настраивает и возвращает кастомный логгер."""
     logger = logging.getLogger("IntelligentDealFinder")
@@ -16,16 +64,25 @@ def setup_logger():
 
     stream_handler = logging.StreamHandler(sys.stdout)
     stream_handler.setFormatter(formatter)
-    logger.addHandler(stream_handler)
-
-    import os
 
-    os.makedirs("logs", exist_ok=True)
-    file_handler = logging.FileHandler("logs/app.log", mode="a", encoding="utf-8")
+    file_handler = _LazyFileHandler("logs/app.log", mode="a", encoding="utf-8", delay=True)
     file_handler.setFormatter(formatter)
-    logger.addHandler(file_handler)
+
+    global _log_queue
+    _log_queue = _LogQueue(stream_handler, file_handler)
+    logger.addHandler(_log_queue.handler)
 
     return logger
 
 
+def flush_logs() -> None:
+    """
+    Дописывает очередь лога. Нужна перед print, который должен оказаться
+    последней строкой вывода (путь к пакету в worker.main).
+    """
+    if _log_queue is not None:
+        _log_queue.flush()
+
+
+_log_queue = None
 log = setup_logger()
@@ -0,0 +1,215 @@
+"""
+Замеры этапов и счетчики запуска с выгрузкой в текстовом формате Prometheus.
+
+Этапы (запуск браузера, загрузка страницы, ожидание догрузки, извлечение
+карточек, разбор заголовков, сохранение в БД, предсказание, отправка в
+Telegram) оборачиваются в `metrics.timer(<этап>)`; длительности копятся в
+гистограмме `deal_finder_stage_seconds{stage=...}`. Счетчики (страницы,
+объявления, сообщения) — `metrics.inc(<имя>)`, в выгрузке с суффиксом _total.
+
+Реестр один на процесс и рассчитан на потоки (пул браузеров в crawl_searches).
+В конце запуска export_run_metrics пишет в лог, как время разделилось по
+этапам, и сохраняет снимок в `metrics.dir/<задача>.prom` (формат textfile
+collector node_exporter). Модуль нарочно легкий: его импортируют парсер и
+точки входа, а путь запуска без новых объявлений не должен дорожать
+(см. benchmarks/bench_startup.py).
+"""
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from src.core.logger import log
+
+NAMESPACE = "deal_finder"
+STAGE_METRIC = "stage_seconds"
+DEFAULT_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+_UNSAFE_CHARS = re.compile(r"[^A-Za-z0-9_.-]+")
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, object]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(key: LabelKey, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = key + extra
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, size: int):
+        self.counts = [0] * size
+        self.sum = 0.0
+        self.count = 0
+
+
+class MetricsRegistry:
+    """Гистограммы длительности этапов, счетчики и значения (gauge) одного процесса."""
+
+    def __init__(self, namespace: str = NAMESPACE, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.namespace = namespace
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._stages: Dict[LabelKey, _Histogram] = {}
+        self._counters: Dict[Tuple[str, LabelKey], float] = {}
+        self._gauges: Dict[Tuple[str, LabelKey], float] = {}
+
+    def observe(self, stage: str, seconds: float, **labels) -> None:
+        """Добавляет одно измерение этапа `stage`."""
+        key = _label_key({"stage": stage, **labels})
+        bucket = bisect_left(self.buckets, seconds)
+        with self._lock:
+            histogram = self._stages.get(key)
+            if histogram is None:
+                histogram = self._stages[key] = _Histogram(len(self.buckets) + 1)
+            histogram.counts[bucket] += 1
+            histogram.sum += seconds
+            histogram.count += 1
+
+    @contextmanager
+    def timer(self, stage: str, **labels) -> Iterator[None]:
+        """Замеряет блок `with` как этап `stage` (в том числе завершившийся исключением)."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started, **labels)
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels) -> None:
+        with self._lock:
+            self._gauges[(name, _label_key(labels))] = value
+
+    def stage_totals(self) -> Dict[str, Tuple[int, float]]:
+        """Число измерений и суммарное время по каждому этапу (без учета прочих меток)."""
+        totals: Dict[str, Tuple[int, float]] = {}
+        with self._lock:
+            for key, histogram in self._stages.items():
+                stage = dict(key)["stage"]
+                count, seconds = totals.get(stage, (0, 0.0))
+                totals[stage] = (count + histogram.count, seconds + histogram.sum)
+        return totals
+
+    def counters(self) -> Dict[str, float]:
+        """Счетчики по имени (без учета меток)."""
+        totals: Dict[str, float] = {}
+        with self._lock:
+            for (name, _), value in self._counters.items():
+                totals[name] = totals.get(name, 0) + value
+        return totals
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stages.clear()
+            self._counters.clear()
+            self._gauges.clear()
+
+    def to_prometheus(self, **const_labels) -> str:
+        """Снимок в текстовом формате Prometheus; `const_labels` добавляются ко всем рядам."""
+        extra = _label_key(const_labels)
+        lines: List[str] = []
+        with self._lock:
+            stages = sorted(self._stages.items())
+            counters = sorted(self._counters.items())
+            gauges = sorted(self._gauges.items())
+
+        if stages:
+            name = f"{self.namespace}_{STAGE_METRIC}"
+            lines.append(f"# HELP {name} Длительность этапов обработки, секунды.")
+            lines.append(f"# TYPE {name} histogram")
+            for key, histogram in stages:
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), histogram.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"{name}_bucket{_format_labels(key + extra, (('le', le),))} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(key + extra)} {histogram.sum!r}")
+                lines.append(f"{name}_count{_format_labels(key + extra)} {histogram.count}")
+
+        for kind, suffix, series in (("counter", "_total", counters), ("gauge", "", gauges)):
+            declared = set()
+            for (metric, key), value in series:
+                name = f"{self.namespace}_{metric}{suffix}"
+                if name not in declared:
+                    lines.append(f"# TYPE {name} {kind}")
+                    declared.add(name)
+                lines.append(f"{name}{_format_labels(key + extra)} {_format_value(value)}")
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def write(self, path: str, **const_labels) -> str:
+        """Атомарно записывает снимок в файл (textfile collector не увидит полузаписанный)."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus(**const_labels))
+        os.replace(tmp_path, path)
+        return str(path)
+
+
+metrics = MetricsRegistry()
+
+
+def log_stage_summary(job: str, registry: MetricsRegistry = metrics) -> None:
+    """Пишет в лог, сколько времени заняли этапы запуска (по убыванию)."""
+    totals = registry.stage_totals()
+    if not totals:
+        return
+    parts = [
+        f"{stage} {seconds:.2f} с ({count})"
+        for stage, (count, seconds) in sorted(totals.items(), key=lambda item: item[1][1], reverse=True)
+    ]
+    counters = ", ".join(f"{name} {_format_value(value)}" for name, value in sorted(registry.counters().items()))
+    log.info(f"Этапы «{job}»: {'; '.join(parts)}." + (f" Счетчики: {counters}." if counters else ""))
+
+
+def export_run_metrics(
+    job: str, reset: bool = True, log_stages: bool = True, registry: MetricsRegistry = metrics
+) -> Optional[str]:
+    """
+    Завершает запуск задачи `job`: сводка этапов в лог и снимок в
+    `metrics.dir/<job>.prom`, если каталог задан в config.yaml. С `reset`
+    реестр очищается, чтобы следующий запуск в том же процессе (воркер
+    Celery) начинался с нуля. Ошибка записи снимка запуск не роняет.
+
+    Returns:
+        Путь к снимку или None.
+    """
+    from src.core.config import settings
+
+    if log_stages:
+        log_stage_summary(job, registry)
+    registry.set_gauge("last_run_timestamp_seconds", time.time())
+    path = None
+    directory = settings.get_metrics_dir()
+    if directory:
+        file_name = f"{_UNSAFE_CHARS.sub('_', job).strip('._') or 'run'}.prom"
+        try:
+            path = registry.write(os.path.join(directory, file_name), task=job)
+        except OSError as e:
+            log.warning(f"Не удалось сохранить метрики в {directory}: {e}")
+    if reset:
+        registry.reset()
+    return path
@@ -0,0 +1,290 @@
+"""
+Асинхронная отправка уведомлений о выгодных объявлениях в Telegram.
+
+Все сообщения идут через один httpx.AsyncClient (пул соединений, keep-alive).
+Частота ограничена двумя токен-бакетами, как того требует Bot API: не больше
+`per_chat_rate` сообщений в секунду в каждый чат и `global_rate` на всего бота.
+На 429 отправка повторяется после паузы из `parameters.retry_after`.
+
+Несколько объявлений можно объединить в одно сообщение (`batch_size`).
+Отправленные объявления записываются в таблицу sent_notifications, поэтому
+повтор задачи Airflow не шлет их второй раз.
+"""
+import asyncio
+import html
+import math
+import random
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import httpx
+
+from src.core.logger import log
+from src.core.metrics import metrics
+from src.core.rate_limit import AsyncKeyedRateLimiter, AsyncTokenBucket
+
+TELEGRAM_API_BASE = "https://api.telegram.org"
+MAX_MESSAGE_LENGTH = 4096
+MAX_RETRY_AFTER = 120.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def _as_int(value, default: int = 0) -> int:
+    try:
+        if value is None or (isinstance(value, float) and math.isnan(value)):
+            return default
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _price_line(ad: Dict) -> str:
+    previous_price = ad.get("previous_price")
+    if previous_price and not math.isnan(previous_price):
+        return f"<b>Цена снижена:</b> {int(previous_price)} → {ad.get('price', 'N/A')} руб.\n"
+    return f"<b>Цена:</b> {ad.get('price', 'N/A')} руб.\n"
+
+
+def format_deal(ad: Dict) -> str:
+    """Сообщение об одном выгодном объявлении (HTML-разметка Telegram)."""
+    return (
+        f"<b>🔥🔥🔥 Найдено выгодное предложение! 🔥🔥🔥</b>\n\n"
+        f"<b>{html.escape(str(ad.get('title', 'Без заголовка')))}</b>\n\n"
+        f"{_price_line(ad)}"
+        f"<b>Ожидаемая цена:</b> {_as_int(ad.get('predicted_price'))} руб.\n"
+        f"<b>💥 ВЫГОДА: ~{_as_int(ad.get('profit'))} руб. 💥</b>\n\n"
+        f"<a href='{html.escape(str(ad.get('url', '#')), quote=True)}'>🔗 Ссылка на объявление</a>"
+    )
+
+
+def _format_deal_short(ad: Dict) -> str:
+    return (
+        f"<b>{html.escape(str(ad.get('title', 'Без заголовка')))}</b>\n"
+        f"{_price_line(ad)}"
+        f"<b>Ожидаемая цена:</b> {_as_int(ad.get('predicted_price'))} руб., "
+        f"<b>выгода ~{_as_int(ad.get('profit'))} руб.</b>\n"
+        f"<a href='{html.escape(str(ad.get('url', '#')), quote=True)}'>🔗 Ссылка</a>"
+    )
+
+
+def build_messages(ads: Sequence[Dict], batch_size: int = 1) -> List[Tuple[str, List[Dict]]]:
+    """
+    Раскладывает объявления по сообщениям: не больше `batch_size` в одном
+    и не длиннее лимита Telegram. Возвращает пары (текст, объявления).
+    """
+    if batch_size <= 1:
+        return [(format_deal(ad), [ad]) for ad in ads]
+
+    messages = []
+    group: List[Dict] = []
+    blocks: List[str] = []
+
+    def flush() -> None:
+        if group:
+            header = f"<b>🔥 Найдено выгодных предложений: {len(group)}</b>\n\n"
+            messages.append((header + "\n\n".join(blocks), list(group)))
+            group.clear()
+            blocks.clear()
+
+    for ad in ads:
+        block = _format_deal_short(ad)
+        projected = sum(len(b) + 2 for b in blocks) + len(block) + 64
+        if len(group) >= batch_size or (group and projected > MAX_MESSAGE_LENGTH):
+            flush()
+        group.append(ad)
+        blocks.append(block)
+    flush()
+    return messages
+
+
+def _retry_after_seconds(response: httpx.Response) -> Optional[float]:
+    """Пауза из ответа Bot API: parameters.retry_after в JSON или заголовок Retry-After."""
+    try:
+        value = response.json().get("parameters", {}).get("retry_after")
+    except (ValueError, AttributeError):
+        value = None
+    if value is None:
+        value = response.headers.get("Retry-After")
+    try:
+        return min(max(float(value), 0.0), MAX_RETRY_AFTER)
+    except (TypeError, ValueError):
+        return None
+
+
+class TelegramNotifier:
+    """
+    Клиент Bot API с ограничением частоты. Используется как асинхронный
+    контекстный менеджер; клиент httpx можно передать извне (например,
+    настроенный на локальную заглушку).
+    """
+
+    def __init__(
+        self,
+        bot_token: str,
+        api_base: str = TELEGRAM_API_BASE,
+        per_chat_rate: float = 1.0,
+        global_rate: float = 30.0,
+        max_retries: int = 5,
+        timeout: float = 10.0,
+        client: Optional[httpx.AsyncClient] = None,
+    ):
+        self.url = f"{api_base.rstrip('/')}/bot{bot_token}/sendMessage"
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.throttled = 0
+        self._chat_limiter = AsyncKeyedRateLimiter(rate=per_chat_rate)
+        self._global_bucket = AsyncTokenBucket(rate=global_rate, capacity=global_rate)
+        self._client = client
+        self._own_client = client is None
+
+    async def __aenter__(self) -> "TelegramNotifier":
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeout),
+                limits=httpx.Limits(max_connections=8, max_keepalive_connections=8),
+            )
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        if self._own_client and self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def send_message(self, chat_id: str, text: str) -> Optional[int]:
+        """
+        Отправляет одно сообщение. Возвращает message_id или None, если
+        сообщение отправить не удалось.
+        """
+        payload = {"chat_id": chat_id, "text": text, "parse_mode": "HTML", "disable_web_page_preview": True}
+        for attempt in range(self.max_retries + 1):
+            with metrics.timer("telegram_rate_wait"):
+                await self._chat_limiter.acquire(str(chat_id))
+                await self._global_bucket.acquire()
+            retry_after = None
+            try:
+                with metrics.timer("telegram_send"):
+                    response = await self._client.post(self.url, json=payload)
+            except httpx.TransportError as e:
+                log.warning(f"Сетевая ошибка при отправке в Telegram (попытка {attempt + 1}): {e}")
+            else:
+                if response.status_code == 200:
+                    metrics.inc("telegram_messages", status="sent")
+                    return _as_int(response.json().get("result", {}).get("message_id"))
+                if response.status_code not in RETRY_STATUSES:
+                    log.error(f"Telegram отклонил сообщение: {response.status_code} {response.text[:200]}")
+                    metrics.inc("telegram_messages", status="failed")
+                    return None
+                if response.status_code == 429:
+                    self.throttled += 1
+                    metrics.inc("telegram_throttled")
+                retry_after = _retry_after_seconds(response)
+                log.warning(f"Telegram ответил {response.status_code} (попытка {attempt + 1}), пауза {retry_after} с.")
+
+            if attempt < self.max_retries:
+                delay = retry_after if retry_after is not None else random.uniform(0, 2 ** attempt)
+                await asyncio.sleep(delay)
+
+        log.error(f"Не удалось отправить сообщение в чат {chat_id} после {self.max_retries + 1} попыток.")
+        metrics.inc("telegram_messages", status="failed")
+        return None
+
+
+async def _notify_chat(notifier: TelegramNotifier, chat_id: str, ads: List[Dict], batch_size: int, db) -> Dict:
+    from src.db.notifications import already_sent, mark_sent, notification_key
+
+    if db is not None:
+        sent = already_sent(db, [notification_key(chat_id, ad) for ad in ads])
+        pending = [ad for ad in ads if notification_key(chat_id, ad) not in sent]
+    else:
+        pending = list(ads)
+    stats = {"skipped": len(ads) - len(pending), "sent": 0, "failed": 0, "messages": 0}
+
+    for text, group in build_messages(pending, batch_size):
+        message_id = await notifier.send_message(chat_id, text)
+        if message_id is None:
+            stats["failed"] += len(group)
+            continue
+        stats["sent"] += len(group)
+        stats["messages"] += 1
+        if db is not None:
+            # Фиксируем сразу: если задача упадет дальше, повтор не продублирует отправленное.
+            mark_sent(db, [notification_key(chat_id, ad) for ad in group], message_id)
+            db.commit()
+    return stats
+
+
+async def notify_deals(
+    notifier: TelegramNotifier,
+    chat_ids: Sequence[str],
+    ads: List[Dict],
+    batch_size: int = 1,
+    db=None,
+) -> Dict:
+    """
+    Рассылает выгодные объявления по чатам. Чаты обслуживаются параллельно,
+    внутри чата сообщения идут по порядку. С сессией `db` уже отправленные
+    объявления пропускаются, а новые записываются в журнал после отправки.
+
+    Returns:
+        Сводка: отправлено/пропущено/не отправлено объявлений, число сообщений и ответов 429.
+    """
+    if db is not None:
+        # Сессия SQLAlchemy не рассчитана на конкурентный доступ, поэтому с журналом чаты идут по очереди.
+        results = [await _notify_chat(notifier, chat_id, ads, batch_size, db) for chat_id in chat_ids]
+    else:
+        results = await asyncio.gather(*(_notify_chat(notifier, chat_id, ads, batch_size, None) for chat_id in chat_ids))
+    summary = {key: sum(result[key] for result in results) for key in ("sent", "skipped", "failed", "messages")}
+    summary["throttled"] = notifier.throttled
+    return summary
+
+
+def configured_chat_ids() -> List[str]:
+    """Чаты из TELEGRAM_CHAT_ID (можно несколько через запятую)."""
+    from src.core.config import settings
+
+    return [chat.strip() for chat in str(settings.TELEGRAM_CHAT_ID).split(",") if chat.strip()]
+
+
+def notifier_from_settings() -> TelegramNotifier:
+    """TelegramNotifier с токеном из .env и лимитами из config.yaml."""
+    from src.core.config import settings
+
+    return TelegramNotifier(
+        settings.TELEGRAM_BOT_TOKEN,
+        api_base=settings.get_telegram_api_base(),
+        per_chat_rate=settings.get_telegram_per_chat_rate(),
+        global_rate=settings.get_telegram_global_rate(),
+    )
+
+
+def log_summary(summary: Dict) -> None:
+    log.info(
+        f"Уведомления: отправлено {summary['sent']} объявлений в {summary['messages']} сообщениях, "
+        f"пропущено как уже отправленные {summary['skipped']}, не отправлено {summary['failed']}, "
+        f"ответов 429: {summary['throttled']}."
+    )
+
+
+def send_deal_notifications(ads: List[Dict], batch_size: Optional[int] = None, use_ledger: bool = True) -> Dict:
+    """
+    Синхронная точка входа для задач DAG: настройки из config.yaml и .env,
+    журнал отправок в основной базе.
+    """
+    from src.core.config import settings
+
+    chat_ids = configured_chat_ids()
+    if batch_size is None:
+        batch_size = settings.get_telegram_batch_size()
+
+    async def run(db) -> Dict:
+        async with notifier_from_settings() as notifier:
+            return await notify_deals(notifier, chat_ids, ads, batch_size, db)
+
+    if use_ledger:
+        from src.db.session import SessionLocal
+
+        with SessionLocal() as db:
+            summary = asyncio.run(run(db))
+    else:
+        summary = asyncio.run(run(None))
+    log_summary(summary)
+    return summary
@@ -0,0 +1,302 @@
+"""
+Потоковый режим: сбор, сохранение, предсказание и уведомление в одном процессе.
+
+DAG process_avito_ads делит работу на три задачи Airflow, и каждая платит за
+запуск интерпретатора, импорты и ожидание планировщика. Здесь те же шаги
+соединены ограниченными очередями asyncio:
+
+    страницы выдачи -> prepare_ads + store_ads -> predict_and_filter -> Telegram
+
+Каждая страница проходит всю цепочку сразу после загрузки, поэтому о выгодных
+объявлениях с первой страницы бот сообщает, пока вторая еще грузится. Очереди
+ограничены (`pipeline.queue_size`): если уведомления или предсказания не
+успевают, браузер не запрашивает новые страницы. Блокирующие шаги (Selenium,
+БД, модель) выполняются в пуле потоков, уведомления — асинхронно.
+
+Запуск:
+    PYTHONPATH=/opt/airflow python -m src.core.pipeline
+"""
+import asyncio
+import json
+import shutil
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Awaitable, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from src.core.logger import flush_logs, log
+
+Page = Tuple[int, List[Dict]]
+_DONE = None
+# Пакет сохраненных, но не отправленных объявлений (см. run_pipeline).
+RETRY_RUN_ID = "pipeline"
+RETRY_BATCH = "retry"
+
+
+@dataclass
+class PipelineStats:
+    """
+    Счетчики одного прогона; задержки — от загрузки страницы до отправки уведомлений.
+    `unfinished` — сохраненные объявления, которые не дошли до конца цепочки из-за
+    ошибки предсказания или отправки (store_ads второй раз их не вернет).
+    """
+
+    pages: int = 0
+    parsed: int = 0
+    stored: int = 0
+    profitable: int = 0
+    notified: int = 0
+    errors: int = 0
+    first_notification_after: Optional[float] = None
+    page_latencies: List[float] = field(default_factory=list)
+    unfinished: List[Dict] = field(default_factory=list)
+
+
+async def _next_page(loop: asyncio.AbstractEventLoop, pages: Iterator[Page]) -> Optional[Page]:
+    return await loop.run_in_executor(None, next, pages, _DONE)
+
+
+async def run_stream(
+    pages: Iterator[Page],
+    notify: Callable[[List[Dict]], Awaitable[int]],
+    prepare: Callable[[List[Dict]], List[Dict]],
+    store: Callable[[List[Dict]], List[Dict]],
+    predict: Callable[[List[Dict]], List[Dict]],
+    queue_size: int = 2,
+    carried: Optional[List[Dict]] = None,
+) -> PipelineStats:
+    """
+    Прогоняет страницы через цепочку шагов. Шаги передаются явно, чтобы
+    цепочку можно было собрать из заглушек (см. benchmarks/bench_pipeline.py).
+
+    Ошибка на странице не останавливает прогон: она считается в `stats.errors`,
+    а уже сохраненные объявления этой страницы остаются в `stats.unfinished`.
+    Сохранение должно бросать исключение при сбое (store_ads с
+    raise_errors=True), иначе сбой неотличим от страницы без новых объявлений.
+
+    Args:
+        pages: Итератор (номер страницы, объявления); обычно iter_avito_pages.
+        notify: Корутина, отправляющая выгодные объявления; возвращает число
+            отправленных, при неудачной отправке бросает исключение.
+        prepare: Фильтр и обогащение объявлений страницы (worker.prepare_ads).
+        store: Сохранение в БД; возвращает новые и подешевевшие (worker.store_ads).
+        predict: Предсказание и отбор выгодных (client.predict_and_filter).
+        queue_size: Емкость каждой очереди между шагами.
+        carried: Сохраненные прошлым прогоном, но не отправленные объявления;
+            идут на предсказание первыми, как страница 0.
+    """
+    loop = asyncio.get_running_loop()
+    started = time.monotonic()
+    stats = PipelineStats()
+    stored_queue: "asyncio.Queue[Optional[Tuple[int, float, List[Dict]]]]" = asyncio.Queue(queue_size)
+    deals_queue: "asyncio.Queue[Optional[Tuple[int, float, List[Dict]]]]" = asyncio.Queue(queue_size)
+    seen_ids: Set[int] = set()
+    # avito_id -> сохраненное объявление, пока оно не отсеяно предсказанием или не отправлено.
+    unfinished: Dict[int, Dict] = {}
+
+    async def scrape_and_store() -> None:
+        if carried:
+            unfinished.update((ad["avito_id"], ad) for ad in carried)
+            await stored_queue.put((0, time.monotonic(), list(carried)))
+        while True:
+            try:
+                page = await _next_page(loop, pages)
+            except Exception as e:
+                stats.errors += 1
+                log.error(f"Обход выдачи прерван: {e}", exc_info=True)
+                break
+            if page is _DONE:
+                break
+            page_num, page_ads = page
+            loaded_at = time.monotonic()
+            stats.pages += 1
+            stats.parsed += len(page_ads)
+            # Объявление может переехать на следующую страницу, пока листаем выдачу.
+            fresh = [ad for ad in page_ads if ad["avito_id"] not in seen_ids]
+            seen_ids.update(ad["avito_id"] for ad in fresh)
+            try:
+                prepared = await loop.run_in_executor(None, prepare, fresh) if fresh else []
+                stored = await loop.run_in_executor(None, store, prepared) if prepared else []
+            except Exception as e:
+                stats.errors += 1
+                log.error(f"Страница {page_num}: ошибка при сохранении: {e}", exc_info=True)
+                continue
+            unfinished.update((ad["avito_id"], ad) for ad in stored)
+            stats.stored += len(stored)
+            await stored_queue.put((page_num, loaded_at, stored))
+        await stored_queue.put(_DONE)
+
+    async def predict_stage() -> None:
+        while True:
+            item = await stored_queue.get()
+            if item is _DONE:
+                break
+            page_num, loaded_at, stored = item
+            try:
+                deals = await loop.run_in_executor(None, predict, stored) if stored else []
+            except Exception as e:
+                stats.errors += 1
+                log.error(f"Страница {page_num}: ошибка предсказания: {e}", exc_info=True)
+                continue
+            deal_ids = {ad["avito_id"] for ad in deals}
+            for ad in stored:
+                if ad["avito_id"] not in deal_ids:
+                    unfinished.pop(ad["avito_id"], None)
+            stats.profitable += len(deals)
+            await deals_queue.put((page_num, loaded_at, deals))
+        await deals_queue.put(_DONE)
+
+    async def notify_stage() -> None:
+        while True:
+            item = await deals_queue.get()
+            if item is _DONE:
+                break
+            page_num, loaded_at, deals = item
+            if not deals:
+                continue
+            try:
+                stats.notified += await notify(deals)
+            except Exception as e:
+                stats.errors += 1
+                log.error(f"Страница {page_num}: ошибка отправки уведомлений: {e}", exc_info=True)
+                continue
+            for ad in deals:
+                unfinished.pop(ad["avito_id"], None)
+            now = time.monotonic()
+            if stats.first_notification_after is None:
+                stats.first_notification_after = now - started
+            stats.page_latencies.append(now - loaded_at)
+            log.info(
+                f"Страница {page_num}: {len(deals)} выгодных объявлений отправлено "
+                f"через {now - loaded_at:.2f} с после загрузки."
+            )
+
+    tasks = [loop.create_task(stage()) for stage in (scrape_and_store, predict_stage, notify_stage)]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    stats.unfinished = list(unfinished.values())
+    return stats
+
+
+def run_pipeline() -> Dict:
+    """
+    Один потоковый прогон с настройками из config.yaml: те же поиски, лимиты
+    страниц и инкрементальный обход, что у worker.py, и тот же журнал
+    уведомлений, что у send_notifications_task. Поиски обходятся по очереди
+    одним браузером; объявление, уже встреченное в предыдущем поиске, второй
+    раз не обрабатывается.
+
+    Сохраненные, но не отправленные из-за ошибки объявления пишутся в пакет
+    `<batches.dir>/pipeline/retry` и первыми идут в следующий прогон, а сам
+    прогон завершается RuntimeError, чтобы Airflow его повторил. Уже
+    отправленные журнал уведомлений второй раз не пропустит.
+    """
+    from functools import partial
+
+    from src.core.batches import read_records, run_dir, write_batch
+    from src.core.config import settings
+    from src.core.incremental import KnownAdsIndex
+    from src.core.metrics import export_run_metrics
+    from src.core.notifier import configured_chat_ids, notifier_from_settings, notify_deals
+    from src.core.searches import load_searches, match_search, profit_thresholds, relevance_by_url
+    from src.core.worker import has_known_product, prepare_ads, store_ads
+    from src.db.session import SessionLocal
+    from src.ml.client import predict_and_filter
+    from src.parsers.avito_selenium_parser import iter_avito_pages, log_wait_summary
+    from src.parsers.browser_pool import create_chrome_driver
+    from src.parsers.lazy_load import LoadWaitConfig
+
+    searches = load_searches()
+    known_index = None
+    if settings.get_incremental():
+        known_index = KnownAdsIndex(
+            is_relevant=has_known_product,
+            window_hours=settings.get_known_ids_window_hours(),
+            relevant_by_url=relevance_by_url(searches),
+        ).load([search.url for search in searches])
+    load_wait = LoadWaitConfig(
+        timeout=settings.get_load_timeout(),
+        politeness_floor=settings.get_politeness_floor(),
+    )
+    wait_stats = []
+
+    def all_pages() -> Iterator[Page]:
+        driver = create_chrome_driver()
+        try:
+            for search in searches:
+                for page_num, page_ads in iter_avito_pages(
+                    search.url,
+                    num_pages=search.pages,
+                    load_wait=load_wait,
+                    stop_when=known_index.page_is_known if known_index else None,
+                    driver=driver,
+                    stats=wait_stats,
+                ):
+                    yield page_num, match_search(search, page_ads)
+        finally:
+            driver.quit()
+            log.info("Selenium WebDriver закрыт.")
+
+    batch_dir = settings.get_batch_dir()
+    retry_path = run_dir(RETRY_RUN_ID, batch_dir) / RETRY_BATCH
+    carried = read_records(str(retry_path)) if retry_path.is_dir() else []
+    if carried:
+        log.info(f"Из прошлого прогона повторяются {len(carried)} неотправленных объявлений.")
+
+    pages = all_pages()
+    chat_ids = configured_chat_ids()
+    batch_size = settings.get_telegram_batch_size()
+
+    async def run(db) -> PipelineStats:
+        async with notifier_from_settings() as notifier:
+            async def notify(deals: List[Dict]) -> int:
+                summary = await notify_deals(notifier, chat_ids, deals, batch_size, db)
+                if summary["failed"]:
+                    raise RuntimeError(f"Не удалось отправить {summary['failed']} уведомлений.")
+                return summary["sent"]
+
+            # Заголовки уже отобраны по каждому поиску в match_search.
+            return await run_stream(
+                pages, notify, partial(prepare_ads, filter_titles=False), partial(store_ads, raise_errors=True),
+                partial(predict_and_filter, thresholds=profit_thresholds(searches)),
+                queue_size=settings.get_pipeline_queue_size(),
+                carried=carried,
+            )
+
+    try:
+        with SessionLocal() as db:
+            stats = asyncio.run(run(db))
+    finally:
+        # Закрывает браузер, если обход прерван на середине.
+        pages.close()
+    if stats.unfinished:
+        write_batch(stats.unfinished, RETRY_RUN_ID, name=RETRY_BATCH, batch_dir=batch_dir)
+    elif retry_path.is_dir():
+        shutil.rmtree(retry_path)
+    # Страницы с ошибками не отмечаются просмотренными, чтобы повтор их обошел.
+    if known_index is not None and not stats.errors:
+        known_index.save()
+    log_wait_summary(wait_stats)
+
+    report = {**asdict(stats), "unfinished": len(stats.unfinished)}
+    log.info(
+        f"Потоковый прогон: {stats.pages} страниц, {stats.parsed} объявлений, сохранено {stats.stored}, "
+        f"выгодных {stats.profitable}, отправлено {stats.notified}, ошибок {stats.errors}."
+    )
+    export_run_metrics("pipeline")
+    if stats.errors:
+        raise RuntimeError(
+            f"Потоковый прогон завершился с ошибками ({stats.errors}); "
+            f"{len(stats.unfinished)} объявлений отложено до повтора."
+        )
+    return report
+
+
+if __name__ == "__main__":
+    report = run_pipeline()
+    flush_logs()
+    print(json.dumps(report))
@@ -0,0 +1,101 @@
+import asyncio
+import threading
+import time
+from typing import Dict, Optional
+
+
+class TokenBucket:
+    """
+    Потокобезопасный токен-бакет.
+    Ограничивает частоту операций (например, загрузок страниц) общим бюджетом
+    для всех потоков: не более `rate` операций в секунду с запасом `capacity`.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated_at
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._updated_at = now
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """
+        Блокирует поток, пока в бакете не появится нужное число токенов.
+
+        Returns:
+            Время ожидания в секундах.
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                delay = (tokens - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class AsyncTokenBucket:
+    """
+    Токен-бакет для asyncio-кода: вместо блокирующих пауз корутина
+    уступает управление, пока не накопится токен. Ожидающие обслуживаются
+    в порядке очереди.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated_at
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._updated_at = now
+
+    async def acquire(self, tokens: float = 1.0) -> float:
+        """
+        Дожидается нужного числа токенов.
+
+        Returns:
+            Время ожидания в секундах.
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        waited = 0.0
+        async with self._lock:
+            while True:
+                self._refill(time.monotonic())
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                delay = (tokens - self._tokens) / self.rate
+                await asyncio.sleep(delay)
+                waited += delay
+
+
+class AsyncKeyedRateLimiter:
+    """Набор независимых AsyncTokenBucket по ключу (например, по хосту)."""
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self._buckets: Dict[str, AsyncTokenBucket] = {}
+
+    async def acquire(self, key: str, tokens: float = 1.0) -> float:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = AsyncTokenBucket(self.rate, self.capacity)
+        return await bucket.acquire(tokens)
@@ -0,0 +1,138 @@
+"""
+Несколько поисков в одном запуске: города, категории, ценовые диапазоны.
+
+Поиски задаются списком `avito.searches` в config.yaml; у каждого свой URL,
+лимит страниц, шаблон заголовка и порог выгоды. Без списка используется один
+поиск по `avito.target_url` с общими настройками, как раньше. Поиск без
+шаблона оставляет объявления, заголовок которых распознан каталогом
+(src.core.catalogue).
+
+Все поиски обходятся одним пулом браузеров (crawl_searches ставит страницы
+разных поисков в очередь по кругу). Объявления, попавшие в несколько поисков,
+остаются за первым по порядку в конфиге, так что одно объявление
+сохраняется, оценивается и отправляется один раз. Каждое объявление помечено
+ключом `search` — по нему выбирается порог выгоды при предсказании.
+"""
+import re
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Pattern, Sequence, Set, Tuple
+
+from src.core.catalogue import catalogue
+from src.core.logger import log
+
+if TYPE_CHECKING:
+    from src.parsers.avito_selenium_parser import SearchCrawl
+
+SEARCH_KEY = "search"
+
+
+@dataclass
+class SearchSpec:
+    """
+    Один поиск из avito.searches.
+
+    Attributes:
+        name: Имя поиска в логах и ключ `search` у объявлений.
+        url: URL выдачи Avito.
+        pages: Сколько страниц выдачи сканировать.
+        title_pattern: Регулярное выражение для заголовков; None — заголовки, распознанные каталогом.
+        profit_threshold: Минимальная выгода в рублях для уведомления.
+    """
+
+    name: str
+    url: str
+    pages: int = 1
+    title_pattern: Optional[str] = None
+    profit_threshold: int = 5000
+    _title_re: Optional[Pattern] = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self._title_re = re.compile(self.title_pattern) if self.title_pattern is not None else None
+
+    def matches(self, ad: Dict) -> bool:
+        if self._title_re is None:
+            return catalogue.accepts(ad.get("title"))
+        return bool(ad.get("title") and self._title_re.match(ad["title"]))
+
+
+@dataclass
+class SearchStats:
+    """Счетчики одного поиска за запуск; seconds — время браузера на его страницы."""
+
+    name: str
+    pages: int = 0
+    parsed: int = 0
+    matched: int = 0
+    duplicates: int = 0
+    kept: int = 0
+    seconds: float = 0.0
+
+    @property
+    def ads_per_second(self) -> float:
+        return self.parsed / self.seconds if self.seconds else 0.0
+
+
+def load_searches() -> List[SearchSpec]:
+    """Поиски из config.yaml (см. Settings.get_searches)."""
+    from src.core.config import settings
+
+    return [SearchSpec(**search) for search in settings.get_searches()]
+
+
+def profit_thresholds(searches: Optional[Sequence[SearchSpec]] = None) -> Dict[str, int]:
+    """Порог выгоды по имени поиска; без `searches` — по поискам из config.yaml."""
+    return {search.name: search.profit_threshold for search in (load_searches() if searches is None else searches)}
+
+
+def relevance_by_url(searches: Sequence[SearchSpec]) -> Dict[str, Callable[[Dict], bool]]:
+    """Проверка заголовка для каждого поискового URL (для KnownAdsIndex)."""
+    return {search.url: search.matches for search in searches}
+
+
+def match_search(search: SearchSpec, ads: List[Dict]) -> List[Dict]:
+    """Объявления одного поиска, подходящие под его шаблон, с пометкой `search`."""
+    return [{**ad, SEARCH_KEY: search.name} for ad in ads if search.matches(ad)]
+
+
+def assign_searches(searches: Sequence[SearchSpec], crawls: Sequence["SearchCrawl"]) -> Tuple[List[Dict], List[SearchStats]]:
+    """
+    Один проход по объявлениям всех поисков: фильтр по шаблону поиска и
+    дедупликация по avito_id. Объявление достается первому поиску (в порядке
+    конфига), под шаблон которого оно подходит. `crawls` — результат
+    crawl_searches в том же порядке, что и `searches`.
+
+    Returns:
+        Помеченные объявления и статистика по поискам.
+    """
+    claimed: Set[int] = set()
+    assigned: List[Dict] = []
+    all_stats = []
+    for search, crawl in zip(searches, crawls):
+        stats = SearchStats(search.name, pages=crawl.pages, parsed=len(crawl.ads), seconds=crawl.seconds)
+        for ad in match_search(search, crawl.ads):
+            stats.matched += 1
+            if ad["avito_id"] in claimed:
+                stats.duplicates += 1
+                continue
+            claimed.add(ad["avito_id"])
+            assigned.append(ad)
+            stats.kept += 1
+        all_stats.append(stats)
+    return assigned, all_stats
+
+
+def log_search_stats(all_stats: Sequence[SearchStats]) -> None:
+    for stats in all_stats:
+        log.info(
+            f"Поиск «{stats.name}»: {stats.pages} стр., {stats.parsed} объявлений за {stats.seconds:.1f} с "
+            f"({stats.ads_per_second:.1f} объявл./с), подходят по заголовку {stats.matched}, "
+            f"повторы уже найденных {stats.duplicates}, в обработку {stats.kept}."
+        )
+
+
+def count_by_search(ads: Sequence[Dict]) -> Dict[str, int]:
+    counts: Dict[str, int] = {}
+    for ad in ads:
+        name = ad.get(SEARCH_KEY) or "default"
+        counts[name] = counts.get(name, 0) + 1
+    return counts
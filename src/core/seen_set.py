@@ -0,0 +1,95 @@
+"""
+Общее для всех воркеров множество avito_id, уже взятых в обработку в этом запуске.
+
+Задачи сбора DAG process_avito_ads выполняются на разных воркерах Celery.
+Чтобы объявление, попавшее в несколько поисков или на соседние страницы, не
+сохранялось и не оценивалось дважды, каждая задача пропускает свои ID через
+`claim`: ID атомарно закрепляется за задачей, которая прислала его первой, и
+возвращаются только закрепленные за ней. Повтор упавшей задачи получает свои
+ID обратно, поэтому объявления не теряются.
+
+Основная реализация — хеш Redis (HSETNX срабатывает только у первого, кто
+записал поле). Если `distributed.redis_url` не задан (локальный запуск с
+SequentialExecutor), используется файл под блокировкой flock в каталоге
+пакетов запуска — он работает между процессами на одной машине. Если адрес
+задан, а пакета redis нет, это ошибка конфигурации: файл на воркерах разных
+машин не общий, и объявления обрабатывались бы дважды.
+"""
+import fcntl
+import os
+from pathlib import Path
+from typing import Iterable, Optional, Set
+
+KEY_PREFIX = "avito:seen"
+
+
+class RedisSeenSet:
+    """Хеш avito_id -> задача в Redis под ключом `avito:seen:<run_id>` с ограниченным сроком жизни."""
+
+    def __init__(self, client, key: str, ttl_seconds: int = 48 * 3600):
+        self._client = client
+        self.key = key
+        self.ttl_seconds = ttl_seconds
+
+    def claim(self, ids: Iterable[int], owner: str) -> Set[int]:
+        """Закрепляет ID за `owner` и возвращает те, что принадлежат ему."""
+        ids = list(dict.fromkeys(int(ad_id) for ad_id in ids))
+        if not ids:
+            return set()
+        pipe = self._client.pipeline(transaction=False)
+        for ad_id in ids:
+            pipe.hsetnx(self.key, ad_id, owner)
+        pipe.expire(self.key, self.ttl_seconds)
+        added = pipe.execute()[:-1]
+        claimed = {ad_id for ad_id, is_new in zip(ids, added) if is_new}
+        taken = [ad_id for ad_id in ids if ad_id not in claimed]
+        if taken:
+            owners = self._client.hmget(self.key, taken)
+            claimed.update(ad_id for ad_id, value in zip(taken, owners) if value is not None and value.decode() == owner)
+        return claimed
+
+
+class FileSeenSet:
+    """Замена Redis для локальных запусков: строки «avito_id задача» в файле, доступ под flock."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def claim(self, ids: Iterable[int], owner: str) -> Set[int]:
+        """Закрепляет ID за `owner` и возвращает те, что принадлежат ему."""
+        ids = list(dict.fromkeys(int(ad_id) for ad_id in ids))
+        if not ids:
+            return set()
+        with open(self.path, "a+", encoding="utf-8") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                owners = dict(line.split(" ", 1) for line in f.read().splitlines() if line)
+                fresh = [ad_id for ad_id in ids if str(ad_id) not in owners]
+                if fresh:
+                    f.write("".join(f"{ad_id} {owner}\n" for ad_id in fresh))
+                    f.flush()
+                    os.fsync(f.fileno())
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+        return set(fresh) | {ad_id for ad_id in ids if owners.get(str(ad_id)) == owner}
+
+
+def open_seen_set(run_id: str, redis_url: Optional[str], fallback_dir: str, ttl_hours: float = 48):
+    """
+    Множество запуска `run_id`: в Redis, если задан `redis_url`, иначе в файле
+    `fallback_dir`. Без пакета redis при заданном адресе — RuntimeError.
+    """
+    from src.core.batches import run_dir
+
+    if redis_url:
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError(
+                "distributed.redis_url задан, но пакет redis не установлен (см. requirements.txt)."
+            ) from e
+        client = redis.Redis.from_url(redis_url)
+        return RedisSeenSet(client, f"{KEY_PREFIX}:{run_id}", ttl_seconds=int(ttl_hours * 3600))
+    return FileSeenSet(str(run_dir(run_id, fallback_dir) / "seen_ids.txt"))
@@ -2,6 +2,7 @@ import sys
 import requests
 from src.core.config import settings
 from src.core.logger import log
+from src.core.metrics import metrics
 
 
 def send_telegram_message(message: str) -> None:
@@ -23,8 +24,11 @@ def send_telegram_message(message: str) -> None:
     }
 
     try:
-        response = requests.post(url, params=params)
-        response.raise_for_status()
+        with metrics.timer("telegram_send"):
+            response = requests.post(url, params=params)
+            response.raise_for_status()
+        metrics.inc("telegram_messages", status="sent")
         log.info("Сообщение успешно отправлено в Telegram.")
     except requests.RequestException as e:
+        metrics.inc("telegram_messages", status="failed")
         log.error(f"Ошибка при отправке сообщения в Telegram: {e}")
\ No newline at end of file
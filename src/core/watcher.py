@@ -0,0 +1,365 @@
+"""
+Постоянный наблюдатель за выдачей вместо запуска DAG раз в 30 минут.
+
+Держит один «теплый» браузер и опрашивает первую страницу каждого поиска.
+Интервал опроса адаптивный: после опроса с новыми объявлениями он сокращается
+до `watcher.min_interval`, после пустого — растет в `watcher.backoff` раз до
+`watcher.max_interval`. Новые avito_id (и подешевевшие известные) сразу идут
+через сохранение, предсказание и отправку — те же шаги, что в потоковом режиме.
+
+Метрики задержки обнаружения (от published_at до того, как объявление увидено
+и до отправки уведомления) пишутся в лог и в JSON-файл `watcher.metrics_path`,
+время этапов за все опросы — в `metrics.dir/watcher.prom` (src.core.metrics).
+SIGTERM/SIGINT завершают работу после текущего опроса: браузер закрывается,
+метрики сохраняются.
+
+Запуск:
+    PYTHONPATH=/opt/airflow python -m src.core.watcher
+"""
+import asyncio
+import json
+import os
+import random
+import signal
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from functools import partial
+from pathlib import Path
+from typing import Awaitable, Callable, Deque, Dict, List, Optional
+
+from src.core.logger import log
+from src.core.metrics import export_run_metrics
+from src.core.rate_limit import TokenBucket
+
+
+@dataclass
+class PollSchedule:
+    """
+    Адаптивный интервал опроса.
+
+    Attributes:
+        min_interval: Интервал, пока объявления появляются, секунды.
+        max_interval: Предел интервала в тишине, секунды.
+        backoff: Во сколько раз растет интервал после опроса без новых объявлений.
+        jitter: Доля случайного разброса паузы, чтобы опросы не шли строго периодично.
+    """
+
+    min_interval: float = 20.0
+    max_interval: float = 300.0
+    backoff: float = 1.5
+    jitter: float = 0.1
+    interval: float = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.max_interval = max(self.max_interval, self.min_interval)
+        self.interval = self.min_interval
+
+    def update(self, new_ads: int) -> float:
+        """Пересчитывает интервал по итогам опроса и возвращает паузу до следующего."""
+        if new_ads:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.max_interval, self.interval * self.backoff)
+        return self.interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+
+class LatencyWindow:
+    """Скользящее окно задержек (секунды) с перцентилями."""
+
+    def __init__(self, size: int = 1000):
+        self._values: Deque[float] = deque(maxlen=size)
+        self.total = 0
+
+    def add(self, seconds: float) -> None:
+        self._values.append(max(seconds, 0.0))
+        self.total += 1
+
+    def summary(self) -> Dict[str, Optional[float]]:
+        if not self._values:
+            return {"count": self.total, "p50": None, "p90": None, "max": None}
+        ordered = sorted(self._values)
+
+        def percentile(q: float) -> float:
+            return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 1)
+
+        return {"count": self.total, "p50": percentile(0.5), "p90": percentile(0.9), "max": round(ordered[-1], 1)}
+
+
+def _seconds_since(published_at, now: datetime) -> Optional[float]:
+    if not isinstance(published_at, datetime):
+        return None
+    if published_at.tzinfo is not None:
+        published_at = published_at.astimezone().replace(tzinfo=None)
+    return (now - published_at).total_seconds()
+
+
+class Watcher:
+    """
+    Цикл опроса. Шаги обработки передаются явно, как в src.core.pipeline.run_stream;
+    `scrape(url)` возвращает объявления первой страницы поиска.
+    """
+
+    def __init__(
+        self,
+        searches: List[str],
+        scrape: Callable[[str], List[Dict]],
+        prepare: Callable[[List[Dict]], List[Dict]],
+        store: Callable[[List[Dict]], List[Dict]],
+        predict: Callable[[List[Dict]], List[Dict]],
+        notify: Callable[[List[Dict]], Awaitable[int]],
+        schedule: Optional[PollSchedule] = None,
+        metrics_path: Optional[str] = None,
+        max_remembered: int = 5000,
+    ):
+        self.searches = list(searches)
+        self.scrape = scrape
+        self.prepare = prepare
+        self.store = store
+        self.predict = predict
+        self.notify = notify
+        self.schedule = schedule or PollSchedule()
+        self.metrics_path = metrics_path
+        self.max_remembered = max_remembered
+        self.started_at = datetime.now()
+        self.counters = {"polls": 0, "errors": 0, "new_ads": 0, "deals": 0, "notified": 0}
+        self.detection_latency = LatencyWindow()
+        self.notification_latency = LatencyWindow()
+        self._last_poll_at: Optional[datetime] = None
+        # avito_id -> последняя обработанная цена; ограничен, чтобы не расти бесконечно.
+        self._remembered: "OrderedDict[int, object]" = OrderedDict()
+        # Сохраненные в БД объявления поиска, на которых упали предсказание или отправка.
+        # Повторно store_ads их уже не вернет, поэтому они ждут следующего опроса здесь.
+        self._unfinished: Dict[str, List[Dict]] = {}
+
+    def _unseen(self, ads: List[Dict]) -> List[Dict]:
+        """Объявления, которых наблюдатель еще не обработал или обработал с другой ценой."""
+        fresh = []
+        for ad in ads:
+            ad_id = ad["avito_id"]
+            if ad_id in self._remembered and self._remembered[ad_id] == ad.get("price"):
+                self._remembered.move_to_end(ad_id)
+                continue
+            fresh.append(ad)
+        return fresh
+
+    def _remember(self, ads: List[Dict]) -> None:
+        """Запоминает объявления, прошедшие сохранение, чтобы не отправлять их в БД снова."""
+        for ad in ads:
+            self._remembered[ad["avito_id"]] = ad.get("price")
+            self._remembered.move_to_end(ad["avito_id"])
+        while len(self._remembered) > self.max_remembered:
+            self._remembered.popitem(last=False)
+
+    async def _process(self, url: str, ads: List[Dict]) -> int:
+        """
+        Проводит объявления первой страницы через сохранение, предсказание и
+        отправку. Если сохранение упало, объявления не запоминаются и уйдут в
+        БД на следующем опросе; если упали предсказание или отправка — уже
+        сохраненные объявления повторяются на следующем опросе (журнал
+        уведомлений не даст отправить дважды то, что успело уйти).
+        """
+        loop = asyncio.get_running_loop()
+        fresh = self._unseen(ads)
+        prepared = await loop.run_in_executor(None, self.prepare, fresh) if fresh else []
+        stored = await loop.run_in_executor(None, self.store, prepared) if prepared else []
+        self._remember(fresh)
+
+        stored_ids = {ad["avito_id"] for ad in stored}
+        pending = stored + [ad for ad in self._unfinished.pop(url, []) if ad["avito_id"] not in stored_ids]
+        if not pending:
+            return 0
+
+        detected_at = datetime.now()
+        # У подешевевших известных объявлений published_at старый — в задержку их не считаем.
+        fresh_listings = [ad for ad in stored if ad.get("previous_price") is None]
+        for ad in fresh_listings:
+            latency = _seconds_since(ad.get("published_at"), detected_at)
+            if latency is not None:
+                self.detection_latency.add(latency)
+        self.counters["new_ads"] += len(stored)
+
+        try:
+            deals = await loop.run_in_executor(None, self.predict, pending)
+            notified = await self.notify(deals) if deals else 0
+        except Exception:
+            self._unfinished[url] = pending
+            raise
+        if deals:
+            self.counters["deals"] += len(deals)
+            self.counters["notified"] += notified
+            notified_at = datetime.now()
+            for ad in deals:
+                if ad.get("previous_price") is not None:
+                    continue
+                latency = _seconds_since(ad.get("published_at"), notified_at)
+                if latency is not None:
+                    self.notification_latency.add(latency)
+            log.info(f"Наблюдатель: {len(deals)} выгодных из {len(pending)} новых объявлений ({url}).")
+        return len(stored)
+
+    async def poll_once(self) -> int:
+        """Один проход по всем поискам. Возвращает число новых объявлений."""
+        loop = asyncio.get_running_loop()
+        new_ads = 0
+        for url in self.searches:
+            try:
+                ads = await loop.run_in_executor(None, self.scrape, url)
+                new_ads += await self._process(url, ads)
+            except Exception as e:
+                self.counters["errors"] += 1
+                log.error(f"Наблюдатель: ошибка при опросе {url}: {e}", exc_info=True)
+        self.counters["polls"] += 1
+        self._last_poll_at = datetime.now()
+        return new_ads
+
+    def metrics(self) -> Dict:
+        return {
+            **self.counters,
+            "interval": round(self.schedule.interval, 1),
+            "started_at": self.started_at.isoformat(),
+            "last_poll_at": self._last_poll_at.isoformat() if self._last_poll_at else None,
+            "detection_latency_seconds": self.detection_latency.summary(),
+            "notification_latency_seconds": self.notification_latency.summary(),
+        }
+
+    def write_metrics(self) -> None:
+        if not self.metrics_path:
+            return
+        path = Path(self.metrics_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.metrics(), f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+    async def run(self, stop: asyncio.Event, log_every: int = 10) -> Dict:
+        """Опрашивает поиски, пока не выставлен `stop`. Возвращает итоговые метрики."""
+        log.info(f"Наблюдатель запущен: {len(self.searches)} поисков, интервал "
+                 f"{self.schedule.min_interval:.0f}–{self.schedule.max_interval:.0f} с.")
+        while not stop.is_set():
+            new_ads = await self.poll_once()
+            delay = self.schedule.update(new_ads)
+            self.write_metrics()
+            # Наблюдатель не завершается: метрики копятся за все опросы, снимок обновляется после каждого.
+            export_run_metrics("watcher", reset=False, log_stages=False)
+            if self.counters["polls"] % log_every == 0:
+                log.info(f"Метрики наблюдателя: {json.dumps(self.metrics(), ensure_ascii=False)}")
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+        self.write_metrics()
+        export_run_metrics("watcher", reset=False)
+        log.info(f"Наблюдатель остановлен: {json.dumps(self.metrics(), ensure_ascii=False)}")
+        return self.metrics()
+
+
+class WarmBrowser:
+    """
+    Один долгоживущий WebDriver для опросов первой страницы. Упавший драйвер
+    закрывается и пересоздается при следующем опросе. Загрузки страниц идут
+    через общий токен-бакет (`requests_per_minute`).
+    """
+
+    def __init__(self, load_wait=None, requests_per_minute: float = 20, driver_factory=None):
+        from src.parsers.browser_pool import create_chrome_driver
+        from src.parsers.lazy_load import LoadWaitConfig
+
+        self.load_wait = load_wait or LoadWaitConfig()
+        self.budget = TokenBucket(rate=requests_per_minute / 60.0)
+        self._factory = driver_factory or create_chrome_driver
+        self._driver = None
+
+    def first_page(self, url: str) -> List[Dict]:
+        from selenium.common.exceptions import WebDriverException
+
+        from src.parsers.avito_selenium_parser import iter_avito_pages
+
+        if self._driver is None:
+            self._driver = self._factory()
+        self.budget.acquire()
+        try:
+            pages = list(iter_avito_pages(url, num_pages=1, load_wait=self.load_wait, driver=self._driver))
+        except WebDriverException:
+            log.warning("Теплый браузер упал, при следующем опросе будет запущен новый.")
+            self.close()
+            raise
+        return pages[0][1] if pages else []
+
+    def close(self) -> None:
+        if self._driver is not None:
+            try:
+                self._driver.quit()
+            except Exception as e:
+                log.warning(f"Ошибка при закрытии WebDriver: {e}")
+            self._driver = None
+
+
+def run_watcher() -> Dict:
+    """Запускает наблюдатель с настройками из config.yaml до SIGTERM/SIGINT."""
+    from src.core.config import settings
+    from src.core.notifier import configured_chat_ids, log_summary, notifier_from_settings, notify_deals
+    from src.core.searches import load_searches, match_search, profit_thresholds
+    from src.core.worker import prepare_ads, store_ads
+    from src.db.session import SessionLocal
+    from src.ml.client import predict_and_filter
+    from src.parsers.lazy_load import LoadWaitConfig
+
+    browser = WarmBrowser(
+        LoadWaitConfig(timeout=settings.get_load_timeout(), politeness_floor=settings.get_politeness_floor()),
+        requests_per_minute=settings.get_requests_per_minute(),
+    )
+    schedule = PollSchedule(
+        min_interval=settings.get_watcher_min_interval(),
+        max_interval=settings.get_watcher_max_interval(),
+        backoff=settings.get_watcher_backoff(),
+    )
+    chat_ids = configured_chat_ids()
+    batch_size = settings.get_telegram_batch_size()
+    searches = {search.url: search for search in load_searches()}
+
+    def scrape(url: str) -> List[Dict]:
+        return match_search(searches[url], browser.first_page(url))
+
+    def prepare(ads: List[Dict]) -> List[Dict]:
+        # Заголовки уже отобраны по каждому поиску в scrape.
+        return prepare_ads(ads, filter_titles=False)
+
+    async def run() -> Dict:
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, stop.set)
+
+        async with notifier_from_settings() as notifier:
+            async def notify(deals: List[Dict]) -> int:
+                with SessionLocal() as db:
+                    summary = await notify_deals(notifier, chat_ids, deals, batch_size, db)
+                log_summary(summary)
+                if summary["failed"]:
+                    # Неотправленные повторятся на следующем опросе (см. Watcher._process).
+                    raise RuntimeError(f"Не удалось отправить {summary['failed']} уведомлений.")
+                return summary["sent"]
+
+            watcher = Watcher(
+                list(searches),
+                scrape,
+                prepare,
+                partial(store_ads, raise_errors=True),
+                partial(predict_and_filter, thresholds=profit_thresholds(list(searches.values()))),
+                notify,
+                schedule=schedule,
+                metrics_path=settings.get_watcher_metrics_path(),
+            )
+            return await watcher.run(stop)
+
+    try:
+        return asyncio.run(run())
+    finally:
+        browser.close()
+        log.info("Теплый браузер закрыт.")
+
+
+if __name__ == "__main__":
+    run_watcher()
@@ -1,97 +1,174 @@
 import argparse
-import json
 from datetime import datetime
-from typing import Dict, List
-import pandas as pd
-import re
+from typing import Dict, List, Optional
 
+from src.core.catalogue import catalogue
 from src.core.config import settings
-from src.core.logger import log
-from src.db.models import Ad
-from src.db.session import SessionLocal
-from src.parsers.avito_selenium_parser import parse_avito_with_selenium
+from src.core.logger import flush_logs, log
+from src.core.metrics import export_run_metrics, metrics
+from src.core.searches import (
+    SearchSpec, assign_searches, load_searches, log_search_stats, relevance_by_url,
+)
+
+# pandas, SQLAlchemy и Selenium импортируются в функциях, которым они нужны:
+# запуск, не нашедший новых объявлений, не должен платить за их загрузку
+# (см. benchmarks/bench_startup.py).
+
+
+def has_known_product(ad: Dict) -> bool:
+    """Пройдет ли заголовок фильтр prepare_ads (каталог или прежний шаблон)."""
+    return catalogue.accepts(ad.get("title"))
+
+
+def collect_ads(searches: Optional[List[SearchSpec]] = None) -> List[Dict]:
+    """
+    Обходит все поиски из config.yaml на общем пуле браузеров и возвращает
+    подходящие по шаблонам объявления без повторов, помеченные ключом `search`.
+    """
+    from src.core.incremental import KnownAdsIndex
+    from src.parsers.avito_selenium_parser import crawl_searches
+    from src.parsers.lazy_load import LoadWaitConfig
+
+    searches = searches or load_searches()
+    pool_size = settings.get_pool_size()
+    load_wait = LoadWaitConfig(
+        timeout=settings.get_load_timeout(),
+        politeness_floor=settings.get_politeness_floor(),
+    )
+    for search in searches:
+        log.info(f"Поиск «{search.name}»: {search.pages} стр., {search.url}")
+
+    known_index = None
+    if settings.get_incremental():
+        known_index = KnownAdsIndex(
+            is_relevant=has_known_product,
+            window_hours=settings.get_known_ids_window_hours(),
+            relevant_by_url=relevance_by_url(searches),
+        ).load([search.url for search in searches])
+
+    log.info(f"Поисков: {len(searches)}, пул из {pool_size} браузеров.")
+    crawls = crawl_searches(
+        [search.url for search in searches],
+        num_pages=[search.pages for search in searches],
+        pool_size=pool_size,
+        requests_per_minute=settings.get_requests_per_minute(),
+        load_wait=load_wait,
+        stop_when=known_index.page_is_known if known_index else None,
+    )
+    if known_index is not None:
+        known_index.save()
+
+    ads, search_stats = assign_searches(searches, crawls)
+    log_search_stats(search_stats)
+    return ads
 
 
 def process_ads() -> List[Dict]:
     """
     Основная функция-обработчик.
-    Запускает парсер, фильтрует, обогащает, проверяет и сохраняет новые объявления.
-    Все настройки берутся из config.yaml.
+    Запускает парсер по всем поискам, фильтрует, обогащает, проверяет и сохраняет
+    новые объявления. Все настройки берутся из config.yaml.
     """
     log.info("Начинаем процесс обработки объявлений с помощью Selenium...")
-    
-    url_to_parse = settings.get_parser_url()
-    pages_to_scan = settings.get_pages_to_scan()
-    
-    log.info(f"Парсим URL из конфига: {url_to_parse}")
-    log.info(f"Количество страниц для сканирования: {pages_to_scan}")
-    
-    new_ads_data = parse_avito_with_selenium(url_to_parse, num_pages=pages_to_scan)
-    
+
+    with metrics.timer("collect"):
+        new_ads_data = collect_ads()
     if not new_ads_data:
         log.info("Парсер не вернул новых данных. Завершение работы.")
-        print(json.dumps([]))
         return []
-    
-    log.info(f"Получено {len(new_ads_data)} записей от парсера. Начинаем дедупликацию...")
-    unique_ads_dict = {ad["avito_id"]: ad for ad in new_ads_data}
-    unique_ads_list = list(unique_ads_dict.values())
-    log.info(f"После дедупликации осталось {len(unique_ads_list)} уникальных записей.")
-    
+
+    log.info(f"Получено {len(new_ads_data)} записей от парсера.")
+    # Заголовки уже отобраны по каждому поиску в collect_ads.
+    unique_ads_list = prepare_ads(new_ads_data, filter_titles=False)
     if not unique_ads_list:
-        print(json.dumps([]))
+        log.info("После строгой фильтрации не осталось объявлений для обработки.")
         return []
-        
-    df = pd.DataFrame(unique_ads_list)
-    original_count = len(df)
-
-    perfect_title_pattern = r'^iPhone[\w\s]+,\s\d+\s(?:ГБ|ТБ)$'
-    df = df[df['title'].str.match(perfect_title_pattern, na=False)].copy()
-    log.info(f"Отфильтровано по ИДЕАЛЬНОМУ формату заголовка. Осталось {len(df)} из {original_count} объявлений.")
-
-    if not df.empty:
-        split_data = df['title'].str.split(', ', n=1, expand=True)
-        df['model'] = split_data[0].str.strip()
-        df['memory'] = split_data[1].str.strip()
-        log.info("Столбец 'title' успешно разделен на 'model' и 'memory'.")
-    else:
-        df['model'] = pd.Series(dtype='str')
-        df['memory'] = pd.Series(dtype='str')
-
-    unique_ads_list = df.to_dict('records')
-    
-    ads_to_add_data = []
+    return store_ads(unique_ads_list)
+
+
+def prepare_ads(raw_ads: List[Dict], filter_titles: bool = True) -> List[Dict]:
+    """
+    Дедупликация по avito_id и разбор заголовка каталогом (src.core.catalogue):
+    к объявлению добавляются model, memory и их коды model_code, memory_code.
+    Объявления, которые каталог не распознал, отбрасываются; с
+    `filter_titles=False` (заголовки уже отобраны шаблонами поисков) они
+    остаются с кодами 0 и model/memory из разбиения заголовка по ", ".
+    """
+    unique_ads_dict = {ad["avito_id"]: ad for ad in raw_ads}
+    log.info(f"После дедупликации осталось {len(unique_ads_dict)} уникальных записей.")
+
+    with metrics.timer("prepare"):
+        prepared = catalogue.annotate(unique_ads_dict.values(), keep_unknown=not filter_titles)
+    if filter_titles:
+        log.info(f"Каталог распознал модель и память у {len(prepared)} из {len(unique_ads_dict)} объявлений.")
+    return prepared
+
+
+def store_ads(ads: List[Dict], raise_errors: bool = False) -> List[Dict]:
+    """
+    Сохраняет объявления в БД и фиксирует изменения цен уже известных.
+
+    Args:
+        raise_errors: Пробросить ошибку сохранения после отката, а не вернуть
+            пустой список (наблюдателю нужно отличать сбой от «нового нет»).
+
+    Returns:
+        Новые объявления и подешевевшие известные (с ключом `previous_price`).
+        При ошибке сохранения — пустой список.
+    """
+    from src.db.bulk import insert_new_ads
+    from src.db.price_history import record_price_changes
+    from src.db.session import SessionLocal
+
     with SessionLocal() as db:
-        new_avito_ids = {ad["avito_id"] for ad in unique_ads_list}
-        if not new_avito_ids:
-            log.info("После строгой фильтрации не осталось объявлений для обработки.")
-            print(json.dumps([]))
-            return []
-        existing_ads_query = db.query(Ad.avito_id).filter(Ad.avito_id.in_(new_avito_ids))
-        existing_avito_ids = {ad_id for (ad_id,) in existing_ads_query.all()}
-        log.info(f"Найдено {len(existing_avito_ids)} уже существующих объявлений в БД.")
-        ads_to_add_data = [ad_data for ad_data in unique_ads_list if ad_data["avito_id"] not in existing_avito_ids]
-        if not ads_to_add_data:
-            log.info("Новых объявлений для добавления нет.")
-            print(json.dumps([]))
-            return []
-        log.info(f"Будет добавлено {len(ads_to_add_data)} новых объявлений.")
         try:
-            for ad_data in ads_to_add_data:
-                ad_model = Ad(**ad_data)
-                db.add(ad_model)
-            db.commit()
-            log.info("Новые объявления успешно сохранены в базу данных.")
-            def json_converter(o):
-                if isinstance(o, datetime):
-                    return o.isoformat()
-            print(json.dumps(ads_to_add_data, default=json_converter))
-            return ads_to_add_data
+            with metrics.timer("db_dedupe"):
+                ads_to_add_data = insert_new_ads(db, ads)
+            inserted_ids = {ad["avito_id"] for ad in ads_to_add_data}
+            seen_ads = [ad for ad in ads if ad["avito_id"] not in inserted_ids]
+            with metrics.timer("price_history"):
+                price_drops = record_price_changes(db, seen_ads)
+            with metrics.timer("db_commit"):
+                db.commit()
         except Exception as e:
             log.error(f"Произошла ошибка при сохранении: {e}", exc_info=True)
             db.rollback()
-            print(json.dumps([]))
+            if raise_errors:
+                raise
             return []
 
+    log.info(f"Уже существовало в БД: {len(seen_ads)} объявлений, из них подешевело: {len(price_drops)}.")
+    log.info(f"Добавлено {len(ads_to_add_data)} новых объявлений.")
+    metrics.inc("ads_new", len(ads_to_add_data))
+    metrics.inc("price_drops", len(price_drops))
+    ads_to_add_data = ads_to_add_data + price_drops
+    if not ads_to_add_data:
+        log.info("Новых объявлений и снижений цены нет.")
+        return []
+    return ads_to_add_data
+
+
+def main() -> None:
+    """
+    Сбор одним процессом (без распределения по воркерам, см. src.core.distributed):
+    сохраняет найденные объявления пакетом (src.core.batches) и печатает путь
+    к нему последней строкой. Время этапов выгружается в metrics.dir/worker.prom.
+    """
+    from src.core.batches import cleanup_batches, write_batch
+
+    parser = argparse.ArgumentParser(description="Сбор новых объявлений с Avito.")
+    parser.add_argument("--run-id", default=None, help="run_id Airflow, ключ пакета")
+    args = parser.parse_args()
+
+    batch_dir = settings.get_batch_dir()
+    cleanup_batches(batch_dir, settings.get_batch_retention_hours())
+    ads = process_ads()
+    run_id = args.run_id or f"manual__{datetime.now().strftime('%Y%m%dT%H%M%S')}"
+    path = write_batch(ads, run_id, batch_dir=batch_dir)
+    export_run_metrics("worker")
+    flush_logs()
+    print(path)
+
+
 if __name__ == "__main__":
-    process_ads()
\ No newline at end of file
+    main()
\ No newline at end of file
@@ -0,0 +1,74 @@
+import math
+from typing import Dict, Iterator, List, Set
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from src.db.models import Ad
+
+ADS_TABLE = Ad.__table__
+AD_COLUMNS = frozenset(column.name for column in ADS_TABLE.columns)
+
+
+def iter_chunks(rows: List[Dict], size: int) -> Iterator[List[Dict]]:
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def clean_value(value):
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+def _to_rows(ads: List[Dict]) -> List[Dict]:
+    """Оставляет только колонки таблицы ads и заменяет NaN из pandas на NULL."""
+    return [{key: clean_value(value) for key, value in ad.items() if key in AD_COLUMNS} for ad in ads]
+
+
+def _insert_postgres(db: Session, rows: List[Dict], chunk_size: int) -> Set[int]:
+    inserted = set()
+    for chunk in iter_chunks(rows, chunk_size):
+        stmt = (
+            pg_insert(ADS_TABLE)
+            .values(chunk)
+            .on_conflict_do_nothing(index_elements=[ADS_TABLE.c.avito_id])
+            .returning(ADS_TABLE.c.avito_id)
+        )
+        inserted.update(ad_id for (ad_id,) in db.execute(stmt))
+    return inserted
+
+
+def _insert_generic(db: Session, rows: List[Dict], chunk_size: int) -> Set[int]:
+    """Запасной путь для SQLite и других СУБД: поиск существующих ID и пакетная вставка остальных."""
+    inserted = set()
+    for chunk in iter_chunks(rows, chunk_size):
+        ids = [row["avito_id"] for row in chunk]
+        existing = {
+            ad_id for (ad_id,) in db.execute(select(ADS_TABLE.c.avito_id).where(ADS_TABLE.c.avito_id.in_(ids)))
+        }
+        fresh = [row for row in chunk if row["avito_id"] not in existing]
+        if fresh:
+            db.execute(ADS_TABLE.insert(), fresh)
+            inserted.update(row["avito_id"] for row in fresh)
+    return inserted
+
+
+def insert_new_ads(db: Session, ads: List[Dict], chunk_size: int = 1000) -> List[Dict]:
+    """
+    Пакетно сохраняет объявления и возвращает только те, что действительно были вставлены.
+
+    В PostgreSQL это один `INSERT ... ON CONFLICT (avito_id) DO NOTHING RETURNING avito_id`
+    на каждые `chunk_size` строк, без предварительного SELECT. Для остальных СУБД
+    (SQLite в тестах) используется запасной путь с поиском существующих ID.
+    Транзакцию фиксирует вызывающий код.
+    """
+    if not ads:
+        return []
+    rows = _to_rows(ads)
+    if db.get_bind().dialect.name == "postgresql":
+        inserted = _insert_postgres(db, rows, chunk_size)
+    else:
+        inserted = _insert_generic(db, rows, chunk_size)
+    return [ad for ad in ads if ad["avito_id"] in inserted]
@@ -36,6 +36,54 @@ class Ad(Base):
     def __repr__(self):
         return f"<Ad(id={self.avito_id}, title='{self.title[:30]}...')>"
 
+
+class AdPriceHistory(Base):
+    """
+    Журнал изменений цены уже известных объявлений (только добавление).
+    Строка появляется, когда при повторном сканировании цена отличается от сохраненной.
+    """
+    __tablename__ = 'ad_price_history'
+
+    avito_id = Column(BigInteger, primary_key=True)
+    observed_at = Column(DateTime(timezone=True), primary_key=True)
+    previous_price = Column(Integer, nullable=True)
+    price = Column(Integer, nullable=True)
+
+    def __repr__(self):
+        return f"<AdPriceHistory(id={self.avito_id}, {self.previous_price} -> {self.price})>"
+
+
+class ScanState(Base):
+    """
+    Отметка "самого свежего" объявления, увиденного по каждому поисковому URL.
+    Используется инкрементальным обходом, чтобы не листать уже известные страницы.
+    """
+    __tablename__ = 'scan_state'
+
+    search_url = Column(String(1000), primary_key=True)
+    last_avito_id = Column(BigInteger, nullable=True)
+    last_published_at = Column(DateTime(timezone=True), nullable=True)
+    updated_at = Column(DateTime(timezone=True), nullable=False)
+
+    def __repr__(self):
+        return f"<ScanState(url='{self.search_url[:40]}...', last_id={self.last_avito_id})>"
+
+class SentNotification(Base):
+    """
+    Журнал отправленных уведомлений. Ключ — чат, объявление и цена, так что
+    повтор задачи не дублирует сообщение, а снижение цены уведомляет заново.
+    """
+    __tablename__ = 'sent_notifications'
+
+    chat_id = Column(String(64), primary_key=True)
+    avito_id = Column(BigInteger, primary_key=True)
+    price = Column(Integer, primary_key=True, default=0)
+    message_id = Column(BigInteger, nullable=True)
+    sent_at = Column(DateTime(timezone=True), nullable=False)
+
+    def __repr__(self):
+        return f"<SentNotification(chat={self.chat_id}, id={self.avito_id}, price={self.price})>"
+
 if __name__ == "__main__":
     from src.db.session import engine
 
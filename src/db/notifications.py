@@ -0,0 +1,58 @@
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import and_, or_, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from src.db.bulk import clean_value, iter_chunks
+from src.db.models import SentNotification
+
+NOTIFICATIONS_TABLE = SentNotification.__table__
+
+# Ключ уведомления: (chat_id, avito_id, цена). Цена 0 — если у объявления ее нет.
+NotificationKey = Tuple[str, int, int]
+
+
+def notification_key(chat_id: str, ad: Dict) -> NotificationKey:
+    price = clean_value(ad.get("price"))
+    return str(chat_id), int(ad["avito_id"]), int(price) if price is not None else 0
+
+
+def already_sent(db: Session, keys: Iterable[NotificationKey], chunk_size: int = 1000) -> Set[NotificationKey]:
+    """Возвращает ключи, по которым уведомление уже отправлялось."""
+    table = NOTIFICATIONS_TABLE
+    found = set()
+    for chunk in iter_chunks(list(set(keys)), chunk_size):
+        condition = or_(*(
+            and_(table.c.chat_id == chat_id, table.c.avito_id == avito_id, table.c.price == price)
+            for chat_id, avito_id, price in chunk
+        ))
+        found.update(
+            (chat_id, avito_id, price)
+            for chat_id, avito_id, price in db.execute(
+                select(table.c.chat_id, table.c.avito_id, table.c.price).where(condition)
+            )
+        )
+    return found
+
+
+def mark_sent(db: Session, keys: List[NotificationKey], message_id: Optional[int] = None) -> None:
+    """
+    Записывает отправленные уведомления. Уже записанные ключи пропускаются
+    (ON CONFLICT DO NOTHING в PostgreSQL). Транзакцию фиксирует вызывающий код.
+    """
+    if not keys:
+        return
+    sent_at = datetime.now()
+    rows = [
+        {"chat_id": chat_id, "avito_id": avito_id, "price": price, "message_id": message_id, "sent_at": sent_at}
+        for chat_id, avito_id, price in dict.fromkeys(keys)
+    ]
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(pg_insert(NOTIFICATIONS_TABLE).values(rows).on_conflict_do_nothing())
+        return
+    existing = already_sent(db, keys)
+    fresh = [row for row in rows if (row["chat_id"], row["avito_id"], row["price"]) not in existing]
+    if fresh:
+        db.execute(NOTIFICATIONS_TABLE.insert(), fresh)
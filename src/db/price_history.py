@@ -0,0 +1,69 @@
+from datetime import datetime
+from typing import Dict, List
+
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.orm import Session
+
+from src.db.bulk import ADS_TABLE, iter_chunks, clean_value
+from src.db.models import AdPriceHistory
+
+HISTORY_TABLE = AdPriceHistory.__table__
+
+
+def _as_price(value):
+    value = clean_value(value)
+    return int(value) if value is not None else None
+
+
+def record_price_changes(db: Session, seen_ads: List[Dict], chunk_size: int = 5000) -> List[Dict]:
+    """
+    Сравнивает свежие цены уже известных объявлений с сохраненными и фиксирует изменения.
+
+    Текущая цена хранится в `ads.price`, поэтому сравнение — это один поиск
+    по первичному ключу на каждые `chunk_size` объявлений, а не запрос на каждое.
+    Изменения пакетно дописываются в `ad_price_history`, а `ads.price` обновляется.
+    Транзакцию фиксирует вызывающий код.
+
+    Returns:
+        Объявления, подешевевшие с прошлого сканирования, с ключом `previous_price`.
+    """
+    fresh_prices = {}
+    for ad in seen_ads:
+        price = _as_price(ad.get("price"))
+        if price is not None:
+            fresh_prices[ad["avito_id"]] = price
+    if not fresh_prices:
+        return []
+
+    changes = []
+    for chunk in iter_chunks(list(fresh_prices), chunk_size):
+        stored = db.execute(
+            select(ADS_TABLE.c.avito_id, ADS_TABLE.c.price).where(ADS_TABLE.c.avito_id.in_(chunk))
+        )
+        for ad_id, stored_price in stored:
+            if stored_price is not None and stored_price != fresh_prices[ad_id]:
+                changes.append((ad_id, stored_price, fresh_prices[ad_id]))
+    if not changes:
+        return []
+
+    observed_at = datetime.now()
+    db.execute(
+        HISTORY_TABLE.insert(),
+        [
+            {"avito_id": ad_id, "observed_at": observed_at, "previous_price": old, "price": new}
+            for ad_id, old, new in changes
+        ],
+    )
+    db.execute(
+        update(ADS_TABLE)
+        .where(ADS_TABLE.c.avito_id == bindparam("b_avito_id"))
+        .values(price=bindparam("b_price")),
+        [{"b_avito_id": ad_id, "b_price": new} for ad_id, _, new in changes],
+    )
+
+    drops = {ad_id: old for ad_id, old, new in changes if new < old}
+    return [
+        {**ad, "previous_price": drops[ad["avito_id"]]}
+        for ad in seen_ads
+        if ad["avito_id"] in drops
+    ]
@@ -0,0 +1,62 @@
+import json
+from typing import Dict, List, Optional
+
+from src.core.config import settings
+from src.core.logger import log
+from src.core.metrics import metrics
+from src.core.searches import profit_thresholds
+
+
+def predict_prices_remote(new_ads: List[Dict], base_url: Optional[str] = None, timeout: float = 30.0) -> Optional[List[float]]:
+    """
+    Запрашивает предсказания у сервера модели.
+    Возвращает None, если сервер недоступен или не смог ответить.
+    """
+    import requests
+
+    base_url = base_url or settings.get_model_server_url()
+    try:
+        response = requests.post(
+            f"{base_url}/predict",
+            data=json.dumps({"ads": new_ads}, default=str),
+            headers={"Content-Type": "application/json"},
+            timeout=timeout,
+        )
+        response.raise_for_status()
+        return response.json()["predictions"]
+    except (requests.RequestException, ValueError, KeyError) as e:
+        log.warning(f"Сервер модели недоступен ({base_url}): {e}")
+        return None
+
+
+def predict_and_filter(new_ads: List[Dict], thresholds: Optional[Dict[str, int]] = None) -> List[Dict]:
+    """
+    То же, что src.ml.predictor.predict_and_filter, но через сервер модели:
+    объявления всех поисков уходят одним запросом, порог выгоды — по поиску.
+    Если сервер недоступен, модель загружается локально в текущем процессе.
+    """
+    if not new_ads:
+        return []
+    if thresholds is None:
+        thresholds = profit_thresholds()
+
+    with metrics.timer("predict_remote"):
+        predictions = predict_prices_remote(new_ads)
+    if predictions is None:
+        log.info("Загружаем модель локально.")
+        from src.ml.predictor import predict_and_filter as predict_and_filter_local
+
+        return predict_and_filter_local(new_ads, thresholds)
+
+    profit_threshold = settings.get_profit_threshold()
+    profitable_ads = []
+    for ad, predicted_price in zip(new_ads, predictions):
+        price = ad.get("price")
+        if price is None:
+            continue
+        profit = predicted_price - price
+        if profit >= thresholds.get(ad.get("search"), profit_threshold):
+            profitable_ads.append({**ad, "predicted_price": predicted_price, "profit": profit})
+    metrics.inc("ads_scored", len(new_ads))
+    metrics.inc("deals", len(profitable_ads))
+    return profitable_ads
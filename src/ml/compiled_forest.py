@@ -0,0 +1,206 @@
+"""
+Компактное представление RandomForestRegressor для предсказаний без pickle и sklearn.
+
+Экспорт складывает все узлы всех деревьев в один структурированный NumPy-массив
+(`price_predictor_forest.npy`) и пишет рядом метаданные (`price_predictor_forest.json`):
+корни деревьев, число признаков и глубину. Массив открывается через mmap, поэтому
+загрузка почти мгновенная, а страницы файла делят между собой все процессы.
+
+Экспорт из обученной модели:
+    python -m src.ml.compiled_forest --model models/price_predictor_model.pkl
+"""
+import argparse
+import hashlib
+import json
+import os
+import warnings
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+FOREST_PATH = "/opt/airflow/models/price_predictor_forest.npy"
+FORMAT_VERSION = 1
+
+NODE_DTYPE = np.dtype([
+    ("feature", np.int32),
+    ("threshold", np.float64),
+    ("left", np.int32),
+    ("right", np.int32),
+    ("value", np.float64),
+])
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def meta_path_for(forest_path: str) -> str:
+    return str(Path(forest_path).with_suffix(".json"))
+
+
+class CompiledForest:
+    """
+    Лес как плоский массив узлов.
+
+    Индексы детей абсолютные (по всему массиву). У листьев оба ребенка указывают
+    на сам лист, а признак равен 0: шаг из листа возвращает тот же узел, по этому
+    признаку пара (строка, дерево) выбывает из обхода. Поля узлов при создании
+    копируются в отдельные непрерывные массивы — выборка по индексам из
+    структурированного массива шла бы с шагом в размер узла.
+    """
+
+    def __init__(self, nodes: np.ndarray, roots: np.ndarray, n_features: int, max_depth: int,
+                 source_sha256: Optional[str] = None):
+        self.nodes = nodes
+        self.source_sha256 = source_sha256
+        self.roots = np.asarray(roots, dtype=np.int64)
+        self.n_features = n_features
+        self.max_depth = max_depth
+        self._feature = np.ascontiguousarray(nodes["feature"], dtype=np.int64)
+        self._threshold = np.ascontiguousarray(nodes["threshold"])
+        self._left = np.ascontiguousarray(nodes["left"], dtype=np.int64)
+        self._right = np.ascontiguousarray(nodes["right"], dtype=np.int64)
+        self._value = np.ascontiguousarray(nodes["value"])
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @classmethod
+    def from_sklearn(cls, model) -> "CompiledForest":
+        """Собирает массив узлов из обученного RandomForestRegressor (один выход)."""
+        trees = [estimator.tree_ for estimator in model.estimators_]
+        if any(tree.n_outputs != 1 for tree in trees):
+            raise ValueError("Поддерживаются только модели с одним выходом")
+
+        nodes = np.zeros(sum(tree.node_count for tree in trees), dtype=NODE_DTYPE)
+        roots = np.zeros(len(trees), dtype=np.int64)
+        offset = 0
+        for tree_idx, tree in enumerate(trees):
+            count = tree.node_count
+            block = nodes[offset:offset + count]
+            own = np.arange(offset, offset + count, dtype=np.int32)
+            is_leaf = tree.children_left < 0
+            block["feature"] = np.where(is_leaf, 0, tree.feature)
+            block["threshold"] = tree.threshold
+            block["left"] = np.where(is_leaf, own, tree.children_left + offset)
+            block["right"] = np.where(is_leaf, own, tree.children_right + offset)
+            block["value"] = tree.value[:, 0, 0]
+            roots[tree_idx] = offset
+            offset += count
+
+        max_depth = max(tree.max_depth for tree in trees)
+        return cls(nodes, roots, int(model.n_features_in_), int(max_depth))
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        """Среднее по деревьям для каждой строки, как RandomForestRegressor.predict."""
+        # sklearn сравнивает признаки в float32 с порогами в float64 — делаем так же.
+        features = np.ascontiguousarray(features, dtype=np.float32)
+        if features.ndim != 2 or features.shape[1] != self.n_features:
+            raise ValueError(f"Ожидалась матрица с {self.n_features} признаками, получено {features.shape}")
+
+        n_rows, n_trees = features.shape[0], len(self.roots)
+        flat_features = features.ravel()
+        # Каждая пара (строка, дерево) — одна позиция; по мере прихода в листья
+        # позиции выбывают, и следующие шаги работают с меньшими массивами.
+        node = np.tile(self.roots, n_rows)
+        offset = np.repeat(np.arange(n_rows, dtype=np.int64) * self.n_features, n_trees)
+        position = np.arange(n_rows * n_trees)
+        leaves = np.empty(n_rows * n_trees, dtype=np.int64)
+        while position.size:
+            go_left = flat_features[offset + self._feature[node]] <= self._threshold[node]
+            next_node = np.where(go_left, self._left[node], self._right[node])
+            at_leaf = next_node == node
+            if at_leaf.any():
+                leaves[position[at_leaf]] = node[at_leaf]
+                active = ~at_leaf
+                position, node, offset = position[active], next_node[active], offset[active]
+            else:
+                node = next_node
+        return self._value[leaves].reshape(n_rows, n_trees).mean(axis=1)
+
+    def save(self, forest_path: str) -> None:
+        """
+        Пишет массив узлов и метаданные. Каждый файл сначала пишется во временный
+        и подменяется через os.replace; метаданные пишутся последними и хранят
+        число узлов, так что полузаписанный экспорт при загрузке не пройдет проверку.
+        """
+        forest_path = str(forest_path)
+        Path(forest_path).parent.mkdir(parents=True, exist_ok=True)
+        tmp_nodes = f"{forest_path}.tmp"
+        with open(tmp_nodes, "wb") as f:
+            np.save(f, self.nodes)
+        os.replace(tmp_nodes, forest_path)
+
+        meta = {
+            "format_version": FORMAT_VERSION,
+            "n_features": self.n_features,
+            "n_nodes": int(len(self.nodes)),
+            "max_depth": self.max_depth,
+            "roots": [int(root) for root in self.roots],
+            "source_sha256": self.source_sha256,
+        }
+        meta_path = meta_path_for(forest_path)
+        tmp_meta = f"{meta_path}.tmp"
+        with open(tmp_meta, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_meta, meta_path)
+
+    @classmethod
+    def load(cls, forest_path: str, mmap: bool = True) -> "CompiledForest":
+        with open(meta_path_for(forest_path), "r") as f:
+            meta = json.load(f)
+        if meta.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Неизвестная версия формата леса: {meta.get('format_version')}")
+        nodes = np.load(forest_path, mmap_mode="r" if mmap else None)
+        if nodes.dtype != NODE_DTYPE or len(nodes) != meta["n_nodes"]:
+            raise ValueError(f"Файл леса {forest_path} не соответствует метаданным")
+        return cls(nodes, np.array(meta["roots"], dtype=np.int64), meta["n_features"], meta["max_depth"],
+                   meta.get("source_sha256"))
+
+
+def verify_against(model, forest: CompiledForest, rows: int = 2_000, seed: int = 0) -> float:
+    """
+    Сравнивает предсказания леса и исходной модели на случайных 0/1-матрицах
+    (все признаки модели — one-hot и флаги). Возвращает максимальное расхождение.
+    """
+    features = np.random.default_rng(seed).integers(0, 2, size=(rows, forest.n_features)).astype(np.float32)
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", message="X does not have valid feature names")
+        expected = model.predict(features)
+    return float(np.max(np.abs(expected - forest.predict(features))))
+
+
+def export_model(model_path: str, forest_path: str = FOREST_PATH, tolerance: float = 1e-6) -> CompiledForest:
+    """Загружает модель из pickle, компилирует, проверяет и сохраняет рядом."""
+    import joblib
+
+    model = joblib.load(model_path)
+    forest = CompiledForest.from_sklearn(model)
+    max_error = verify_against(model, forest)
+    scale = max(1.0, float(np.max(np.abs(forest._value))))
+    if max_error > tolerance * scale:
+        raise ValueError(f"Скомпилированный лес расходится с моделью: {max_error}")
+    forest.source_sha256 = file_sha256(model_path)
+    forest.save(forest_path)
+    return forest
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Экспорт RandomForest в массивы NumPy.")
+    parser.add_argument("--model", default="/opt/airflow/models/price_predictor_model.pkl")
+    parser.add_argument("--out", default=None, help="Путь к .npy (по умолчанию рядом с моделью)")
+    args = parser.parse_args()
+
+    out = args.out or str(Path(args.model).with_name(Path(FOREST_PATH).name))
+    forest = export_model(args.model, out)
+    print(f"Сохранено {forest.n_trees} деревьев, {len(forest.nodes)} узлов, глубина {forest.max_depth}: {out}")
+
+
+if __name__ == "__main__":
+    main()
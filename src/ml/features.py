@@ -0,0 +1,141 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from src.core.catalogue import catalogue
+
+KEYWORD_FLAGS: Dict[str, str] = {
+    "has_defect": "дефект|разбит|царапин|трещин|менялся|ремонт",
+    "is_ideal": "идеал|отличн|как нов",
+    "has_box": "коробк",
+    "not_opened": "не вскрывался|не ремонтировался",
+    "has_warranty": "гаранти",
+}
+
+CATEGORICAL_FEATURES = ("model", "memory")
+# Ключ с кодом каталога (src.core.catalogue) для каждого категориального признака.
+CATEGORY_CODE_KEYS = {"model": "model_code", "memory": "memory_code"}
+REGEX_METACHARS = frozenset("\\.^$*+?()[]{}")
+
+
+class KeywordMatcher:
+    """
+    Выставляет флаги из KEYWORD_FLAGS без pandas и без регулярных выражений.
+
+    Шаблоны флагов — это перечисления подстрок через "|", поэтому при создании
+    они раскладываются в список (подстрока, флаг). Для пакета описаний все
+    тексты приводятся к нижнему регистру один раз и склеиваются через NUL,
+    после чего каждая подстрока ищется по общему буферу встроенным str.find.
+    Python-код выполняется только на найденных вхождениях, а не на каждом
+    объявлении. Результат совпадает с пятью str.contains исходной реализации.
+    """
+
+    def __init__(self, keyword_flags: Dict[str, str] = KEYWORD_FLAGS):
+        self.flags = list(keyword_flags)
+        self.keywords: List[Tuple[str, int]] = []
+        for flag_idx, pattern in enumerate(keyword_flags.values()):
+            for keyword in pattern.split("|"):
+                if not keyword or any(char in REGEX_METACHARS for char in keyword):
+                    raise ValueError(f"Ожидалось перечисление подстрок через '|', получено: {pattern!r}")
+                self.keywords.append((keyword, flag_idx))
+
+    def match(self, text: Optional[str]) -> List[int]:
+        """Возвращает индексы флагов, сработавших на тексте."""
+        if not isinstance(text, str) or not text:
+            return []
+        text = text.lower()
+        return sorted({flag_idx for keyword, flag_idx in self.keywords if keyword in text})
+
+    def matrix(self, texts: Iterable[Optional[str]]) -> np.ndarray:
+        """Матрица флагов (строки — тексты, столбцы — self.flags) в int8."""
+        lowered = [text.lower() if isinstance(text, str) else "" for text in texts]
+        out = np.zeros((len(lowered), len(self.flags)), dtype=np.int8)
+        if not lowered:
+            return out
+        ends = np.cumsum(np.fromiter((len(text) + 1 for text in lowered), dtype=np.int64, count=len(lowered)))
+        corpus = "\0".join(lowered)
+        for keyword, flag_idx in self.keywords:
+            positions = []
+            find = corpus.find
+            pos = find(keyword)
+            while pos >= 0:
+                positions.append(pos)
+                pos = find(keyword, pos + 1)
+            if positions:
+                out[np.searchsorted(ends, positions, side="right"), flag_idx] = 1
+        return out
+
+
+class FeatureEncoder:
+    """
+    Кодирует объявления прямо в матрицу признаков модели.
+
+    Строится один раз по model_columns.json: для one-hot колонок
+    (`model_<значение>`, `memory_<значение>`, как их называет pd.get_dummies)
+    заранее известен номер столбца, для флагов — номер столбца флага.
+    transform заполняет заранее выделенную float32-матрицу в порядке колонок
+    модели, не создавая промежуточных DataFrame. Неизвестные значения категорий
+    дают нули во всех их столбцах — как get_dummies + reindex.
+
+    У объявлений, прошедших каталог, столбец категории берется по коду
+    (model_code, memory_code) из заранее собранного массива код -> столбец;
+    строка категории ищется в словаре только у объявлений без кода.
+    """
+
+    def __init__(self, model_columns: List[str], matcher: Optional[KeywordMatcher] = None):
+        self.columns = list(model_columns)
+        self.matcher = matcher or KeywordMatcher()
+        column_index = {name: idx for idx, name in enumerate(self.columns)}
+
+        self.category_index: Dict[str, Dict[str, int]] = {}
+        for feature in CATEGORICAL_FEATURES:
+            prefix = f"{feature}_"
+            self.category_index[feature] = {
+                name[len(prefix):]: idx for name, idx in column_index.items() if name.startswith(prefix)
+            }
+        self.code_columns: Dict[str, np.ndarray] = {
+            "model": np.array(
+                [-1] + [self.category_index["model"].get(name, -1) for name in catalogue.models], dtype=np.int64
+            ),
+            "memory": np.array(
+                [-1] + [self.category_index["memory"].get(label, -1) for label in catalogue.memory_labels],
+                dtype=np.int64,
+            ),
+        }
+        self.flag_columns = np.array(
+            [column_index.get(flag, -1) for flag in self.matcher.flags], dtype=np.int64
+        )
+        self.uses_flags = bool((self.flag_columns >= 0).any())
+
+    @property
+    def n_features(self) -> int:
+        return len(self.columns)
+
+    def _category_columns(self, ads: List[Dict], feature: str, index: Dict[str, int]) -> np.ndarray:
+        """Номер one-hot столбца категории для каждого объявления (-1 — нет столбца)."""
+        code_key, lookup = CATEGORY_CODE_KEYS[feature], self.code_columns[feature]
+        codes = np.fromiter((ad.get(code_key) or 0 for ad in ads), dtype=np.int64, count=len(ads))
+        codes[(codes < 0) | (codes >= len(lookup))] = 0
+        cols = lookup[codes]
+        for row in np.flatnonzero(codes == 0):
+            cols[row] = index.get(ads[row].get(feature), -1)
+        return cols
+
+    def transform(self, ads: List[Dict]) -> np.ndarray:
+        """Возвращает матрицу признаков (len(ads), n_features) в float32."""
+        count = len(ads)
+        matrix = np.zeros((count, self.n_features), dtype=np.float32)
+        if not count:
+            return matrix
+        rows = np.arange(count)
+        for feature, index in self.category_index.items():
+            cols = self._category_columns(ads, feature, index)
+            known = cols >= 0
+            matrix[rows[known], cols[known]] = 1.0
+
+        if self.uses_flags:
+            flags = self.matcher.matrix(ad.get("description") for ad in ads)
+            for flag_idx, col in enumerate(self.flag_columns):
+                if col >= 0:
+                    matrix[:, col] = flags[:, flag_idx]
+        return matrix
@@ -0,0 +1,223 @@
+"""
+Табличный предсказатель для дискретного пространства признаков.
+
+Все признаки модели — one-hot колонки model/memory и бинарные флаги из описания,
+поэтому различных векторов признаков конечное и небольшое число. После обучения
+модель один раз вызывается на всех комбинациях, а предсказания складываются в
+плотную таблицу (`price_predictor_table.npy` + `price_predictor_table.json`).
+Ключ комбинации — смешанная система счисления: у каждой категории код 0 ("ни
+одна колонка не выставлена" — базовая категория после drop_first и неизвестные
+значения) или 1..N по порядку колонок, у каждого флага — 0/1. Ключ считается
+одним умножением матрицы признаков на вектор весов, предсказание — выборкой
+из таблицы.
+
+Построение по обученной модели:
+    python -m src.ml.lookup_table --model models/price_predictor_model.pkl --columns models/model_columns.json
+"""
+import argparse
+import json
+import os
+import warnings
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from src.ml.compiled_forest import file_sha256
+from src.ml.features import CATEGORICAL_FEATURES, KEYWORD_FLAGS
+
+TABLE_PATH = "/opt/airflow/models/price_predictor_table.npy"
+FORMAT_VERSION = 1
+MAX_ENTRIES = 1 << 22
+
+# Группа — номера колонок, из которых выставлена не более чем одна, и ее основание.
+Group = Tuple[np.ndarray, int]
+
+
+def meta_path_for(table_path: str) -> str:
+    return str(Path(table_path).with_suffix(".json"))
+
+
+def column_groups(model_columns: List[str]) -> Optional[List[Group]]:
+    """
+    Раскладывает колонки модели на группы: по одной на каждую категорию
+    и по одной на каждый флаг. Возвращает None, если среди колонок есть
+    признак, который таблица представить не может.
+    """
+    groups: List[Group] = []
+    covered = set()
+    for feature in CATEGORICAL_FEATURES:
+        prefix = f"{feature}_"
+        cols = [idx for idx, name in enumerate(model_columns) if name.startswith(prefix)]
+        if cols:
+            groups.append((np.array(cols, dtype=np.int64), len(cols) + 1))
+            covered.update(cols)
+    for idx, name in enumerate(model_columns):
+        if name in KEYWORD_FLAGS:
+            groups.append((np.array([idx], dtype=np.int64), 2))
+            covered.add(idx)
+    if len(covered) != len(model_columns):
+        return None
+    return groups
+
+
+def _key_layout(groups: List[Group], n_features: int) -> Tuple[np.ndarray, np.ndarray, int]:
+    """Вес каждой колонки в ключе, множитель каждой группы и общее число ключей."""
+    weights = np.zeros(n_features, dtype=np.float64)
+    multipliers = np.zeros(len(groups), dtype=np.int64)
+    multiplier = 1
+    for group_idx, (cols, radix) in enumerate(groups):
+        multipliers[group_idx] = multiplier
+        weights[cols] = np.arange(1, len(cols) + 1) * multiplier
+        multiplier *= radix
+    return weights, multipliers, multiplier
+
+
+class PriceTable:
+    """
+    Плотная таблица предсказаний с интерфейсом модели: predict(features).
+
+    Строки, которые таблица не покрывает (небинарные значения или несколько
+    выставленных колонок одной категории), отправляются в `fallback` — живую
+    модель, если она передана.
+    """
+
+    def __init__(self, values: np.ndarray, model_columns: List[str], source_sha256: Optional[str] = None,
+                 fallback=None):
+        groups = column_groups(model_columns)
+        if groups is None:
+            raise ValueError("Колонки модели нельзя представить таблицей")
+        self.columns = list(model_columns)
+        self.source_sha256 = source_sha256
+        self.fallback = fallback
+        self._groups = groups
+        self._weights, self._multipliers, n_entries = _key_layout(groups, len(model_columns))
+        if len(values) != n_entries:
+            raise ValueError(f"Ожидалось {n_entries} значений в таблице, получено {len(values)}")
+        self.values = values
+
+    @property
+    def n_entries(self) -> int:
+        return len(self.values)
+
+    def feature_matrix(self, keys: np.ndarray) -> np.ndarray:
+        """Восстанавливает матрицу признаков по ключам (обратное к keys)."""
+        matrix = np.zeros((len(keys), len(self.columns)), dtype=np.float32)
+        rows = np.arange(len(keys))
+        for (cols, radix), multiplier in zip(self._groups, self._multipliers):
+            codes = (keys // multiplier) % radix
+            chosen = codes > 0
+            matrix[rows[chosen], cols[codes[chosen] - 1]] = 1.0
+        return matrix
+
+    def keys(self, features: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Ключи строк и маска строк, которые таблица покрывает."""
+        features = np.asarray(features)
+        covered = ((features == 0) | (features == 1)).all(axis=1)
+        for cols, radix in self._groups:
+            if radix > 2:
+                covered &= features[:, cols].sum(axis=1) <= 1
+        keys = np.rint(features @ self._weights).astype(np.int64)
+        keys[~covered] = 0
+        return keys, covered
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        keys, covered = self.keys(features)
+        predictions = self.values[keys].astype(np.float64)
+        if not covered.all():
+            if self.fallback is None:
+                raise ValueError("Признаки вне таблицы, а живая модель не передана")
+            predictions[~covered] = _predict_quietly(self.fallback, np.asarray(features)[~covered])
+        return predictions
+
+    @classmethod
+    def build(cls, model, model_columns: List[str], source_sha256: Optional[str] = None,
+              fallback=None, batch_size: int = 65_536) -> "PriceTable":
+        """
+        Вызывает модель на всех комбинациях признаков и собирает таблицу.
+        Запасной моделью по умолчанию становится та же `model`.
+        """
+        groups = column_groups(model_columns)
+        if groups is None:
+            raise ValueError("Колонки модели нельзя представить таблицей")
+        _, _, n_entries = _key_layout(groups, len(model_columns))
+        if n_entries > MAX_ENTRIES:
+            raise ValueError(f"Слишком много комбинаций признаков: {n_entries}")
+
+        table = cls(np.zeros(n_entries), model_columns, source_sha256, fallback=fallback if fallback is not None else model)
+        for start in range(0, n_entries, batch_size):
+            keys = np.arange(start, min(start + batch_size, n_entries), dtype=np.int64)
+            table.values[start:start + len(keys)] = _predict_quietly(model, table.feature_matrix(keys))
+        return table
+
+    def save(self, table_path: str) -> None:
+        """Пишет значения и метаданные через временные файлы и os.replace (метаданные последними)."""
+        table_path = str(table_path)
+        Path(table_path).parent.mkdir(parents=True, exist_ok=True)
+        tmp_values = f"{table_path}.tmp"
+        with open(tmp_values, "wb") as f:
+            np.save(f, self.values)
+        os.replace(tmp_values, table_path)
+
+        meta = {
+            "format_version": FORMAT_VERSION,
+            "columns": self.columns,
+            "n_entries": self.n_entries,
+            "source_sha256": self.source_sha256,
+        }
+        meta_path = meta_path_for(table_path)
+        tmp_meta = f"{meta_path}.tmp"
+        with open(tmp_meta, "w") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp_meta, meta_path)
+
+    @classmethod
+    def load(cls, table_path: str, fallback=None) -> "PriceTable":
+        with open(meta_path_for(table_path), "r") as f:
+            meta = json.load(f)
+        if meta.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Неизвестная версия формата таблицы: {meta.get('format_version')}")
+        values = np.load(table_path, mmap_mode="r")
+        if len(values) != meta["n_entries"]:
+            raise ValueError(f"Файл таблицы {table_path} не соответствует метаданным")
+        return cls(values, meta["columns"], meta.get("source_sha256"), fallback=fallback)
+
+
+def _predict_quietly(model, features: np.ndarray) -> np.ndarray:
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", message="X does not have valid feature names")
+        return model.predict(features)
+
+
+def verify_table(table: PriceTable, model, sample: int = 512, seed: int = 0) -> float:
+    """
+    Сверяет таблицу с живой моделью на случайной выборке ключей.
+    Возвращает максимальное расхождение.
+    """
+    count = min(sample, table.n_entries)
+    keys = np.random.default_rng(seed).choice(table.n_entries, size=count, replace=False)
+    expected = _predict_quietly(model, table.feature_matrix(keys))
+    return float(np.max(np.abs(expected - table.values[keys]))) if count else 0.0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Построение таблицы предсказаний по обученной модели.")
+    parser.add_argument("--model", default="/opt/airflow/models/price_predictor_model.pkl")
+    parser.add_argument("--columns", default="/opt/airflow/models/model_columns.json")
+    parser.add_argument("--out", default=None, help="Путь к .npy (по умолчанию рядом с моделью)")
+    args = parser.parse_args()
+
+    import joblib
+
+    model = joblib.load(args.model)
+    with open(args.columns, "r") as f:
+        model_columns = json.load(f)
+    table = PriceTable.build(model, model_columns, source_sha256=file_sha256(args.model))
+    max_error = verify_table(table, model)
+    out = args.out or str(Path(args.model).with_name(Path(TABLE_PATH).name))
+    table.save(out)
+    print(f"Сохранено {table.n_entries} комбинаций (расхождение с моделью {max_error:.2e}): {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Долгоживущий сервер предсказаний.
+
+Загружает модель один раз, переключается на новую версию из реестра моделей
+(или перезагружает модель при замене файлов) и отдает
+пакетные предсказания по HTTP, чтобы задачи DAG не платили за распаковку
+модели на каждом запуске.
+
+Запуск:
+    python -m src.ml.model_server [--host 127.0.0.1] [--port 8765]
+"""
+import argparse
+import json
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Union
+
+from src.core.config import settings
+from src.core.logger import log
+from src.ml.predictor import COLUMNS_PATH, MODEL_PATH, ModelHolder, RegistryHolder, predict_prices
+from src.ml.registry import REGISTRY_DIR, ModelRegistry
+
+
+def make_handler(holder: Union[ModelHolder, RegistryHolder]):
+    """Создает класс обработчика запросов, привязанный к конкретному держателю модели."""
+
+    class PredictionHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send_json(self, status: int, payload: dict) -> None:
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path != "/health":
+                self._send_json(404, {"error": "not found"})
+                return
+            model, encoder = holder.get()
+            self._send_json(
+                200 if model is not None else 503,
+                {
+                    "model_loaded": model is not None,
+                    "model_version": getattr(holder, "version", None),
+                    "model_sha256": holder.model_sha256,
+                    "columns": encoder.n_features if encoder else 0,
+                },
+            )
+
+        def do_POST(self):
+            if self.path != "/predict":
+                self._send_json(404, {"error": "not found"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                ads = json.loads(self.rfile.read(length))["ads"]
+            except (ValueError, KeyError, TypeError) as e:
+                self._send_json(400, {"error": f"bad request: {e}"})
+                return
+
+            started = time.perf_counter()
+            try:
+                predictions = predict_prices(ads, holder)
+            except Exception as e:
+                log.error(f"Ошибка при предсказании: {e}", exc_info=True)
+                self._send_json(500, {"error": str(e)})
+                return
+            if predictions is None:
+                self._send_json(503, {"error": "model is not loaded"})
+                return
+
+            log.info(f"Предсказано {len(ads)} объявлений за {(time.perf_counter() - started) * 1000:.1f} мс.")
+            self._send_json(
+                200,
+                {
+                    "predictions": [float(value) for value in predictions],
+                    "model_version": getattr(holder, "version", None),
+                    "model_sha256": holder.model_sha256,
+                },
+            )
+
+        def log_message(self, format, *args):
+            pass
+
+    return PredictionHandler
+
+
+def serve(host: str, port: int, holder: Union[ModelHolder, RegistryHolder, None] = None) -> None:
+    """Запускает сервер и блокирует поток до остановки (Ctrl+C / SIGTERM)."""
+    holder = holder or RegistryHolder(fallback=ModelHolder())
+    holder.get()
+    server = ThreadingHTTPServer((host, port), make_handler(holder))
+    log.info(f"Сервер модели слушает http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        log.info("Сервер модели остановлен.")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Сервер предсказаний цены.")
+    parser.add_argument("--host", default=settings.get_model_server_host())
+    parser.add_argument("--port", type=int, default=settings.get_model_server_port())
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--columns", default=COLUMNS_PATH)
+    parser.add_argument("--forest", default=None, help="Скомпилированный лес (по умолчанию рядом с моделью)")
+    parser.add_argument("--registry", default=REGISTRY_DIR, help="Реестр моделей; --model/--columns — запасной путь")
+    args = parser.parse_args()
+    fallback = ModelHolder(args.model, args.columns, args.forest)
+    serve(args.host, args.port, RegistryHolder(ModelRegistry(args.registry), fallback=fallback))
+
+
+if __name__ == "__main__":
+    main()
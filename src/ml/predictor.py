@@ -1,56 +1,339 @@
-import joblib
 import json
-import pandas as pd
-from typing import List, Dict
+import os
+import threading
+import warnings
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
 from src.core.config import settings
+from src.core.logger import log
+from src.core.metrics import metrics
+from src.core.searches import profit_thresholds
+from src.ml.compiled_forest import FOREST_PATH, CompiledForest, file_sha256, meta_path_for
+from src.ml.features import FeatureEncoder
+from src.ml.lookup_table import TABLE_PATH, PriceTable, verify_table
+from src.ml.lookup_table import meta_path_for as table_meta_path_for
+from src.ml.registry import ModelRegistry
 
 MODEL_PATH = "/opt/airflow/models/price_predictor_model.pkl"
 COLUMNS_PATH = "/opt/airflow/models/model_columns.json"
+TABLE_TOLERANCE = 0.01
 
-try:
-    model = joblib.load(MODEL_PATH)
-    with open(COLUMNS_PATH, 'r') as f:
-        model_columns = json.load(f)
-except FileNotFoundError:
-    model = None
-    model_columns = None
-    print("Warning: Model files not found. Predictor will not work.")
 
-def feature_engineering(df: pd.DataFrame) -> pd.DataFrame:
+class ModelHolder:
     """
-    Применяет ту же самую логику создания признаков, что и в ноутбуке.
+    Держит загруженную модель и построенный по ее колонкам FeatureEncoder.
+
+    Модель загружается при первом обращении, а не при импорте. Если рядом лежит
+    скомпилированный лес (см. src.ml.compiled_forest) не старше pickle, используется
+    он: файл открывается через mmap, pickle и sklearn при этом не нужны. Иначе
+    модель загружается из pickle. Если есть таблица предсказаний
+    (см. src.ml.lookup_table), построенная по этой же модели и колонкам и
+    совпадающая с ней на выборочной проверке, вместо модели отдается таблица,
+    а модель остается для комбинаций вне таблицы. Перед каждым обращением
+    сверяются mtime и размер файлов: если файлы заменили, модель перезагружается, а если новые файлы не
+    читаются (например, еще дописываются) — продолжает работать прежняя версия.
     """
-    df['description_lower'] = df['description'].str.lower().fillna('')
-    
-    df['has_defect'] = df['description_lower'].str.contains('дефект|разбит|царапин|трещин|менялся|ремонт', na=False).astype(int)
-    df['is_ideal'] = df['description_lower'].str.contains('идеал|отличн|как нов', na=False).astype(int)
-    df['has_box'] = df['description_lower'].str.contains('коробк', na=False).astype(int)
-    df['not_opened'] = df['description_lower'].str.contains('не вскрывался|не ремонтировался', na=False).astype(int)
-    df['has_warranty'] = df['description_lower'].str.contains('гаранти', na=False).astype(int)
-    
-    return df
 
-def predict_and_filter(new_ads: List[Dict]) -> List[Dict]:
+    def __init__(
+        self,
+        model_path: str = MODEL_PATH,
+        columns_path: str = COLUMNS_PATH,
+        forest_path: Optional[str] = None,
+        table_path: Optional[str] = None,
+    ):
+        self.model_path = model_path
+        self.columns_path = columns_path
+        self.forest_path = forest_path or str(Path(model_path).with_name(Path(FOREST_PATH).name))
+        self.table_path = table_path or str(Path(model_path).with_name(Path(TABLE_PATH).name))
+        self.model = None
+        self.encoder: Optional[FeatureEncoder] = None
+        self.model_sha256: Optional[str] = None
+        self._signature: Optional[Tuple] = None
+        self._lock = threading.Lock()
+
+    def _source_paths(self) -> Tuple[str, ...]:
+        """Файлы, из которых будет загружена модель: скомпилированный лес, если он есть, иначе pickle."""
+        forest_meta = meta_path_for(self.forest_path)
+        try:
+            forest_mtime = min(os.stat(self.forest_path).st_mtime_ns, os.stat(forest_meta).st_mtime_ns)
+        except FileNotFoundError:
+            return (self.model_path, self.columns_path)
+        try:
+            pickle_is_newer = os.stat(self.model_path).st_mtime_ns > forest_mtime
+        except FileNotFoundError:
+            pickle_is_newer = False
+        if pickle_is_newer:
+            # Модель переобучили, а лес не переэкспортировали — он устарел.
+            return (self.model_path, self.columns_path)
+        return (self.forest_path, forest_meta, self.columns_path)
+
+    def _current_signature(self) -> Optional[Tuple]:
+        paths = self._source_paths()
+        try:
+            stats = [os.stat(path) for path in paths]
+        except FileNotFoundError:
+            return None
+        table_stats = []
+        for path in (self.table_path, table_meta_path_for(self.table_path)):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            table_stats.append((stat.st_mtime_ns, stat.st_size))
+        return (paths,) + tuple((stat.st_mtime_ns, stat.st_size) for stat in stats) + tuple(table_stats)
+
+    def _load_model(self, source_path: str):
+        with metrics.timer("model_load"):
+            if source_path == self.forest_path:
+                return CompiledForest.load(self.forest_path)
+            # joblib (и sklearn за ним) нужен только для исходной модели, без скомпилированного леса.
+            import joblib
+
+            return joblib.load(self.model_path)
+
+    def _try_table(self, model, model_columns: List[str], source_sha256: Optional[str]):
+        """Возвращает таблицу предсказаний поверх модели или саму модель, если таблица не подходит."""
+        if not os.path.exists(self.table_path):
+            return model
+        try:
+            table = PriceTable.load(self.table_path, fallback=model)
+        except Exception as e:
+            log.warning(f"Не удалось загрузить таблицу предсказаний, используется модель: {e}")
+            return model
+        if table.columns != model_columns or table.source_sha256 != source_sha256:
+            log.warning("Таблица предсказаний построена по другой модели, используется модель.")
+            return model
+        max_error = verify_table(table, model)
+        if max_error > TABLE_TOLERANCE:
+            log.error(f"Таблица предсказаний расходится с моделью на {max_error:.2f}, используется модель.")
+            return model
+        log.info(f"Используется таблица предсказаний: {table.n_entries} комбинаций.")
+        return table
+
+    def get(self) -> Tuple[Optional[object], Optional[FeatureEncoder]]:
+        """Возвращает (модель, кодировщик признаков), при необходимости загружая или перезагружая их."""
+        signature = self._current_signature()
+        if signature is None:
+            if self.model is None:
+                log.warning("Файлы модели не найдены. Предсказатель не будет работать.")
+            return self.model, self.encoder
+        if signature == self._signature:
+            return self.model, self.encoder
+
+        with self._lock:
+            if signature != self._signature:
+                source_path = signature[0][0]
+                try:
+                    model = self._load_model(source_path)
+                    with open(self.columns_path, "r") as f:
+                        model_columns = json.load(f)
+                    model_sha256 = file_sha256(source_path)
+                except Exception as e:
+                    log.error(f"Не удалось загрузить модель, используется прежняя версия: {e}")
+                    return self.model, self.encoder
+                log.info(f"Модель загружена: {source_path} (sha256 {model_sha256[:12]}).")
+                source_sha256 = model.source_sha256 if isinstance(model, CompiledForest) else model_sha256
+                model = self._try_table(model, model_columns, source_sha256)
+                self.model, self.encoder, self.model_sha256 = model, FeatureEncoder(model_columns), model_sha256
+                self._signature = signature
+        return self.model, self.encoder
+
+    def shadow(self, new_ads: List[Dict], predictions: np.ndarray) -> None:
+        """Без реестра кандидата нет — теневая оценка не выполняется."""
+        return None
+
+
+def _predict_with(model, encoder: FeatureEncoder, new_ads: List[Dict]) -> np.ndarray:
+    features = encoder.transform(new_ads)
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", message="X does not have valid feature names")
+        return model.predict(features)
+
+
+class ShadowScorer:
     """
-    Принимает список новых объявлений, предсказывает цену и фильтрует выгодные.
+    Считает предсказания модели-кандидата в фоновом потоке и пишет в лог
+    расхождения с текущей моделью. Основной путь только ставит задачу в
+    очередь; если фон не успевает, новые пакеты пропускаются, а не копятся.
     """
-    if not new_ads or model is None:
-        return []
-    
-    profit_threshold = settings.get_profit_threshold()
 
-    df = pd.DataFrame(new_ads)
+    def __init__(self, max_pending: int = 4):
+        self.max_pending = max_pending
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def submit(self, holder: "ModelHolder", candidate: str, current: Optional[str],
+               new_ads: List[Dict], predictions: np.ndarray):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                log.warning("Теневая оценка не успевает, пакет пропущен.")
+                return None
+            self._pending += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shadow")
+        return self._executor.submit(self._score, holder, candidate, current, list(new_ads), np.array(predictions))
+
+    def _score(self, holder, candidate, current, new_ads, predictions) -> Optional[Dict]:
+        try:
+            model, encoder = holder.get()
+            if model is None:
+                return None
+            shadow = _predict_with(model, encoder, new_ads)
+            delta = shadow - predictions
+            prices = np.array(
+                [ad.get("price") if ad.get("price") is not None else np.nan for ad in new_ads], dtype=float
+            )
+            threshold = settings.get_profit_threshold()
+            known = ~np.isnan(prices)
+            flips = int((((predictions - prices) >= threshold) != ((shadow - prices) >= threshold))[known].sum())
+            report = {
+                "candidate": candidate,
+                "current": current,
+                "ads": len(new_ads),
+                "mean_abs_delta": float(np.mean(np.abs(delta))),
+                "max_abs_delta": float(np.max(np.abs(delta))),
+                "mean_delta": float(np.mean(delta)),
+                "decision_flips": flips,
+            }
+            log.info(
+                f"Тень {candidate} против {current}: {report['ads']} объявлений, "
+                f"средн. |Δ| {report['mean_abs_delta']:.0f} руб., макс. |Δ| {report['max_abs_delta']:.0f} руб., "
+                f"средн. Δ {report['mean_delta']:+.0f} руб., решений о выгоде изменилось: {flips}."
+            )
+            return report
+        except Exception as e:
+            log.error(f"Ошибка теневой оценки кандидата {candidate}: {e}", exc_info=True)
+            return None
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+
+class RegistryHolder:
+    """
+    Отдает модель версии, на которую указывает CURRENT в реестре (src.ml.registry).
+
+    Указатель перечитывается при каждом обращении, поэтому смена версии —
+    атомарная запись указателя — подхватывается без перезапуска. Загруженные
+    версии держатся в LRU из `cache_size` штук: откат на предыдущую версию
+    не требует повторной загрузки. Пока реестр пуст, используется `fallback`
+    (ModelHolder на прежних путях в models/).
+    """
+
+    def __init__(self, registry: Optional[ModelRegistry] = None, fallback: Optional[ModelHolder] = None,
+                 cache_size: int = 3):
+        self.registry = registry or ModelRegistry()
+        self.fallback = fallback
+        self.cache_size = cache_size
+        self.version: Optional[str] = None
+        self.model_sha256: Optional[str] = None
+        self.shadow_scorer = ShadowScorer()
+        self._holders: "OrderedDict[str, ModelHolder]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def holder_for(self, version: str) -> ModelHolder:
+        with self._lock:
+            holder = self._holders.get(version)
+            if holder is None:
+                holder = ModelHolder(self.registry.model_path(version), self.registry.columns_path(version))
+                self._holders[version] = holder
+                while len(self._holders) > self.cache_size:
+                    evicted, _ = self._holders.popitem(last=False)
+                    log.info(f"Версия модели {evicted} выгружена из кэша.")
+            self._holders.move_to_end(version)
+            return holder
+
+    def get(self) -> Tuple[Optional[object], Optional[FeatureEncoder]]:
+        version = self.registry.current_version()
+        if version is None:
+            if self.fallback is None:
+                return None, None
+            model, encoder = self.fallback.get()
+            self.version, self.model_sha256 = None, self.fallback.model_sha256
+            return model, encoder
+        holder = self.holder_for(version)
+        model, encoder = holder.get()
+        if version != self.version and model is not None:
+            log.info(f"Активная версия модели: {version}.")
+        self.version, self.model_sha256 = version, holder.model_sha256
+        return model, encoder
+
+    def shadow(self, new_ads: List[Dict], predictions: np.ndarray):
+        """Ставит пакет на теневую оценку кандидатом, если он назначен."""
+        candidate = self.registry.candidate_version()
+        if candidate is None or candidate == self.version:
+            return None
+        return self.shadow_scorer.submit(self.holder_for(candidate), candidate, self.version, new_ads, predictions)
+
+
+default_holder = RegistryHolder(fallback=ModelHolder())
+
+
+def predict_prices(
+    new_ads: List[Dict], holder: Union[ModelHolder, RegistryHolder] = default_holder
+) -> Optional[np.ndarray]:
+    """
+    Предсказывает справедливую цену для каждого объявления.
+    Возвращает None, если модель недоступна.
+    """
+    model, encoder = holder.get()
+    if model is None:
+        return None
+    if not new_ads:
+        return np.empty(0)
+
+    predictions = _predict_with(model, encoder, new_ads)
+    holder.shadow(new_ads, predictions)
+    return predictions
 
-    df = feature_engineering(df)
 
-    df_encoded = pd.get_dummies(df, columns=['model', 'memory'])
-    
-    df_aligned = df_encoded.reindex(columns=model_columns, fill_value=0)
+def filter_profitable(
+    new_ads: List[Dict], predictions, profit_threshold: int, thresholds: Optional[Dict[str, int]] = None
+) -> List[Dict]:
+    """
+    Добавляет к объявлениям предсказанную цену и выгоду и оставляет выгодные.
+    `thresholds` — свой порог для объявлений каждого поиска (ключ `search`),
+    для остальных действует `profit_threshold`.
+    """
+    import pandas as pd
 
-    predictions = model.predict(df_aligned)
+    df = pd.DataFrame(new_ads)
     df['predicted_price'] = predictions
     df['profit'] = df['predicted_price'] - df['price']
 
-    profitable_ads_df = df[df['profit'] >= profit_threshold]
+    threshold = profit_threshold
+    if thresholds and 'search' in df:
+        threshold = df['search'].map(thresholds).fillna(profit_threshold)
+    profitable_ads_df = df[df['profit'] >= threshold]
+
+    return profitable_ads_df.to_dict('records')
+
+
+def predict_and_filter(new_ads: List[Dict], thresholds: Optional[Dict[str, int]] = None) -> List[Dict]:
+    """
+    Принимает список новых объявлений, предсказывает цену и фильтрует выгодные.
+    Объявления всех поисков оцениваются одним пакетом, порог выгоды — свой у каждого поиска.
+    `thresholds` — пороги по поиску (searches.profit_thresholds); если не переданы,
+    читаются из конфига.
+    """
+    if not new_ads:
+        return []
+
+    with metrics.timer("predict"):
+        predictions = predict_prices(new_ads)
+    if predictions is None:
+        return []
 
-    return profitable_ads_df.to_dict('records')
\ No newline at end of file
+    with metrics.timer("filter"):
+        if thresholds is None:
+            thresholds = profit_thresholds()
+        profitable = filter_profitable(new_ads, predictions, settings.get_profit_threshold(), thresholds)
+    metrics.inc("ads_scored", len(new_ads))
+    metrics.inc("deals", len(profitable))
+    return profitable
@@ -0,0 +1,229 @@
+"""
+Версионированный реестр моделей на диске.
+
+    registry/
+        versions/<версия>/price_predictor_model.pkl
+                         /model_columns.json
+                         /price_predictor_forest.{npy,json}   (если собран)
+                         /price_predictor_table.{npy,json}    (если собрана)
+                         /metadata.json
+        CURRENT      — версия, которой отвечает предсказатель
+        CANDIDATE    — версия для теневой оценки (необязательно)
+
+Версия — префикс sha256 содержимого модели и колонок, каталог версии после
+публикации не меняется. Публикация собирает каталог во временном месте и
+переименовывает его целиком, указатели переписываются через os.replace, поэтому
+читатели никогда не видят полузаписанных файлов, а откат — это смена указателя.
+
+Управление:
+    python -m src.ml.registry list
+    python -m src.ml.registry promote <версия>
+    python -m src.ml.registry candidate <версия> | --clear
+    python -m src.ml.registry import --model models/price_predictor_model.pkl --columns models/model_columns.json
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from src.ml.compiled_forest import FOREST_PATH, export_model
+from src.ml.lookup_table import TABLE_PATH, PriceTable, column_groups
+
+REGISTRY_DIR = "/opt/airflow/models/registry"
+MODEL_FILE = "price_predictor_model.pkl"
+COLUMNS_FILE = "model_columns.json"
+METADATA_FILE = "metadata.json"
+CURRENT_POINTER = "CURRENT"
+CANDIDATE_POINTER = "CANDIDATE"
+
+
+def _content_version(model_file: Path, columns_file: Path) -> str:
+    digest = hashlib.sha256()
+    for path in (model_file, columns_file):
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+class ModelRegistry:
+    """Каталог версий и указатели CURRENT/CANDIDATE (см. описание модуля)."""
+
+    def __init__(self, root: str = REGISTRY_DIR):
+        self.root = Path(root)
+        self.versions_dir = self.root / "versions"
+
+    def version_dir(self, version: str) -> Path:
+        return self.versions_dir / version
+
+    def model_path(self, version: str) -> str:
+        return str(self.version_dir(version) / MODEL_FILE)
+
+    def columns_path(self, version: str) -> str:
+        return str(self.version_dir(version) / COLUMNS_FILE)
+
+    def pointer_path(self, name: str = CURRENT_POINTER) -> Path:
+        return self.root / name
+
+    def metadata(self, version: str) -> Dict:
+        with open(self.version_dir(version) / METADATA_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def versions(self) -> List[Dict]:
+        """Метаданные всех опубликованных версий, от старых к новым."""
+        if not self.versions_dir.is_dir():
+            return []
+        found = []
+        for path in self.versions_dir.iterdir():
+            if (path / METADATA_FILE).is_file():
+                found.append(self.metadata(path.name))
+        return sorted(found, key=lambda meta: meta.get("created_at", ""))
+
+    def publish(self, write_files: Callable[[Path], None], metadata: Optional[Dict] = None) -> str:
+        """
+        Публикует новую версию.
+
+        `write_files(каталог)` должна записать в каталог как минимум MODEL_FILE и
+        COLUMNS_FILE (и, по желанию, производные файлы — лес, таблицу). Версия
+        считается по содержимому модели и колонок; если такая уже есть, новая
+        не создается. Указатели не меняются — см. promote и set_candidate.
+        """
+        self.versions_dir.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(prefix=".staging-", dir=self.versions_dir))
+        try:
+            write_files(staging)
+            model_file, columns_file = staging / MODEL_FILE, staging / COLUMNS_FILE
+            version = _content_version(model_file, columns_file)
+            with open(columns_file, "r", encoding="utf-8") as f:
+                columns = json.load(f)
+            meta = {
+                **(metadata or {}),
+                "version": version,
+                "created_at": datetime.now().isoformat(),
+                "model_bytes": model_file.stat().st_size,
+                "columns": columns,
+            }
+            with open(staging / METADATA_FILE, "w", encoding="utf-8") as f:
+                json.dump(meta, f, ensure_ascii=False, indent=2)
+
+            target = self.version_dir(version)
+            if target.exists():
+                return version
+            os.chmod(staging, 0o755)
+            os.rename(staging, target)
+            return version
+        finally:
+            if staging.exists():
+                shutil.rmtree(staging, ignore_errors=True)
+
+    def read_pointer(self, name: str = CURRENT_POINTER) -> Optional[str]:
+        try:
+            version = self.pointer_path(name).read_text().strip()
+        except FileNotFoundError:
+            return None
+        return version if version and self.version_dir(version).is_dir() else None
+
+    def _write_pointer(self, name: str, version: Optional[str]) -> None:
+        path = self.pointer_path(name)
+        if version is None:
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            return
+        if not self.version_dir(version).is_dir():
+            raise KeyError(f"Версия {version} не найдена в реестре {self.root}")
+        tmp_path = path.with_name(f".{name}.tmp")
+        tmp_path.write_text(version)
+        os.replace(tmp_path, path)
+
+    def current_version(self) -> Optional[str]:
+        return self.read_pointer(CURRENT_POINTER)
+
+    def candidate_version(self) -> Optional[str]:
+        return self.read_pointer(CANDIDATE_POINTER)
+
+    def promote(self, version: str) -> None:
+        """Атомарно переключает предсказатель на `version`."""
+        self._write_pointer(CURRENT_POINTER, version)
+        if self.candidate_version() == version:
+            self._write_pointer(CANDIDATE_POINTER, None)
+
+    def set_candidate(self, version: Optional[str]) -> None:
+        """Назначает версию для теневой оценки (None — выключить тень)."""
+        self._write_pointer(CANDIDATE_POINTER, version)
+
+    def prune(self, keep: int = 10) -> List[str]:
+        """Удаляет старые версии сверх `keep`, не трогая текущую и кандидата."""
+        pinned = {self.current_version(), self.candidate_version()}
+        removable = [meta["version"] for meta in self.versions() if meta["version"] not in pinned]
+        removed = removable[:max(0, len(removable) - keep)]
+        for version in removed:
+            shutil.rmtree(self.version_dir(version), ignore_errors=True)
+        return removed
+
+
+def build_derived_files(directory: Path) -> None:
+    """Собирает рядом с моделью скомпилированный лес и, если колонки позволяют, таблицу предсказаний."""
+    forest = export_model(str(directory / MODEL_FILE), str(directory / Path(FOREST_PATH).name))
+    with open(directory / COLUMNS_FILE, "r", encoding="utf-8") as f:
+        columns = json.load(f)
+    if column_groups(columns) is not None:
+        table = PriceTable.build(forest, columns, source_sha256=forest.source_sha256)
+        table.save(str(directory / Path(TABLE_PATH).name))
+
+
+def import_files(registry: ModelRegistry, model_path: str, columns_path: str, metadata: Optional[Dict] = None) -> str:
+    """Публикует уже обученную модель (например, из notebooks/model_retraining.ipynb)."""
+
+    def copy_files(target: Path) -> None:
+        shutil.copyfile(model_path, target / MODEL_FILE)
+        shutil.copyfile(columns_path, target / COLUMNS_FILE)
+        build_derived_files(target)
+
+    return registry.publish(copy_files, {"source": "import", **(metadata or {})})
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Управление реестром моделей.")
+    parser.add_argument("--registry", default=REGISTRY_DIR)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list")
+    promote = commands.add_parser("promote")
+    promote.add_argument("version")
+    candidate = commands.add_parser("candidate")
+    candidate.add_argument("version", nargs="?")
+    candidate.add_argument("--clear", action="store_true")
+    imported = commands.add_parser("import")
+    imported.add_argument("--model", required=True)
+    imported.add_argument("--columns", required=True)
+    imported.add_argument("--promote", action="store_true")
+    args = parser.parse_args()
+
+    registry = ModelRegistry(args.registry)
+    if args.command == "list":
+        current, candidate_version = registry.current_version(), registry.candidate_version()
+        for meta in registry.versions():
+            marker = "*" if meta["version"] == current else ("~" if meta["version"] == candidate_version else " ")
+            print(f"{marker} {meta['version']}  {meta.get('created_at', '')}  rows={meta.get('rows')}  "
+                  f"mae={meta.get('mae')}  columns={len(meta.get('columns', []))}")
+    elif args.command == "promote":
+        registry.promote(args.version)
+        print(f"Текущая версия: {args.version}")
+    elif args.command == "candidate":
+        registry.set_candidate(None if args.clear else args.version)
+        print(f"Кандидат: {registry.candidate_version()}")
+    elif args.command == "import":
+        version = import_files(registry, args.model, args.columns)
+        if args.promote:
+            registry.promote(version)
+        print(version)
+
+
+if __name__ == "__main__":
+    main()
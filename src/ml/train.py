@@ -0,0 +1,495 @@
+"""
+Переобучение модели цены без ручного экспорта CSV.
+
+Повторяет шаги notebooks/model_retraining.ipynb, но:
+  * читает таблицу `ads` порциями через серверный курсор, а не из ../data/ads_export.csv;
+  * кэширует очищенные признаки (NPZ-части, ключ — диапазон avito_id), так что
+    повторный запуск читает из базы только новые объявления, а прерванный —
+    продолжает с последней сохраненной части;
+  * считает границы выбросов одним groupby(...).quantile([0.01, 0.99]) вместо
+    лямбды на каждую группу;
+  * публикует модель новой версией в реестр (src.ml.registry) вместе со
+    скомпилированным лесом и таблицей предсказаний и переключает CURRENT —
+    или, с --shadow, назначает ее кандидатом для теневой оценки;
+  * умеет дообучать текущий лес на свежих объявлениях (warm_start) вместо
+    полного переобучения на всей истории.
+
+Запуск:
+    PYTHONPATH=/opt/airflow python -m src.ml.train [--full-refresh] [--incremental] [--shadow]
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import joblib
+import numpy as np
+import pandas as pd
+from sqlalchemy import func, select
+from sqlalchemy.engine import Engine
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.metrics import mean_absolute_error, r2_score
+from sklearn.model_selection import train_test_split
+
+from src.core.catalogue import LEGACY_TITLE_PATTERN, MODEL_ALIASES, TOKEN_ALIASES, catalogue
+from src.core.config import settings
+from src.core.logger import log
+from src.db.bulk import ADS_TABLE
+from src.db.price_history import HISTORY_TABLE
+from src.ml.features import CATEGORICAL_FEATURES, KEYWORD_FLAGS, KeywordMatcher
+from src.ml.registry import COLUMNS_FILE, MODEL_FILE, REGISTRY_DIR, ModelRegistry, build_derived_files
+
+PART_NAME = re.compile(r"^ads_(\d+)_(\d+)\.npz$")
+OUTLIER_QUANTILES = (0.01, 0.99)
+# Увеличивать при изменении правил prepare_chunk, не связанных с каталогом и флагами.
+PREPARE_VERSION = 2
+PART_META = ("scanned", "built_at", "prepare_version")
+
+
+MODEL_NAMES = np.array(("",) + catalogue.models, dtype=object)
+MEMORY_NAMES = np.array(("",) + catalogue.memory_labels, dtype=object)
+
+
+def prepare_chunk(chunk: pd.DataFrame, matcher: KeywordMatcher) -> pd.DataFrame:
+    """
+    Модель и память из заголовка по каталогу и флаги из описания. Заголовки,
+    которые каталог не распознал, но пропускал прежний шаблон, разбираются по
+    ", ", как раньше; остальные отбрасываются.
+    """
+    codes = np.array(
+        [catalogue.match(title) or (0, 0) for title in chunk["title"]], dtype=np.int64
+    ).reshape(-1, 2)
+    legacy = (codes[:, 0] == 0) & chunk["title"].str.match(LEGACY_TITLE_PATTERN, na=False).to_numpy()
+    keep = ((codes[:, 0] > 0) | legacy) & chunk["price"].notna().to_numpy()
+    chunk, codes, legacy = chunk[keep], codes[keep], legacy[keep]
+    model, memory = MODEL_NAMES[codes[:, 0]], MEMORY_NAMES[codes[:, 1]]
+    if legacy.any():
+        split = chunk["title"][legacy].str.split(", ", n=1, expand=True)
+        model[legacy] = split[0].str.strip().to_numpy()
+        memory[legacy] = split[1].str.strip().to_numpy()
+    prepared = pd.DataFrame({
+        "avito_id": chunk["avito_id"].astype(np.int64).to_numpy(),
+        "model": model,
+        "memory": memory,
+        "price": chunk["price"].astype(np.int64).to_numpy(),
+    })
+    flags = matcher.matrix(chunk["description"])
+    for idx, flag in enumerate(matcher.flags):
+        prepared[flag] = flags[:, idx]
+    return prepared
+
+
+def prepare_version() -> str:
+    """
+    Версия очистки признаков: PREPARE_VERSION, таблицы каталога, прежний шаблон
+    заголовка и флаги описания. Части кэша другой версии пересобираются.
+    """
+    payload = json.dumps(
+        [
+            PREPARE_VERSION, catalogue.models, sorted(MODEL_ALIASES.items()), sorted(TOKEN_ALIASES.items()),
+            catalogue.memory_sizes_gb, LEGACY_TITLE_PATTERN.pattern, KEYWORD_FLAGS,
+        ],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def _to_plain_array(series: pd.Series) -> np.ndarray:
+    """Строковые колонки сохраняются юникодным массивом, чтобы np.load не требовал pickle."""
+    if series.dtype == object:
+        return series.to_numpy(dtype=str)
+    return series.to_numpy()
+
+
+class FeatureCache:
+    """
+    Очищенные признаки по частям: `ads_<первый id>_<последний id>.npz`.
+
+    В каждой части хранятся колонки prepare_chunk (строки — как юникодные массивы,
+    без pickle), число просмотренных строк `ads` (включая отброшенные фильтром),
+    время сборки — по нему потом подтягиваются изменения цен — и версия
+    очистки (prepare_version), с которой часть собрана.
+    """
+
+    def __init__(self, cache_dir: str, version: Optional[str] = None):
+        self.cache_dir = Path(cache_dir)
+        self.version = version or prepare_version()
+
+    def parts(self) -> List[Tuple[int, int, Path]]:
+        if not self.cache_dir.is_dir():
+            return []
+        found = []
+        for path in self.cache_dir.iterdir():
+            match = PART_NAME.match(path.name)
+            if match:
+                found.append((int(match.group(1)), int(match.group(2)), path))
+        return sorted(found)
+
+    @property
+    def max_avito_id(self) -> Optional[int]:
+        parts = self.parts()
+        return parts[-1][1] if parts else None
+
+    def scanned_rows(self) -> int:
+        total = 0
+        for _, _, path in self.parts():
+            with np.load(path) as part:
+                total += int(part["scanned"])
+        return total
+
+    def is_current(self) -> bool:
+        """Собраны ли все части текущей версией очистки (части до версий ее не хранят)."""
+        for _, _, path in self.parts():
+            with np.load(path) as part:
+                if "prepare_version" not in part.files or str(part["prepare_version"]) != self.version:
+                    return False
+        return True
+
+    def append(self, prepared: pd.DataFrame, first_id: int, last_id: int, scanned: int) -> None:
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self.cache_dir / f"ads_{first_id}_{last_id}.npz"
+        tmp_path = self.cache_dir / f".{path.name}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                scanned=np.int64(scanned),
+                built_at=np.float64(time.time()),
+                prepare_version=np.str_(self.version),
+                **{column: _to_plain_array(prepared[column]) for column in prepared.columns},
+            )
+        os.replace(tmp_path, path)
+
+    def load(self) -> Tuple[pd.DataFrame, Optional[float]]:
+        """Все части одним DataFrame и время сборки самой старой из них."""
+        frames, built_at = [], None
+        for _, _, path in self.parts():
+            with np.load(path) as part:
+                columns = [name for name in part.files if name not in PART_META]
+                frames.append(pd.DataFrame({name: part[name] for name in columns}))
+                built_at = float(part["built_at"]) if built_at is None else min(built_at, float(part["built_at"]))
+        if not frames:
+            return pd.DataFrame(), None
+        return pd.concat(frames, ignore_index=True), built_at
+
+    def compact(self, prepared: pd.DataFrame, scanned: int) -> None:
+        """Сводит все части в одну, чтобы кэш не разрастался числом файлов."""
+        parts = self.parts()
+        if len(parts) <= 1:
+            return
+        self.append(prepared, parts[0][0], parts[-1][1], scanned)
+        for _, _, path in parts:
+            path.unlink()
+
+    def clear(self) -> None:
+        for _, _, path in self.parts():
+            path.unlink()
+
+
+def stream_ads(engine: Engine, after_id: Optional[int], chunk_size: int) -> Iterator[pd.DataFrame]:
+    """Порции строк `ads` по возрастанию avito_id через серверный курсор (stream_results)."""
+    stmt = select(ADS_TABLE.c.avito_id, ADS_TABLE.c.title, ADS_TABLE.c.price, ADS_TABLE.c.description)
+    if after_id is not None:
+        stmt = stmt.where(ADS_TABLE.c.avito_id > after_id)
+    stmt = stmt.order_by(ADS_TABLE.c.avito_id)
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True).execute(stmt)
+        for rows in result.partitions(chunk_size):
+            yield pd.DataFrame(rows, columns=["avito_id", "title", "price", "description"])
+
+
+def _count_ads_up_to(engine: Engine, max_id: int) -> int:
+    with engine.connect() as conn:
+        return conn.execute(select(func.count()).where(ADS_TABLE.c.avito_id <= max_id)).scalar()
+
+
+def _latest_price_changes(engine: Engine, since: float) -> Dict[int, int]:
+    """Последние цены объявлений, изменившихся после `since` (см. record_price_changes)."""
+    stmt = (
+        select(HISTORY_TABLE.c.avito_id, HISTORY_TABLE.c.price)
+        .where(HISTORY_TABLE.c.observed_at > datetime.fromtimestamp(since))
+        .order_by(HISTORY_TABLE.c.observed_at)
+    )
+    with engine.connect() as conn:
+        return {ad_id: price for ad_id, price in conn.execute(stmt)}
+
+
+def load_training_frame(engine: Engine, cache: FeatureCache, chunk_size: int) -> pd.DataFrame:
+    """
+    Собирает очищенные признаки: кэш + новые строки из базы.
+
+    Кэш пересобирается целиком, если он собран другой версией очистки
+    (изменились каталог, флаги или правила prepare_chunk) или если строк с
+    avito_id не больше закэшированного максимума в базе стало больше, чем
+    просмотрено при сборке кэша (объявление со старым ID добавили позже).
+    """
+    max_id = cache.max_avito_id
+    if max_id is not None and not cache.is_current():
+        log.warning("Кэш признаков собран другой версией очистки, пересобираем его целиком.")
+        cache.clear()
+        max_id = None
+    if max_id is not None and _count_ads_up_to(engine, max_id) != cache.scanned_rows():
+        log.warning("Кэш признаков не совпадает с таблицей ads, пересобираем его целиком.")
+        cache.clear()
+        max_id = None
+
+    matcher = KeywordMatcher()
+    fetched = 0
+    for chunk in stream_ads(engine, max_id, chunk_size):
+        prepared = prepare_chunk(chunk, matcher)
+        cache.append(prepared, int(chunk["avito_id"].iloc[0]), int(chunk["avito_id"].iloc[-1]), len(chunk))
+        fetched += len(chunk)
+        log.info(f"Загружена порция из {len(chunk)} объявлений, после очистки {len(prepared)}.")
+    log.info(f"Новых строк из базы: {fetched}, кэш начинался с avito_id > {max_id}.")
+
+    df, built_at = cache.load()
+    if df.empty:
+        return df
+
+    changed = _latest_price_changes(engine, built_at)
+    if changed:
+        updates = df["avito_id"].map(changed)
+        df["price"] = updates.fillna(df["price"]).astype(np.int64)
+        log.info(f"Учтены изменения цены у {int(updates.notna().sum())} объявлений из кэша.")
+    # Сводная часть получает новое время сборки, поэтому сводим уже с актуальными ценами.
+    cache.compact(df, cache.scanned_rows())
+    return df
+
+
+def remove_price_outliers(df: pd.DataFrame, quantiles: Tuple[float, float] = OUTLIER_QUANTILES) -> pd.DataFrame:
+    """Отбрасывает цены вне 1%/99% квантилей своей пары (model, memory)."""
+    groups = list(CATEGORICAL_FEATURES)
+    bounds = df.groupby(groups)["price"].quantile(list(quantiles)).unstack()
+    bounds.columns = ["lower_bound", "upper_bound"]
+    df = df.join(bounds, on=groups)
+    keep = (df["price"] >= df["lower_bound"]) & (df["price"] <= df["upper_bound"])
+    return df[keep].drop(columns=["lower_bound", "upper_bound"])
+
+
+def build_design_matrix(df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.Series]:
+    matcher_flags = [column for column in df.columns if column in KeywordMatcher().flags]
+    features = pd.get_dummies(
+        df[list(CATEGORICAL_FEATURES) + matcher_flags], columns=list(CATEGORICAL_FEATURES), drop_first=True
+    )
+    return features, df["price"]
+
+
+def train_model(X: pd.DataFrame, y: pd.Series, n_estimators: int = 100, random_state: int = 42):
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=random_state)
+    model = RandomForestRegressor(n_estimators=n_estimators, random_state=random_state, n_jobs=-1)
+    model.fit(X_train, y_train)
+    y_pred = model.predict(X_test)
+    metrics = {
+        "mae": float(mean_absolute_error(y_test, y_pred)),
+        "r2": float(r2_score(y_test, y_pred)),
+        "train_rows": int(len(X_train)),
+        "test_rows": int(len(X_test)),
+    }
+    return model, metrics
+
+
+def update_model(
+    model: RandomForestRegressor,
+    model_columns: List[str],
+    X_recent: pd.DataFrame,
+    y_recent: pd.Series,
+    new_trees: int = 20,
+    max_trees: int = 100,
+    random_state: int = 42,
+) -> Optional[RandomForestRegressor]:
+    """
+    Дообучает лес через warm_start: добавляет `new_trees` деревьев, обученных только
+    на свежих объявлениях, и выбрасывает самые старые деревья сверх `max_trees`.
+
+    Деревья леса должны видеть одинаковые колонки, поэтому если в свежих данных
+    появилась новая категория (колонки нет в model_columns), возвращает None —
+    нужна полная пересборка.
+    """
+    unknown = set(X_recent.columns) - set(model_columns)
+    if unknown:
+        log.info(f"В свежих данных новые колонки {sorted(unknown)}, дообучение невозможно.")
+        return None
+    X_recent = X_recent.reindex(columns=model_columns, fill_value=0)
+
+    # Новый random_state на каждое обновление: иначе после отбрасывания старых
+    # деревьев новые получили бы те же сиды бутстрепа, что и прошлая партия.
+    model.set_params(warm_start=True, n_estimators=len(model.estimators_) + new_trees, random_state=random_state)
+    model.fit(X_recent, y_recent)
+    model.estimators_ = model.estimators_[-max_trees:]
+    model.set_params(warm_start=False, n_estimators=len(model.estimators_))
+    return model
+
+
+def incremental_update(
+    model: RandomForestRegressor,
+    model_columns: List[str],
+    df: pd.DataFrame,
+    X: pd.DataFrame,
+    y: pd.Series,
+    trained_up_to: int,
+    min_window: int = 1_000,
+    new_trees: int = 20,
+    max_trees: int = 100,
+) -> Optional[Tuple[RandomForestRegressor, Dict]]:
+    """
+    Дообучение на скользящем окне: объявления с avito_id больше, чем при прошлом
+    обучении, но не меньше `min_window` последних. 20% окна откладываются для MAE.
+    """
+    recent = (df["avito_id"] > trained_up_to).to_numpy()
+    if recent.sum() < min_window:
+        recent = df["avito_id"].rank(method="first", ascending=False).to_numpy() <= min_window
+    X_window, y_window = X[recent], y[recent]
+    if len(X_window) < 10:
+        return None
+
+    X_train, X_test, y_train, y_test = train_test_split(X_window, y_window, test_size=0.2, random_state=42)
+    random_state = int(df["avito_id"].max() % (2 ** 31 - 1))
+    updated = update_model(model, model_columns, X_train, y_train, new_trees, max_trees, random_state)
+    if updated is None:
+        return None
+    y_pred = updated.predict(X_test.reindex(columns=model_columns, fill_value=0))
+    metrics = {
+        "mae": float(mean_absolute_error(y_test, y_pred)),
+        "r2": float(r2_score(y_test, y_pred)),
+        "train_rows": int(len(X_train)),
+        "test_rows": int(len(X_test)),
+        "trees": len(updated.estimators_),
+    }
+    return updated, metrics
+
+
+def publish_model(registry: ModelRegistry, model, model_columns: List[str], metadata: Dict) -> str:
+    """
+    Публикует модель в реестр вместе со скомпилированным лесом и таблицей
+    предсказаний. Версия собирается во временном каталоге и появляется в реестре
+    целиком; указатели CURRENT/CANDIDATE не меняются.
+    """
+
+    def write_files(directory: Path) -> None:
+        joblib.dump(model, directory / MODEL_FILE)
+        with open(directory / COLUMNS_FILE, "w") as f:
+            json.dump(model_columns, f)
+        build_derived_files(directory)
+
+    return registry.publish(write_files, metadata)
+
+
+def _load_incremental_base(registry: ModelRegistry, cache_version: str):
+    """Текущая версия реестра и ее метаданные, если ее обучил этот скрипт на признаках версии `cache_version`."""
+    version = registry.current_version()
+    if version is None:
+        return None, None, {}
+    meta = registry.metadata(version)
+    if meta.get("source") != "train" or "max_avito_id" not in meta:
+        log.info(f"Текущая версия {version} обучена не этим скриптом, выполняется полное переобучение.")
+        return None, None, {}
+    if meta.get("prepare_version") != cache_version:
+        log.info(f"Текущая версия {version} обучена на признаках другой версии очистки, выполняется полное переобучение.")
+        return None, None, {}
+    model = joblib.load(registry.model_path(version))
+    if not isinstance(model, RandomForestRegressor):
+        return None, None, {}
+    with open(registry.columns_path(version), "r") as f:
+        return model, json.load(f), meta
+
+
+def run(
+    engine: Optional[Engine] = None,
+    cache_dir: Optional[str] = None,
+    chunk_size: Optional[int] = None,
+    registry_dir: str = REGISTRY_DIR,
+    full_refresh: bool = False,
+    incremental: Optional[bool] = None,
+    promote: bool = True,
+    keep_versions: int = 10,
+) -> Dict:
+    """
+    Цикл переобучения. Возвращает метрики и версию новой модели в реестре.
+
+    В инкрементальном режиме (training.incremental) текущий лес дообучается на
+    свежих объявлениях (см. incremental_update); если это невозможно — новая
+    категория, текущая версия импортирована вручную — лес обучается заново на
+    всей истории. С promote=False новая версия становится кандидатом: предсказатель
+    продолжает отвечать текущей, а кандидат оценивается в тени (ShadowScorer).
+    """
+    if engine is None:
+        from src.db.session import engine
+    cache_dir = cache_dir or settings.get_training_cache_dir()
+    if incremental is None:
+        incremental = settings.get_training_incremental()
+    cache = FeatureCache(cache_dir)
+    if full_refresh:
+        cache.clear()
+    registry = ModelRegistry(registry_dir)
+
+    df = load_training_frame(engine, cache, chunk_size or settings.get_training_chunk_size())
+    if df.empty:
+        raise RuntimeError("В таблице ads нет объявлений для обучения")
+
+    original_count = len(df)
+    df = remove_price_outliers(df)
+    log.info(f"Удалены выбросы по цене: осталось {len(df)} из {original_count} записей.")
+
+    X, y = build_design_matrix(df)
+    result = None
+    base_version = registry.current_version()
+    if incremental and not full_refresh:
+        model, model_columns, base_meta = _load_incremental_base(registry, cache.version)
+        if model is not None:
+            result = incremental_update(model, model_columns, df, X, y, base_meta["max_avito_id"])
+
+    if result is not None:
+        model, metrics = result
+        mode = "incremental"
+    else:
+        model, metrics = train_model(X, y)
+        model_columns = list(X.columns)
+        mode = "full"
+    log.info(f"Модель обучена ({mode}): MAE {metrics['mae']:,.2f} руб., R² {metrics['r2']:.2f}.")
+
+    metadata = {
+        **metrics,
+        "source": "train",
+        "mode": mode,
+        "rows": int(len(df)),
+        "max_avito_id": int(df["avito_id"].max()),
+        "n_estimators": len(model.estimators_),
+        "parent": base_version,
+        "prepare_version": cache.version,
+    }
+    version = publish_model(registry, model, model_columns, metadata)
+    if promote:
+        registry.promote(version)
+        log.info(f"Версия {version} ({len(model_columns)} колонок) опубликована и стала текущей.")
+    else:
+        registry.set_candidate(version)
+        log.info(f"Версия {version} опубликована как кандидат, текущая остается {base_version}.")
+    removed = registry.prune(keep_versions)
+    if removed:
+        log.info(f"Удалены старые версии: {', '.join(removed)}")
+    return {**metrics, "mode": mode, "rows": int(len(df)), "columns": len(model_columns),
+            "version": version, "promoted": promote}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Переобучение модели цены на данных из PostgreSQL.")
+    parser.add_argument("--full-refresh", action="store_true", help="Сбросить кэш признаков и прочитать все заново")
+    parser.add_argument("--incremental", action="store_true", default=None, help="Дообучить текущий лес на свежих данных")
+    parser.add_argument("--registry", default=REGISTRY_DIR)
+    parser.add_argument("--shadow", action="store_true", help="Не переключать модель, а назначить новую версию кандидатом")
+    args = parser.parse_args()
+    report = run(
+        registry_dir=args.registry,
+        full_refresh=args.full_refresh,
+        incremental=args.incremental,
+        promote=not args.shadow,
+    )
+    print(json.dumps(report))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import asyncio
+import random
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from src.core.logger import log
+from src.core.rate_limit import AsyncKeyedRateLimiter
+from src.parsers.extractor import columns_to_records, extract_columns, parse_html
+
+USER_AGENTS = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:89.0) Gecko/20100101 Firefox/89.0",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/14.1.1 Safari/605.1.15",
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.101 Safari/537.36",
+]
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_RETRY_AFTER = 120.0
+
+
+def _retry_after_seconds(response: httpx.Response) -> Optional[float]:
+    """Читает заголовок Retry-After (секунды или HTTP-дата)."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return min(float(value), MAX_RETRY_AFTER)
+    except ValueError:
+        pass
+    try:
+        delay = (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds()
+    except (TypeError, ValueError):
+        return None
+    return min(max(delay, 0.0), MAX_RETRY_AFTER)
+
+
+async def fetch_page(
+    client: httpx.AsyncClient,
+    url: str,
+    limiter: AsyncKeyedRateLimiter,
+    max_retries: int = 3,
+    backoff_base: float = 2.0,
+) -> Optional[bytes]:
+    """
+    Загружает одну страницу через общий пул соединений клиента.
+
+    Перед каждой попыткой берет токен из лимитера хоста. На 429/5xx и сетевых
+    ошибках повторяет запрос с экспоненциальной задержкой и полным джиттером,
+    а если сервер прислал Retry-After — ждет не меньше указанного.
+    """
+    host = urlsplit(url).netloc
+    for attempt in range(max_retries + 1):
+        await limiter.acquire(host)
+        retry_after = None
+        try:
+            response = await client.get(url, headers={"User-Agent": random.choice(USER_AGENTS)})
+        except httpx.TransportError as e:
+            log.warning(f"Сетевая ошибка при запросе к {url} (попытка {attempt + 1}): {e}")
+        else:
+            if response.status_code not in RETRY_STATUSES:
+                try:
+                    response.raise_for_status()
+                except httpx.HTTPStatusError as e:
+                    log.error(f"Ошибка при запросе к {url}: {e}")
+                    return None
+                return response.content
+            retry_after = _retry_after_seconds(response)
+            log.warning(f"{url} ответил {response.status_code} (попытка {attempt + 1}).")
+
+        if attempt < max_retries:
+            delay = random.uniform(0, backoff_base * 2 ** attempt)
+            await asyncio.sleep(max(delay, retry_after or 0.0))
+
+    log.error(f"Не удалось загрузить {url} после {max_retries + 1} попыток.")
+    return None
+
+
+def _parse_page(url: str, page: bytes, save_html: bool) -> List[Dict]:
+    if save_html:
+        filename = f"avito_page_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.html"
+        with open(filename, "wb") as f:
+            f.write(page)
+        log.info(f"HTML страницы сохранен в файл: {filename}")
+
+    columns = extract_columns(parse_html(page))
+    if not columns["avito_id"]:
+        log.warning(f"Не найдено ни одного блока с объявлениями: {url}")
+        return []
+    log.info(f"Успешно распарсено {len(columns['avito_id'])} объявлений: {url}")
+    return columns_to_records(columns)
+
+
+async def parse_avito_ads_async(
+    urls: List[str],
+    requests_per_minute: float = 6.0,
+    max_connections: int = 4,
+    timeout: float = 30.0,
+    max_retries: int = 3,
+    save_html: bool = False,
+    client: Optional[httpx.AsyncClient] = None,
+) -> List[Dict]:
+    """
+    Конкурентно загружает и парсит страницы выдачи Avito.
+
+    Соединения переиспользуются из пула одного httpx.AsyncClient (keep-alive),
+    частота запросов к каждому хосту ограничена токен-бакетом вместо блокирующих
+    пауз. Объявления возвращаются в порядке `urls`. Клиент можно передать
+    извне — например, настроенный на локальный тестовый сервер.
+    """
+    limiter = AsyncKeyedRateLimiter(rate=requests_per_minute / 60.0)
+    own_client = client is None
+    if own_client:
+        client = httpx.AsyncClient(
+            timeout=httpx.Timeout(timeout),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            follow_redirects=True,
+        )
+
+    try:
+        pages = await asyncio.gather(
+            *(fetch_page(client, url, limiter, max_retries=max_retries) for url in urls)
+        )
+    finally:
+        if own_client:
+            await client.aclose()
+
+    parsed_ads = []
+    for url, page in zip(urls, pages):
+        if page is not None:
+            parsed_ads.extend(_parse_page(url, page, save_html))
+    return parsed_ads
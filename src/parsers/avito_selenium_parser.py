@@ -1,167 +1,303 @@
 import json
-import random
 import re
+import threading
 import time
-from datetime import datetime
-from typing import Dict, List, Union
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
 
-from bs4 import BeautifulSoup
 from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
+from selenium.common.exceptions import WebDriverException
 
 from src.core.logger import log
-from src.parsers.utils import parse_relative_date
+from src.core.metrics import metrics
+from src.core.rate_limit import TokenBucket
+from src.parsers.browser_pool import DriverPool, create_chrome_driver
+from src.parsers.extractor import columns_to_records, extract_columns_from_driver
+from src.parsers.lazy_load import LoadStats, LoadWaitConfig, wait_for_lazy_load
 
+StopPredicate = Callable[[str, List[Dict]], bool]
 
-def _parse_single_ad_block(ad_block_soup: BeautifulSoup) -> Union[Dict, None]:
-    """
-    Вспомогательная функция для парсинга HTML-блока одного объявления.
-    Использует None для отсутствующих значений для удобства анализа.
-    """
-    base_url = "https://www.avito.ru"
-    try:
-        title_tag = ad_block_soup.find("a", {"data-marker": "item-title"})
-        avito_id_raw = ad_block_soup.get("id")
-        if not all([title_tag, avito_id_raw]):
-            return None
-
-        
-        price = None
-        if price_tag := ad_block_soup.find("meta", {"itemprop": "price"}):
-            try:
-                price = int(price_tag["content"])
-            except (ValueError, TypeError):
-                pass
-
-        published_at = datetime.now()
-        if date_tag := ad_block_soup.find("p", {"data-marker": "item-date"}):
-            published_at = parse_relative_date(date_tag.text.strip()) or published_at
-        
-        location = None
-        if location_tag := ad_block_soup.select_one('[class*="geo-root-"] span'):
-            location = location_tag.text.strip()
-        elif " в " in (full_title := title_tag.get("title", "")):
-            location = full_title.split(" в ")[-1].strip()
-
-        condition = None
-        if params_tag := ad_block_soup.find("p", {"data-marker": "item-specific-params"}):
-            params_text = params_tag.text.lower()
-            if "новый" in params_text or "новая" in params_text:
-                condition = "Новый"
-            elif "/" in params_text:
-                condition = "Б/у"
-
-        description = None
-        if description_tag := ad_block_soup.select_one('[class*="styles-module-root_bottom-"]'):
-            description = description_tag.text.strip()
-
-        seller_name = None
-        seller_rating = None
-        seller_reviews_count = None
-        
-        seller_link = ad_block_soup.select_one('a[href*="/profile"], a[href*="/user/"], a[href*="/brands/"]')
-        if seller_link:
-            if p_tag := seller_link.find("p"):
-                seller_name = p_tag.text.strip()
-            
-            if rating_tag := seller_link.select_one('[data-marker="seller-rating/score"]'):
-                try:
-                    seller_rating = float(rating_tag.text.strip().replace(",", "."))
-                except (ValueError, AttributeError):
-                    pass
-            
-            if reviews_tag := seller_link.select_one('[data-marker="seller-info/summary"]'):
-                try:
-                    seller_reviews_count = int("".join(filter(str.isdigit, reviews_tag.text.strip())))
-                except (ValueError, AttributeError):
-                    pass
-
-        ad_data = {
-            "avito_id": int(avito_id_raw.lstrip("i")),
-            "title": title_tag.text.strip(),
-            "url": base_url + title_tag["href"],
-            "price": price,
-            "description": description,
-            "location": location,
-            "published_at": published_at,
-            "seller_name": seller_name,
-            "seller_rating": seller_rating,
-            "seller_reviews_count": seller_reviews_count,
-            "condition": condition,
-        }
-        return ad_data
-
-    except Exception as e:
-        log.warning(f"Пропущено объявление из-за НЕПРЕДВИДЕННОЙ общей ошибки: {e}")
-        return None
 
+def _build_page_url(url: str, page_num: int) -> str:
+    """Формирует URL конкретной страницы выдачи."""
+    base_url_for_pagination = url.split("&p=")[0]
+    return f"{base_url_for_pagination}&p={page_num}"
 
-def parse_avito_with_selenium(url: str, num_pages: int = 1) -> List[Dict]:
+
+def _scrape_page(
+    driver: webdriver.Chrome, page_url: str, page_num: int, load_wait: LoadWaitConfig
+) -> Tuple[List[Dict], bool, LoadStats]:
     """
-    Парсит несколько страниц Avito с помощью Selenium, решая проблему Lazy Loading.
+    Загружает одну страницу выдачи в уже запущенном драйвере и парсит объявления.
+
+    Returns:
+        Кортеж (объявления со страницы, есть ли следующая страница, замеры ожидания).
     """
-    chrome_options = Options()
-    chrome_options.add_argument("--headless=new")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--window-size=1920,1080")
-    chrome_options.add_argument(
-        "user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+    log.info(f"Парсим страницу {page_num}: {page_url}")
+    with metrics.timer("page_load"):
+        driver.get(page_url)
+    with metrics.timer("lazy_load_wait"):
+        stats = wait_for_lazy_load(driver, load_wait)
+    metrics.inc("lazy_load_scrolls", stats.scrolls)
+    if stats.timed_out:
+        metrics.inc("lazy_load_timeouts")
+    log.info(
+        f"Страница {page_num} догружена за {stats.elapsed:.2f} с "
+        f"({stats.items} карточек, прокруток: {stats.scrolls}"
+        f"{', по таймауту' if stats.timed_out else ''}); "
+        f"фиксированные паузы заняли бы ~{stats.legacy_estimate:.1f} с."
     )
-    
-    try:
-        from webdriver_manager.chrome import ChromeDriverManager
-        service = Service(ChromeDriverManager().install())
-        log.info("Используем webdriver-manager для локального запуска.")
-    except ImportError:
-        log.info("webdriver-manager не найден. Используем системный chromedriver для Docker.")
-        service = Service()
 
-    driver = webdriver.Chrome(service=service, options=chrome_options)
-    log.info("Selenium WebDriver запущен.")
+    with metrics.timer("extract"):
+        columns, has_next_page = extract_columns_from_driver(driver, page_num + 1)
+        page_ads = columns_to_records(columns)
+    metrics.inc("pages")
+    metrics.inc("ads_parsed", len(page_ads))
+    log.info(f"На странице {page_num} найдено {len(page_ads)} объявлений.")
+
+    return page_ads, has_next_page, stats
+
+
+def log_wait_summary(all_stats: List[LoadStats]) -> None:
+    """Логирует суммарное время ожидания догрузки против оценки старых фиксированных пауз."""
+    if not all_stats:
+        return
+    waited = sum(stats.elapsed for stats in all_stats)
+    legacy = sum(stats.legacy_estimate for stats in all_stats)
+    log.info(
+        f"Ожидание догрузки: {waited:.1f} с на {len(all_stats)} страниц "
+        f"(фиксированные паузы: ~{legacy:.1f} с, экономия ~{legacy - waited:.1f} с)."
+    )
+
+
+def iter_avito_pages(
+    url: str,
+    num_pages: int = 1,
+    load_wait: Optional[LoadWaitConfig] = None,
+    stop_when: Optional[StopPredicate] = None,
+    driver: Optional[webdriver.Chrome] = None,
+    stats: Optional[List[LoadStats]] = None,
+    first_page: int = 1,
+) -> Iterator[Tuple[int, List[Dict]]]:
+    """
+    Генератор страниц выдачи: отдает (номер страницы, объявления) сразу после
+    загрузки каждой страницы, так что обработка первой страницы идет, пока
+    следующая еще не запрошена.
+
+    `stop_when` вызывается до того, как страница отдана потребителю: иначе
+    потребитель мог бы успеть сохранить объявления в БД, и страница ошибочно
+    считалась бы известной. Переданный `driver` не закрывается (теплый браузер
+    между запусками), иначе драйвер создается и закрывается здесь. Замеры
+    ожидания догрузки дописываются в `stats`, если список передан.
+    `first_page` и `num_pages` задают диапазон страниц first_page..num_pages.
+    """
+    load_wait = load_wait or LoadWaitConfig()
+    own_driver = driver is None
+    if own_driver:
+        driver = create_chrome_driver()
 
-    all_ads = []
     try:
-        for page_num in range(1, num_pages + 1):
-            base_url_for_pagination = url.split("&p=")[0]
-            page_url = f"{base_url_for_pagination}&p={page_num}"
-
-            log.info(f"Парсим страницу {page_num}: {page_url}")
-            driver.get(page_url)
-            time.sleep(random.uniform(3, 5))
-
-            last_height = driver.execute_script("return document.body.scrollHeight")
-            for _ in range(3):
-                driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                time.sleep(random.uniform(2, 4))
-                new_height = driver.execute_script("return document.body.scrollHeight")
-                if new_height == last_height:
-                    break
-                last_height = new_height
-
-            soup = BeautifulSoup(driver.page_source, "lxml")
-            ads_blocks = soup.find_all("div", {"data-marker": "item"})
-            log.info(f"На странице {page_num} найдено {len(ads_blocks)} объявлений.")
-
-            for ad_block in ads_blocks:
-                ad_data = _parse_single_ad_block(ad_block)
-                if ad_data:
-                    all_ads.append(ad_data)
-
-            next_page_marker = f"pagination-button/page({page_num + 1})"
-            next_page_button = soup.select_one(f'[data-marker="{next_page_marker}"]')
-
-            if not next_page_button:
+        for page_num in range(first_page, num_pages + 1):
+            page_ads, has_next_page, page_stats = _scrape_page(
+                driver, _build_page_url(url, page_num), page_num, load_wait
+            )
+            if stats is not None:
+                stats.append(page_stats)
+            known = stop_when is not None and has_next_page and stop_when(url, page_ads)
+            yield page_num, page_ads
+
+            if not has_next_page:
                 log.info(
                     f"Кнопка для страницы {page_num + 1} не найдена. Завершаем пагинацию."
                 )
                 break
 
+            if known:
+                log.info(f"Страница {page_num} целиком известна. Завершаем пагинацию.")
+                break
+
     finally:
-        driver.quit()
-        log.info("Selenium WebDriver закрыт.")
+        if own_driver:
+            driver.quit()
+            log.info("Selenium WebDriver закрыт.")
+
+
+def parse_avito_with_selenium(
+    url: str,
+    num_pages: int = 1,
+    load_wait: Optional[LoadWaitConfig] = None,
+    stop_when: Optional[StopPredicate] = None,
+) -> List[Dict]:
+    """
+    Парсит несколько страниц Avito с помощью Selenium, решая проблему Lazy Loading.
+    Если передан `stop_when(url, page_ads)` и он вернул True, пагинация прекращается
+    после текущей страницы (инкрементальный обход).
+    """
+    all_ads = []
+    all_stats: List[LoadStats] = []
+    for _, page_ads in iter_avito_pages(url, num_pages, load_wait, stop_when, stats=all_stats):
+        all_ads.extend(page_ads)
 
+    log_wait_summary(all_stats)
     log.info(f"Всего успешно распарсено {len(all_ads)} объявлений.")
-    return all_ads
\ No newline at end of file
+    return all_ads
+
+
+@dataclass
+class SearchCrawl:
+    """Итог обхода одного поискового URL: объявления по порядку страниц и затраченное время браузера."""
+
+    url: str
+    ads: List[Dict] = field(default_factory=list)
+    pages: int = 0
+    seconds: float = 0.0
+
+
+def crawl_searches(
+    urls: List[str],
+    num_pages: Union[int, Sequence[int]] = 1,
+    pool_size: int = 2,
+    requests_per_minute: float = 20,
+    max_attempts: int = 2,
+    load_wait: Optional[LoadWaitConfig] = None,
+    stop_when: Optional[StopPredicate] = None,
+) -> List[SearchCrawl]:
+    """
+    Обходит страницы одного или нескольких поисковых URL на общем ограниченном
+    пуле долгоживущих WebDriver и возвращает результат по каждому URL.
+
+    `num_pages` — общий лимит страниц или свой лимит для каждого URL. Все
+    загрузки проходят через общий токен-бакет (`requests_per_minute`), поэтому
+    нагрузка на Avito не растет с размером пула. Страницы разных URL ставятся
+    в очередь по кругу (первые страницы всех поисков, затем вторые и т. д.),
+    так что длинный поиск не задерживает остальные. Страница, на которой упал
+    драйвер, повторяется на новом драйвере до `max_attempts` раз; если и это не
+    помогло, она пропускается без падения всего запуска.
+
+    С `stop_when` страницы каждого URL обходятся по порядку: следующая ставится
+    в очередь после проверки предыдущей, и обход URL прекращается на первой
+    целиком известной странице.
+    """
+    load_wait = load_wait or LoadWaitConfig()
+    budget = TokenBucket(rate=requests_per_minute / 60.0)
+    if isinstance(num_pages, int):
+        page_limits = [num_pages] * len(urls)
+    else:
+        page_limits = [int(pages) for pages in num_pages]
+        if len(page_limits) != len(urls):
+            raise ValueError("num_pages must have one limit per URL")
+    last_page = dict(enumerate(page_limits))
+    last_page_lock = threading.Lock()
+
+    def scrape_unit(pool: DriverPool, url_idx: int, page_num: int) -> Optional[Tuple[List[Dict], bool, LoadStats, float]]:
+        for attempt in range(1, max_attempts + 1):
+            with last_page_lock:
+                if page_num > last_page[url_idx]:
+                    return None
+            budget.acquire()
+            started = time.monotonic()
+            try:
+                with pool.lease() as driver:
+                    page_ads, has_next_page, stats = _scrape_page(
+                        driver, _build_page_url(urls[url_idx], page_num), page_num, load_wait
+                    )
+            except WebDriverException as e:
+                log.warning(
+                    f"Страница {page_num} ({urls[url_idx]}) не загружена, попытка {attempt}/{max_attempts}: {e}"
+                )
+                continue
+            if not has_next_page:
+                with last_page_lock:
+                    last_page[url_idx] = min(last_page[url_idx], page_num)
+            return page_ads, has_next_page, stats, time.monotonic() - started
+        log.error(f"Страница {page_num} ({urls[url_idx]}) пропущена после {max_attempts} попыток.")
+        return None
+
+    results: Dict[Tuple[int, int], Tuple[List[Dict], bool, LoadStats, float]] = {}
+
+    with DriverPool(pool_size) as pool, ThreadPoolExecutor(max_workers=pool_size) as executor:
+        if stop_when is not None:
+            pending = {}
+
+            def submit(url_idx: int, page_num: int) -> None:
+                pending[executor.submit(scrape_unit, pool, url_idx, page_num)] = (url_idx, page_num)
+
+            for url_idx, limit in enumerate(page_limits):
+                if limit >= 1:
+                    submit(url_idx, 1)
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    url_idx, page_num = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        log.error(f"Ошибка при парсинге страницы {page_num} ({urls[url_idx]}): {e}", exc_info=True)
+                        result = None
+                    if result is not None:
+                        results[(url_idx, page_num)] = result
+                        page_ads, has_next_page, _, _ = result
+                        if not has_next_page:
+                            continue
+                        if stop_when(urls[url_idx], page_ads):
+                            log.info(f"Страница {page_num} ({urls[url_idx]}) целиком известна. Завершаем пагинацию.")
+                            continue
+                    if page_num < page_limits[url_idx]:
+                        submit(url_idx, page_num + 1)
+        else:
+            units = [
+                (url_idx, page_num)
+                for page_num in range(1, max(page_limits, default=0) + 1)
+                for url_idx in range(len(urls))
+                if page_num <= page_limits[url_idx]
+            ]
+            futures = {executor.submit(scrape_unit, pool, *unit): unit for unit in units}
+            for future in as_completed(futures):
+                unit = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    log.error(f"Ошибка при парсинге страницы {unit[1]} ({urls[unit[0]]}): {e}", exc_info=True)
+                    continue
+                if result is not None:
+                    results[unit] = result
+
+    crawls = []
+    for url_idx, url in enumerate(urls):
+        crawl = SearchCrawl(url)
+        for page_num in range(1, page_limits[url_idx] + 1):
+            if (url_idx, page_num) not in results:
+                continue
+            page_ads, has_next_page, _, seconds = results[(url_idx, page_num)]
+            crawl.ads.extend(page_ads)
+            crawl.pages += 1
+            crawl.seconds += seconds
+            if not has_next_page:
+                break
+        crawls.append(crawl)
+
+    log_wait_summary([stats for _, _, stats, _ in results.values()])
+    log.info(
+        f"Всего успешно распарсено {sum(len(crawl.ads) for crawl in crawls)} объявлений "
+        f"({len(results)} страниц, {len(urls)} поисков, пул из {pool_size} драйверов)."
+    )
+    return crawls
+
+
+def parse_avito_parallel(
+    urls: List[str],
+    num_pages: int = 1,
+    pool_size: int = 2,
+    requests_per_minute: float = 20,
+    max_attempts: int = 2,
+    load_wait: Optional[LoadWaitConfig] = None,
+    stop_when: Optional[StopPredicate] = None,
+) -> List[Dict]:
+    """
+    Параллельно парсит страницы одного или нескольких поисковых URL
+    (см. crawl_searches). Результаты собираются в детерминированном порядке:
+    по порядку URL, затем по номеру страницы, затем по позиции на странице.
+    """
+    crawls = crawl_searches(urls, num_pages, pool_size, requests_per_minute, max_attempts, load_wait, stop_when)
+    return [ad for crawl in crawls for ad in crawl.ads]
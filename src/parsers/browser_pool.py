@@ -0,0 +1,121 @@
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Callable, Iterator, List
+
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+
+from src.core.logger import log
+from src.core.metrics import metrics
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+
+
+def create_chrome_driver() -> webdriver.Chrome:
+    """Запускает headless Chrome с настройками, общими для всех режимов парсинга."""
+    chrome_options = Options()
+    chrome_options.add_argument("--headless=new")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("--window-size=1920,1080")
+    chrome_options.add_argument(f"user-agent={USER_AGENT}")
+
+    with metrics.timer("browser_start"):
+        try:
+            from webdriver_manager.chrome import ChromeDriverManager
+            service = Service(ChromeDriverManager().install())
+            log.info("Используем webdriver-manager для локального запуска.")
+        except ImportError:
+            log.info("webdriver-manager не найден. Используем системный chromedriver для Docker.")
+            service = Service()
+
+        driver = webdriver.Chrome(service=service, options=chrome_options)
+    log.info("Selenium WebDriver запущен.")
+    return driver
+
+
+class DriverPool:
+    """
+    Ограниченный пул долгоживущих WebDriver.
+    Драйверы создаются лениво (не больше `size` одновременно) и переиспользуются
+    между страницами. Упавший драйвер закрывается, а его слот освобождается,
+    так что следующий запрос получит свежий экземпляр.
+    """
+
+    def __init__(self, size: int, factory: Callable[[], webdriver.Chrome] = create_chrome_driver):
+        if size < 1:
+            raise ValueError("pool size must be at least 1")
+        self.size = size
+        self._factory = factory
+        self._idle: "queue.LifoQueue[webdriver.Chrome]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._all: List[webdriver.Chrome] = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _acquire(self) -> webdriver.Chrome:
+        self._slots.acquire()
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            driver = self._factory()
+        except Exception:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._all.append(driver)
+        return driver
+
+    def _discard(self, driver: webdriver.Chrome) -> None:
+        with self._lock:
+            if driver in self._all:
+                self._all.remove(driver)
+        try:
+            driver.quit()
+        except Exception as e:
+            log.warning(f"Не удалось корректно закрыть упавший WebDriver: {e}")
+
+    @contextmanager
+    def lease(self) -> Iterator[webdriver.Chrome]:
+        """
+        Выдает драйвер из пула на время блока `with`.
+        При WebDriverException драйвер считается сломанным и заменяется.
+        """
+        if self._closed:
+            raise RuntimeError("DriverPool is closed")
+        driver = self._acquire()
+        try:
+            yield driver
+        except WebDriverException:
+            log.warning("WebDriver упал во время работы. Заменяем его новым экземпляром.")
+            self._discard(driver)
+            driver = None
+            raise
+        finally:
+            if driver is not None:
+                self._idle.put(driver)
+            self._slots.release()
+
+    def close(self) -> None:
+        """Закрывает все драйверы пула."""
+        self._closed = True
+        with self._lock:
+            drivers, self._all = self._all, []
+        for driver in drivers:
+            try:
+                driver.quit()
+            except Exception as e:
+                log.warning(f"Ошибка при закрытии WebDriver: {e}")
+        log.info(f"Пул WebDriver закрыт ({len(drivers)} шт.).")
+
+    def __enter__(self) -> "DriverPool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,254 @@
+from datetime import datetime
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple, Union
+
+from cssselect import GenericTranslator
+from lxml import etree, html as lxml_html
+from selenium import webdriver
+
+from src.parsers.utils import parse_relative_date
+
+BASE_URL = "https://www.avito.ru"
+CARD_SELECTOR = 'div[data-marker="item"]'
+
+Columns = Dict[str, List[Any]]
+
+
+class FieldSpec(NamedTuple):
+    """
+    Декларативное описание одного поля карточки.
+
+    Attributes:
+        name: Имя поля (колонки) в результате.
+        css: CSS-селектор относительно карточки (или области); None — сама карточка.
+        attr: Имя атрибута; None — текст элемента без пробелов по краям.
+        scope: Имя области из SCOPES, внутри которой ищется элемент; None — вся карточка.
+        coerce: Приведение сырой строки к типу поля. ValueError/TypeError дают default.
+        default: Значение, если элемент не найден или не прошел приведение.
+        default_factory: Фабрика значения по умолчанию (вызывается один раз на страницу).
+        fallback: Имя поля, значение которого берется, если это поле пустое.
+        required: Карточки без этого поля отбрасываются.
+        output: Попадает ли поле в результат (служебные поля — нет).
+    """
+
+    name: str
+    css: Optional[str]
+    attr: Optional[str] = None
+    scope: Optional[str] = None
+    coerce: Optional[Callable[[str], Any]] = None
+    default: Any = None
+    default_factory: Optional[Callable[[], Any]] = None
+    fallback: Optional[str] = None
+    required: bool = False
+    output: bool = True
+
+
+def _parse_avito_id(value: str) -> int:
+    return int(value.lstrip("i"))
+
+
+def _absolute_url(value: str) -> str:
+    return BASE_URL + value
+
+
+def _parse_float(value: str) -> float:
+    return float(value.replace(",", "."))
+
+
+def _parse_digits(value: str) -> int:
+    return int("".join(filter(str.isdigit, value)))
+
+
+def _parse_condition(value: str) -> Optional[str]:
+    params_text = value.lower()
+    if "новый" in params_text or "новая" in params_text:
+        return "Новый"
+    if "/" in params_text:
+        return "Б/у"
+    return None
+
+
+def _location_from_title(value: str) -> Optional[str]:
+    if " в " in value:
+        return value.split(" в ")[-1].strip()
+    return None
+
+
+SCOPES: Dict[str, str] = {
+    "seller": 'a[href*="/profile"], a[href*="/user/"], a[href*="/brands/"]',
+}
+
+CARD_SPEC: Tuple[FieldSpec, ...] = (
+    FieldSpec("avito_id", None, "id", coerce=_parse_avito_id, required=True),
+    FieldSpec("title", 'a[data-marker="item-title"]', required=True),
+    FieldSpec("url", 'a[data-marker="item-title"]', "href", coerce=_absolute_url, required=True),
+    FieldSpec("price", 'meta[itemprop="price"]', "content", coerce=int),
+    FieldSpec("description", '[class*="styles-module-root_bottom-"]'),
+    FieldSpec("location", '[class*="geo-root-"] span', fallback="title_location"),
+    FieldSpec("published_at", 'p[data-marker="item-date"]', coerce=parse_relative_date, default_factory=datetime.now),
+    FieldSpec("seller_name", "p", scope="seller"),
+    FieldSpec("seller_rating", '[data-marker="seller-rating/score"]', scope="seller", coerce=_parse_float),
+    FieldSpec("seller_reviews_count", '[data-marker="seller-info/summary"]', scope="seller", coerce=_parse_digits),
+    FieldSpec("condition", 'p[data-marker="item-specific-params"]', coerce=_parse_condition),
+    FieldSpec("title_location", 'a[data-marker="item-title"]', "title", coerce=_location_from_title, output=False),
+)
+
+
+def _compile(css: str, prefix: str = "descendant::") -> etree.XPath:
+    """Переводит CSS-селектор в XPath, возвращающий первый совпавший элемент."""
+    xpath = GenericTranslator().css_to_xpath(css, prefix=prefix)
+    return etree.XPath(f"({xpath})[1]")
+
+
+_CARDS_XPATH = etree.XPath(GenericTranslator().css_to_xpath(CARD_SELECTOR, prefix="descendant-or-self::"))
+_SCOPE_XPATHS = {name: _compile(css) for name, css in SCOPES.items()}
+_FIELD_XPATHS = [(field, _compile(field.css) if field.css else None) for field in CARD_SPEC]
+
+
+def _value(element, attr: Optional[str]) -> Optional[str]:
+    value = element.get(attr) if attr else element.text_content()
+    return value.strip() if value is not None else None
+
+
+def parse_html(page: Union[str, bytes]) -> etree._Element:
+    """Разбирает HTML страницы в дерево lxml (байты декодируются как UTF-8)."""
+    if isinstance(page, bytes):
+        parser = lxml_html.HTMLParser(encoding="utf-8")
+        return lxml_html.document_fromstring(page, parser=parser)
+    return lxml_html.document_fromstring(page)
+
+
+def extract_raw_columns(root: etree._Element) -> Columns:
+    """
+    Собирает сырые строки всех полей CARD_SPEC со всех карточек за один проход
+    по дереву с помощью заранее скомпилированных XPath-выражений.
+    """
+    raw: Columns = {field.name: [] for field in CARD_SPEC}
+    for card in _CARDS_XPATH(root):
+        scopes = {}
+        for name, xpath in _SCOPE_XPATHS.items():
+            found = xpath(card)
+            scopes[name] = found[0] if found else None
+
+        for field, xpath in _FIELD_XPATHS:
+            base = scopes[field.scope] if field.scope else card
+            if base is None:
+                value = None
+            elif xpath is None:
+                value = _value(base, field.attr)
+            else:
+                found = xpath(base)
+                value = _value(found[0], field.attr) if found else None
+            raw[field.name].append(value)
+    return raw
+
+
+def coerce_columns(raw: Columns) -> Columns:
+    """
+    Применяет к сырым колонкам приведение типов, значения по умолчанию и
+    подстановки из CARD_SPEC, после чего отбрасывает карточки без обязательных
+    полей. Работает по колонкам целиком, а не по отдельным объявлениям.
+    """
+    columns: Columns = {}
+    for field in CARD_SPEC:
+        values = raw.get(field.name, [])
+        if field.coerce is not None:
+            coerced = []
+            for value in values:
+                if value is not None:
+                    try:
+                        value = field.coerce(value)
+                    except (ValueError, TypeError):
+                        value = None
+                coerced.append(value)
+            values = coerced
+        columns[field.name] = values
+
+    for field in CARD_SPEC:
+        values = columns[field.name]
+        if field.fallback is not None:
+            values = [
+                value if value is not None else substitute
+                for value, substitute in zip(values, columns[field.fallback])
+            ]
+        default = field.default_factory() if field.default_factory is not None else field.default
+        if default is not None:
+            values = [value if value is not None else default for value in values]
+        columns[field.name] = values
+
+    size = len(columns[CARD_SPEC[0].name])
+    keep = [
+        idx for idx in range(size)
+        if all(columns[field.name][idx] is not None for field in CARD_SPEC if field.required)
+    ]
+    return {
+        field.name: [columns[field.name][idx] for idx in keep]
+        for field in CARD_SPEC
+        if field.output
+    }
+
+
+def extract_columns(root: etree._Element) -> Columns:
+    """Извлекает все карточки страницы в виде типизированных колонок."""
+    return coerce_columns(extract_raw_columns(root))
+
+
+def columns_to_records(columns: Columns) -> List[Dict]:
+    """Разворачивает колонки в список словарей-объявлений."""
+    names = list(columns)
+    return [dict(zip(names, row)) for row in zip(*columns.values())]
+
+
+def has_page_button(root: etree._Element, page_num: int) -> bool:
+    """Проверяет, есть ли на странице кнопка пагинации на страницу `page_num`."""
+    marker = f"pagination-button/page({page_num})"
+    return bool(root.xpath("//*[@data-marker=$marker][1]", marker=marker))
+
+
+_EXTRACT_JS = """
+var cardSelector = arguments[0], fields = arguments[1], scopes = arguments[2], nextMarker = arguments[3];
+function grab(root, css, attr) {
+    var el = css ? root.querySelector(css) : root;
+    if (!el) return null;
+    var value = attr ? el.getAttribute(attr) : el.textContent;
+    return value === null ? null : value.trim();
+}
+var columns = {};
+for (var j = 0; j < fields.length; j++) {
+    columns[fields[j][0]] = [];
+}
+var cards = document.querySelectorAll(cardSelector);
+for (var i = 0; i < cards.length; i++) {
+    var card = cards[i];
+    var scoped = {};
+    for (var name in scopes) {
+        scoped[name] = card.querySelector(scopes[name]);
+    }
+    for (var j = 0; j < fields.length; j++) {
+        var f = fields[j];
+        var base = f[3] ? scoped[f[3]] : card;
+        columns[f[0]].push(base ? grab(base, f[1], f[2]) : null);
+    }
+}
+var hasNext = document.querySelector('[data-marker="' + nextMarker + '"]') !== null;
+return [columns, hasNext];
+"""
+
+_JS_FIELDS = [[field.name, field.css, field.attr, field.scope] for field in CARD_SPEC]
+
+
+def extract_columns_from_driver(driver: webdriver.Chrome, next_page_num: int) -> Tuple[Columns, bool]:
+    """
+    Извлекает все карточки прямо из DOM браузера одним вызовом JS,
+    без сериализации `page_source` и повторного парсинга в Python.
+
+    Returns:
+        Кортеж (типизированные колонки, есть ли кнопка на страницу `next_page_num`).
+    """
+    raw, has_next_page = driver.execute_script(
+        _EXTRACT_JS,
+        CARD_SELECTOR,
+        _JS_FIELDS,
+        SCOPES,
+        f"pagination-button/page({next_page_num})",
+    )
+    return coerce_columns(raw), bool(has_next_page)
@@ -0,0 +1,143 @@
+import time
+from dataclasses import dataclass
+
+from selenium import webdriver
+
+ITEM_SELECTOR = 'div[data-marker="item"]'
+
+_INSTALL_WATCH_JS = """
+if (!window.__dealFinderWatch) {
+    var watch = {lastMutation: performance.now()};
+    new MutationObserver(function () {
+        watch.lastMutation = performance.now();
+    }).observe(document.documentElement, {childList: true, subtree: true});
+    window.__dealFinderWatch = watch;
+}
+"""
+
+_PROBE_JS = """
+var watch = window.__dealFinderWatch;
+var now = performance.now();
+var lastResponse = 0;
+var entries = performance.getEntriesByType('resource');
+for (var i = 0; i < entries.length; i++) {
+    if (entries[i].responseEnd > lastResponse) {
+        lastResponse = entries[i].responseEnd;
+    }
+}
+return [
+    document.readyState,
+    document.querySelectorAll(arguments[0]).length,
+    watch ? now - watch.lastMutation : 0,
+    now - lastResponse,
+    document.body ? document.body.scrollHeight : 0
+];
+"""
+
+_SCROLL_JS = "window.scrollTo(0, document.body.scrollHeight);"
+
+
+@dataclass
+class LoadWaitConfig:
+    """
+    Параметры ожидания догрузки карточек.
+
+    Attributes:
+        timeout: Жесткий лимит ожидания на одну страницу, секунды.
+        quiet_period: Сколько секунд DOM, сеть и число карточек должны
+            оставаться неизменными, чтобы считать догрузку завершенной.
+        politeness_floor: Минимальное время, проводимое на странице, секунды.
+        poll_interval: Период опроса состояния страницы, секунды.
+        max_scrolls: Максимальное число прокруток вниз.
+    """
+
+    timeout: float = 15.0
+    quiet_period: float = 0.5
+    politeness_floor: float = 1.0
+    poll_interval: float = 0.1
+    max_scrolls: int = 3
+
+
+@dataclass
+class LoadStats:
+    """Замеры ожидания загрузки одной страницы."""
+
+    elapsed: float
+    items: int
+    scrolls: int
+    timed_out: bool
+
+    @property
+    def legacy_estimate(self) -> float:
+        """
+        Сколько в среднем заняли бы фиксированные паузы старого цикла:
+        3–5 с после загрузки и 2–4 с после каждой прокрутки.
+        """
+        return 4.0 + 3.0 * self.scrolls
+
+
+def _wait_until_quiet(driver: webdriver.Chrome, config: LoadWaitConfig, deadline: float):
+    """
+    Опрашивает страницу, пока число карточек, DOM и сеть не затихнут
+    на `quiet_period`, либо пока не наступит дедлайн.
+
+    Returns:
+        Кортеж (число карточек, высота страницы, сработал ли таймаут).
+    """
+    last_count = -1
+    count_stable_since = time.monotonic()
+    quiet_ms = config.quiet_period * 1000
+    while True:
+        ready_state, count, since_mutation, since_response, height = driver.execute_script(
+            _PROBE_JS, ITEM_SELECTOR
+        )
+        now = time.monotonic()
+        if count != last_count:
+            last_count = count
+            count_stable_since = now
+        if (
+            ready_state == "complete"
+            and now - count_stable_since >= config.quiet_period
+            and since_mutation >= quiet_ms
+            and since_response >= quiet_ms
+        ):
+            return count, height, False
+        if now >= deadline:
+            return count, height, True
+        time.sleep(config.poll_interval)
+
+
+def wait_for_lazy_load(driver: webdriver.Chrome, config: LoadWaitConfig) -> LoadStats:
+    """
+    Дожидается догрузки карточек после `driver.get`.
+
+    Вместо фиксированных пауз после каждой прокрутки ждет фактического условия:
+    число `div[data-marker="item"]` перестало расти, MutationObserver не видит
+    изменений DOM и новые сетевые ответы не приходят. Возвращается сразу,
+    как только условие выполнено, но не раньше `politeness_floor`
+    и не позже `timeout`.
+    """
+    started = time.monotonic()
+    deadline = started + config.timeout
+    driver.execute_script(_INSTALL_WATCH_JS)
+
+    count, last_height, timed_out = _wait_until_quiet(driver, config, deadline)
+    scrolls = 0
+    while not timed_out and scrolls < config.max_scrolls:
+        driver.execute_script(_SCROLL_JS)
+        scrolls += 1
+        count, new_height, timed_out = _wait_until_quiet(driver, config, deadline)
+        if new_height == last_height:
+            break
+        last_height = new_height
+
+    remaining_floor = config.politeness_floor - (time.monotonic() - started)
+    if remaining_floor > 0:
+        time.sleep(remaining_floor)
+
+    return LoadStats(
+        elapsed=time.monotonic() - started,
+        items=count,
+        scrolls=scrolls,
+        timed_out=timed_out,
+    )